@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+
+import django
+
+logger = logging.getLogger(__name__)
+
+
+def worker() -> None:
+    # NOTE: child processes may be spawned rather than forked
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "decompme.settings")
+    django.setup()
+
+    from coreapp.compile_queue import run_worker
+    from coreapp.views.scratch import run_compile_job
+
+    run_worker(run_compile_job)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Decomp.me compile worker: runs queued compilations and diffs"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Number of worker processes to run",
+    )
+    args = parser.parse_args()
+
+    processes: int = args.processes
+    assert processes >= 1, "--processes must be >= 1"
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "decompme.settings")
+    django.setup()
+
+    from coreapp import compile_queue
+
+    if not compile_queue.is_enabled():
+        logger.info("Compile queue is disabled (COMPILE_QUEUE_ENABLED), exiting")
+        return
+
+    if processes == 1:
+        worker()
+        return
+
+    # Replace worker processes that die, e.g. from running out of memory
+    pool: list[multiprocessing.Process] = []
+    while True:
+        for p in pool:
+            if not p.is_alive():
+                logger.warning(
+                    "Compile worker process %s exited with %s, restarting it",
+                    p.pid,
+                    p.exitcode,
+                )
+        pool = [p for p in pool if p.is_alive()]
+        while len(pool) < processes:
+            p = multiprocessing.Process(target=worker, daemon=True)
+            p.start()
+            pool.append(p)
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
 from django.contrib import admin
 
 from .models.best_fork import BestFork, BestForkAdmin
+from .models.compilation import (
+    CompilationCacheEntry,
+    CompilationCacheEntryAdmin,
+    StoredObject,
+    StoredObjectAdmin,
+)
+from .models.compile_job import CompileJob, CompileJobAdmin
 from .models.course import Course, CourseChapter, CourseScenario
 from .models.github import GitHubUser
 from .models.preset import Preset, PresetAdmin
@@ -8,16 +15,24 @@ from .models.profile import Profile, ProfileAdmin
 from .models.project import Project, ProjectMember
 from .models.scratch import (
     Asm,
+    AsmAdmin,
     Assembly,
     AssemblyAdmin,
+    AssemblyDump,
+    AssemblyDumpAdmin,
+    CompileSnapshot,
+    CompileSnapshotAdmin,
     Scratch,
     ScratchAdmin,
+    ScratchCount,
+    ScratchCountAdmin,
 )
 
 admin.site.register(Profile, ProfileAdmin)
 admin.site.register(GitHubUser)
-admin.site.register(Asm)
+admin.site.register(Asm, AsmAdmin)
 admin.site.register(Assembly, AssemblyAdmin)
+admin.site.register(AssemblyDump, AssemblyDumpAdmin)
 admin.site.register(Scratch, ScratchAdmin)
 admin.site.register(Preset, PresetAdmin)
 admin.site.register(Project)
@@ -26,3 +41,8 @@ admin.site.register(Course)
 admin.site.register(CourseChapter)
 admin.site.register(CourseScenario)
 admin.site.register(BestFork, BestForkAdmin)
+admin.site.register(CompilationCacheEntry, CompilationCacheEntryAdmin)
+admin.site.register(CompileJob, CompileJobAdmin)
+admin.site.register(StoredObject, StoredObjectAdmin)
+admin.site.register(CompileSnapshot, CompileSnapshotAdmin)
+admin.site.register(ScratchCount, ScratchCountAdmin)
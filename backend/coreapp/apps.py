@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreappConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "coreapp"
+
+    def ready(self) -> None:
+        from . import response_cache, scratch_counts
+
+        scratch_counts.connect()
+        response_cache.connect()
@@ -0,0 +1,302 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Sum
+from django.utils.timezone import now
+
+from . import timings
+from .libraries import Library
+from .models.compilation import CompilationCacheEntry
+from .util import SizedLRUCache
+from .wrapper_result import CompilationResult
+
+logger = logging.getLogger(__name__)
+
+# Bump this to invalidate every cached compilation, e.g. when the way
+# compilers are invoked changes in a way that affects their output.
+CACHE_VERSION = 1
+
+# Avoid an UPDATE on every hit; recency only needs to be roughly right for LRU.
+LAST_USED_GRANULARITY = timedelta(hours=1)
+
+# How many stores to do between checks of the total size of the DB cache.
+EVICTION_INTERVAL = 50
+EVICTION_BATCH_SIZE = 500
+
+# How often a process waiting for another process's compilation checks the lock
+LOCK_POLL_INTERVAL_SECONDS = 0.05
+
+
+def compilation_cache_key(
+    compiler_id: str,
+    compiler_flags: str,
+    code: str,
+    context: str,
+    function: str,
+    libraries: Sequence[Library],
+) -> str:
+    context_hash = hashlib.blake2b(context.encode("utf-8"), digest_size=16).hexdigest()
+    key = [
+        CACHE_VERSION,
+        compiler_id,
+        " ".join(compiler_flags.split()),
+        code,
+        context_hash,
+        function,
+        [[lib.name, lib.version] for lib in libraries],
+    ]
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+
+def _result_size(result: CompilationResult) -> int:
+    return len(result.elf_object) + len(result.errors)
+
+
+@contextmanager
+def _process_lock(key: str, timeout: float) -> Iterator[None]:
+    """
+    Hold an exclusive lock on `key` shared by every process on this machine.
+
+    The lock file is removed on release; waiters that locked a file which has
+    since been unlinked notice that its inode changed and try again.
+    If the lock can't be taken within `timeout` seconds, carry on without it.
+    """
+    lock_dir = settings.COMPILATION_LOCK_PATH
+    path = lock_dir / f"{key}.lock"
+    deadline = time.monotonic() + timeout
+
+    fd = -1
+    try:
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                fd = -1
+                if time.monotonic() >= deadline:
+                    logger.warning("Timed out waiting for compilation lock: %s", key)
+                    break
+                time.sleep(LOCK_POLL_INTERVAL_SECONDS)
+                continue
+
+            try:
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+            fd = -1
+    except OSError as e:
+        logger.warning("Error taking compilation lock: %s", e)
+        if fd != -1:
+            os.close(fd)
+            fd = -1
+
+    try:
+        yield
+    finally:
+        if fd != -1:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            os.close(fd)
+
+
+class CompilationCache:
+    """
+    Two-level cache of successful compilations.
+
+    L1 is a per-process LRU bounded by the number of bytes it holds,
+    L2 is a table shared by all workers, evicted in LRU order once it
+    grows past its byte limit.
+
+    Concurrent misses for the same key are coalesced by `get_or_compile`,
+    so a burst of identical requests only compiles once.
+    """
+
+    def __init__(self, memory_max_bytes: int, db_max_bytes: int):
+        self.memory = SizedLRUCache[str, CompilationResult](
+            memory_max_bytes, _result_size
+        )
+        self.db_max_bytes = db_max_bytes
+        self._lock = threading.Lock()
+        self._stores_since_eviction = 0
+        self._in_flight: dict[str, Future[CompilationResult]] = {}
+        self._counters = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    def _count(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] += n
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["memory_entries"] = len(self.memory)
+        stats["memory_bytes"] = self.memory.size
+        return stats
+
+    def get_or_compile(
+        self,
+        key: str,
+        compiler_id: str,
+        compile: Callable[[], CompilationResult],
+    ) -> CompilationResult:
+        """
+        Return the cached result for `key`, or call `compile` and cache its result.
+
+        Only one thread per process calls `compile` for a given key at a time;
+        the others wait for and share its result (or exception). Across
+        processes, a file lock serialises compilations of the same key and
+        the cache is checked again once it is held.
+        """
+        result = self.get(key)
+        if result is not None:
+            return result
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if future is None:
+                future = self._in_flight[key] = Future()
+
+        if not is_leader:
+            self._count("coalesced")
+            timings.record_cache("compilation", "coalesced")
+            logger.debug("Waiting for in-flight compilation: %s", key)
+            return future.result()
+
+        try:
+            with _process_lock(key, settings.COMPILATION_TIMEOUT_SECONDS + 5):
+                # Another process may have finished this compilation while
+                # we were waiting for the lock
+                result = self.get(key, count_miss=False)
+                if result is None:
+                    result = compile()
+                    self.put(key, compiler_id, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def get(self, key: str, count_miss: bool = True) -> CompilationResult | None:
+        result = self.memory.get(key)
+        if result is not None:
+            self._count("memory_hits")
+            timings.record_cache("compilation", "memory")
+            logger.debug("Compilation cache hit (memory): %s", key)
+            return result
+
+        try:
+            entry = CompilationCacheEntry.objects.filter(key=key).first()
+            if entry is not None and entry.last_used < now() - LAST_USED_GRANULARITY:
+                CompilationCacheEntry.objects.filter(key=key).update(last_used=now())
+        except DatabaseError as e:
+            logger.warning("Error reading from compilation cache: %s", e)
+            entry = None
+
+        if entry is None:
+            if count_miss:
+                self._count("misses")
+                timings.record_cache("compilation", "miss")
+            return None
+
+        self._count("db_hits")
+        timings.record_cache("compilation", "db")
+        logger.debug("Compilation cache hit (db): %s", key)
+        result = CompilationResult(bytes(entry.elf_object), entry.errors)
+        self.memory.put(key, result)
+        return result
+
+    def put(self, key: str, compiler_id: str, result: CompilationResult) -> None:
+        self.memory.put(key, result)
+
+        try:
+            CompilationCacheEntry.objects.update_or_create(
+                key=key,
+                defaults={
+                    "compiler": compiler_id,
+                    "elf_object": result.elf_object,
+                    "errors": result.errors,
+                    "size": _result_size(result),
+                    "last_used": now(),
+                },
+            )
+        except DatabaseError as e:
+            logger.warning("Error writing to compilation cache: %s", e)
+            return
+
+        self._count("stores")
+
+        with self._lock:
+            self._stores_since_eviction += 1
+            if self._stores_since_eviction < EVICTION_INTERVAL:
+                return
+            self._stores_since_eviction = 0
+
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used entries from the DB cache
+        until it fits within its byte limit again.
+        """
+        try:
+            total = CompilationCacheEntry.objects.aggregate(total=Sum("size"))["total"]
+            excess = (total or 0) - self.db_max_bytes
+            if excess <= 0:
+                return 0
+
+            keys = []
+            qs = CompilationCacheEntry.objects.order_by("last_used").values_list(
+                "key", "size"
+            )
+            for key, size in qs.iterator(chunk_size=EVICTION_BATCH_SIZE):
+                keys.append(key)
+                excess -= size
+                if excess <= 0:
+                    break
+
+            deleted = 0
+            for i in range(0, len(keys), EVICTION_BATCH_SIZE):
+                batch = keys[i : i + EVICTION_BATCH_SIZE]
+                deleted += CompilationCacheEntry.objects.filter(key__in=batch).delete()[
+                    0
+                ]
+        except DatabaseError as e:
+            logger.warning("Error evicting from compilation cache: %s", e)
+            return 0
+
+        self._count("evictions", deleted)
+        logger.info("Evicted %s entries from the compilation cache", deleted)
+        return deleted
+
+
+compilation_cache = CompilationCache(
+    memory_max_bytes=settings.COMPILATION_CACHE_MEMORY_BYTES,
+    db_max_bytes=settings.COMPILATION_CACHE_DB_BYTES,
+)
@@ -0,0 +1,127 @@
+import logging
+import os
+import socket
+import time
+from collections.abc import Callable
+from datetime import timedelta
+from typing import Any
+from uuid import UUID
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.timezone import now
+
+from .models.compile_job import CompileJob
+from .models.scratch import Scratch
+
+logger = logging.getLogger(__name__)
+
+# How often a request that waits for its job checks whether it has finished
+WAIT_POLL_INTERVAL_SECONDS = 0.05
+# How often an idle compile worker checks for new jobs
+WORKER_POLL_INTERVAL_SECONDS = 0.1
+# Running jobs older than this are assumed to belong to a dead worker
+STALE_JOB_AGE = timedelta(minutes=5)
+
+JobHandler = Callable[[CompileJob], dict[str, Any]]
+
+
+def is_enabled() -> bool:
+    return bool(settings.COMPILE_QUEUE_ENABLED)
+
+
+def submit_job(
+    scratch: Scratch,
+    kind: CompileJob.Kind,
+    request: dict[str, Any] | None = None,
+    update_score: bool = False,
+) -> CompileJob:
+    job = CompileJob.objects.create(
+        scratch=scratch,
+        kind=kind,
+        request=request or {},
+        update_score=update_score,
+    )
+    logger.debug("Queued %s job %s for scratch %s", kind, job.id, scratch.slug)
+    return job
+
+
+def wait_for_job(job_id: UUID, timeout: float) -> CompileJob:
+    """
+    Block until the job has finished or `timeout` seconds have passed,
+    returning the latest state of the job either way.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = CompileJob.objects.get(id=job_id)
+        if job.is_finished or time.monotonic() >= deadline:
+            return job
+        time.sleep(WAIT_POLL_INTERVAL_SECONDS)
+
+
+def claim_next_job(worker_name: str) -> CompileJob | None:
+    candidates = (
+        CompileJob.objects.filter(status=CompileJob.Status.QUEUED)
+        .order_by("creation_time")
+        .values_list("id", flat=True)[:10]
+    )
+    for job_id in candidates:
+        # The status check makes the claim atomic without needing row locks,
+        # so this works with any database backend
+        claimed = CompileJob.objects.filter(
+            id=job_id, status=CompileJob.Status.QUEUED
+        ).update(
+            status=CompileJob.Status.RUNNING,
+            worker=worker_name,
+            start_time=now(),
+        )
+        if claimed:
+            return CompileJob.objects.select_related("scratch").get(id=job_id)
+    return None
+
+
+def fail_stale_jobs() -> int:
+    return CompileJob.objects.filter(
+        status=CompileJob.Status.RUNNING, start_time__lt=now() - STALE_JOB_AGE
+    ).update(
+        status=CompileJob.Status.FAILED,
+        result={"detail": "Compile worker did not finish the job"},
+        finish_time=now(),
+    )
+
+
+def run_job(job: CompileJob, handler: JobHandler) -> None:
+    try:
+        job.result = handler(job)
+        job.status = CompileJob.Status.DONE
+    except Exception as e:
+        logger.exception("Error running compile job %s", job.id)
+        job.result = {"detail": str(e), "kind": e.__class__.__name__}
+        job.status = CompileJob.Status.FAILED
+    job.finish_time = now()
+    job.save(update_fields=["result", "status", "finish_time"])
+
+
+def run_next_job(handler: JobHandler, worker_name: str = "") -> bool:
+    job = claim_next_job(worker_name)
+    if job is None:
+        return False
+    run_job(job, handler)
+    return True
+
+
+def run_worker(handler: JobHandler) -> None:
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info("Compile worker %s started", worker_name)
+
+    last_stale_check = 0.0
+    while True:
+        close_old_connections()
+
+        if time.monotonic() - last_stale_check > STALE_JOB_AGE.total_seconds():
+            last_stale_check = time.monotonic()
+            if failed := fail_stale_jobs():
+                logger.warning("Failed %s stale compile jobs", failed)
+
+        if not run_next_job(handler, worker_name):
+            time.sleep(WORKER_POLL_INTERVAL_SECONDS)
@@ -2,37 +2,23 @@ import logging
 import re
 import subprocess
 import time
-from collections.abc import Callable, Sequence
-from typing import (
-    TYPE_CHECKING,
-    TypeVar,
-)
+from collections.abc import Sequence
 
 from django.conf import settings
 
 import coreapp.util as util
-from coreapp import compilers, platforms
+from coreapp import compilers, metrics, platforms, timings
 from coreapp.compilers import Compiler, CompilerType
 from coreapp.flags import Language
 from coreapp.platforms import Platform
 
+from .compilation_cache import compilation_cache, compilation_cache_key
 from .error import AssemblyError, CompilationError
 from .libraries import Library
 from .models.scratch import Asm, Assembly
 from .sandbox import Sandbox
 from .wrapper_result import CompilationResult
 
-# Thanks to Guido van Rossum for the following fix
-# https://github.com/python/mypy/issues/5107#issuecomment-529372406
-if TYPE_CHECKING:
-    F = TypeVar("F")
-
-    def lru_cache(maxsize: int = 128, typed: bool = False) -> Callable[[F], F]:
-        pass
-
-else:
-    from functools import lru_cache
-
 logger = logging.getLogger(__name__)
 
 
@@ -90,7 +76,6 @@ class CompilerWrapper:
         return input.strip()
 
     @staticmethod
-    @lru_cache(maxsize=settings.COMPILATION_CACHE_SIZE)
     def compile_code(
         compiler: Compiler,
         compiler_flags: str,
@@ -105,6 +90,26 @@ class CompilerWrapper:
         code = code.replace("\r\n", "\n")
         context = context.replace("\r\n", "\n")
 
+        key = compilation_cache_key(
+            compiler.id, compiler_flags, code, context, function, libraries
+        )
+        return compilation_cache.get_or_compile(
+            key,
+            compiler.id,
+            lambda: CompilerWrapper._compile_code(
+                compiler, compiler_flags, code, context, function, libraries
+            ),
+        )
+
+    @staticmethod
+    def _compile_code(
+        compiler: Compiler,
+        compiler_flags: str,
+        code: str,
+        context: str,
+        function: str,
+        libraries: Sequence[Library],
+    ) -> CompilationResult:
         with Sandbox() as sandbox:
             ext = compiler.get_language(compiler_flags).get_file_extension()
             code_file = f"code.{ext}"
@@ -161,27 +166,34 @@ class CompilerWrapper:
                     for lib in libraries
                 )
                 wibo_path = settings.COMPILER_BASE_PATH / "common" / "wibo_dlls"
-                compile_proc = sandbox.run_subprocess(
-                    cc_cmd,
-                    mounts=(
-                        [compiler.path] if compiler.platform != platforms.DUMMY else []
-                    ),
-                    shell=True,
-                    env={
-                        "WIBO": "wibo",
-                        "WIBO_PATH": sandbox.rewrite_path(wibo_path),
-                        "INPUT": sandbox.rewrite_path(code_path),
-                        "OUTPUT": sandbox.rewrite_path(object_path),
-                        "COMPILER_DIR": sandbox.rewrite_path(compiler.path),
-                        "COMPILER_FLAGS": sandbox.quote_options(
-                            compiler_flags + " " + libraries_compiler_flags
+                metrics.COMPILES.inc(compiler.id)
+                with (
+                    timings.stage("compile"),
+                    metrics.COMPILE_DURATION.time(compiler.id),
+                ):
+                    compile_proc = sandbox.run_subprocess(
+                        cc_cmd,
+                        mounts=(
+                            [compiler.path]
+                            if compiler.platform != platforms.DUMMY
+                            else []
                         ),
-                        "FUNCTION": function,
-                        "MWCIncludes": "/tmp",
-                        "TMPDIR": "/tmp",
-                    },
-                    timeout=settings.COMPILATION_TIMEOUT_SECONDS,
-                )
+                        shell=True,
+                        env={
+                            "WIBO": "wibo",
+                            "WIBO_PATH": sandbox.rewrite_path(wibo_path),
+                            "INPUT": sandbox.rewrite_path(code_path),
+                            "OUTPUT": sandbox.rewrite_path(object_path),
+                            "COMPILER_DIR": sandbox.rewrite_path(compiler.path),
+                            "COMPILER_FLAGS": sandbox.quote_options(
+                                compiler_flags + " " + libraries_compiler_flags
+                            ),
+                            "FUNCTION": function,
+                            "MWCIncludes": "/tmp",
+                            "TMPDIR": "/tmp",
+                        },
+                        timeout=settings.COMPILATION_TIMEOUT_SECONDS,
+                    )
                 et = round(time.time() * 1000)
                 logger.debug(f"Compilation finished in: {et - st} ms")
             except subprocess.CalledProcessError as e:
@@ -195,6 +207,7 @@ class CompilerWrapper:
                 logger.debug("Compilation failed: %s", e)
                 raise CompilationError(str(e))
             except subprocess.TimeoutExpired:
+                metrics.TIMEOUTS.inc(CompilationError.__name__)
                 raise CompilationError("Compilation failed: timeout expired")
 
             if not object_path.exists():
@@ -220,10 +233,14 @@ class CompilerWrapper:
                 f"Assemble command for platform {platform.id} not found"
             )
 
-        cached_assembly, hash = _check_assembly_cache(platform.id, asm.hash)
+        cached_assembly, hash = _check_assembly_cache(
+            platform.id, asm.hash, platform.assembler_version
+        )
         if cached_assembly:
             logger.debug(f"Assembly cache hit! hash: {hash}")
+            timings.record_cache("assembly", "hit")
             return cached_assembly
+        timings.record_cache("assembly", "miss")
 
         if platform == platforms.DUMMY:
             assembly = Assembly(
@@ -260,6 +277,7 @@ class CompilerWrapper:
             except subprocess.CalledProcessError as e:
                 raise AssemblyError.from_process_error(e)
             except subprocess.TimeoutExpired:
+                metrics.TIMEOUTS.inc(AssemblyError.__name__)
                 raise AssemblyError("Timeout expired")
 
             # Assembly failed
@@ -1,4 +1,5 @@
 import enum
+import hashlib
 import logging
 import platform as platform_stdlib
 from collections import OrderedDict
@@ -275,6 +276,16 @@ def available_platforms() -> list[Platform]:
     return sorted(pset, key=lambda p: p.name)
 
 
+@cache
+def response_tag() -> str:
+    """
+    Tag of the cached responses that include the available compilers, which
+    differ between hosts and builds depending on what's been installed
+    """
+    ids = "\n".join(sorted(compiler.id for compiler in available_compilers()))
+    return f"compilers:{hashlib.sha256(ids.encode()).hexdigest()}"
+
+
 DUMMY = DummyCompiler(id="dummy", platform=platforms.DUMMY, cc="")
 
 DUMMY_LONGRUNNING = DummyLongRunningCompiler(
@@ -1,15 +1,20 @@
 import logging
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from functools import wraps
 from typing import ParamSpec, TypeVar
 
+from django.http import HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
 from rest_framework.response import Response
 
+from .. import response_cache
+
 logger = logging.getLogger(__file__)
 
 # Generic types for a view function
 P = ParamSpec("P")
 R = TypeVar("R", bound=Response)
+V = TypeVar("V", bound=HttpResponseBase)
 
 
 def globally_cacheable(
@@ -40,3 +45,37 @@ def globally_cacheable(
         return _wrapped_view
 
     return decorator
+
+
+def server_cacheable(
+    timeout: int,
+    tags: Iterable[str] | Callable[..., Iterable[str] | None] = (),
+) -> Callable[[Callable[P, V]], Callable[P, V | HttpResponse]]:
+    """
+    Decorator to cache the JSON responses of GET requests on the server, tagged
+    with `tags` so that they're invalidated when what they include changes (see
+    response_cache). `tags` may instead be a function of the request and the
+    URL's keyword arguments, returning None to not cache the response.
+
+    Must decorate the whole view, e.g. its dispatch(), as responses are
+    rendered before they're cached.
+    """
+
+    def decorator(view_func: Callable[P, V]) -> Callable[P, V | HttpResponse]:
+        @wraps(view_func)
+        def _wrapped_view(*args: P.args, **kwargs: P.kwargs) -> V | HttpResponse:
+            request = next((arg for arg in args if isinstance(arg, HttpRequest)), None)
+            if request is None:
+                return view_func(*args, **kwargs)
+
+            response_tags = tags(request, **kwargs) if callable(tags) else tags
+            if response_tags is None:
+                return view_func(*args, **kwargs)
+
+            return response_cache.get_or_set(
+                request, response_tags, timeout, lambda: view_func(*args, **kwargs)
+            )
+
+        return _wrapped_view
+
+    return decorator
@@ -0,0 +1,165 @@
+"""
+Compact encoding of the diff output returned by the compile endpoint.
+
+The rows of PythonFormatter.raw are sent column by column, with every cell
+replaced by its index in a table of unique cells, so that repeated
+instructions and unchanged target rows are only sent once:
+
+    {
+        "format": "compact",
+        "revision": "...",
+        "row_count": 3,
+        "cells": [{"text": [...]}, ...],
+        "rows": {"key": [...], "base": [0, 1, 0], "current": [2, null, 0]},
+        ...other fields of the diff output, e.g. "current_score"
+    }
+
+If the client passes the revision of the diff it already has as `since`, and
+that revision is still in the cache, only the rows that changed are sent,
+along with their indices:
+
+    {"format": "compact-delta", "since": "...", "rows": {"index": [1], ...}, ...}
+
+The client applies a delta by resizing its rows to `row_count` and replacing
+the listed ones.
+
+Huge diffs can also be sent a window at a time, see `window()`.
+"""
+
+import hashlib
+import json
+from typing import Any
+
+from django.core.cache import cache
+
+COLUMNS = ("base", "current", "previous")
+
+# How long the row digests of each revision are kept to compute deltas against
+REVISION_CACHE_SECONDS = 60 * 60
+
+# How long the rows of windowed diffs are kept for the client to fetch
+ROWS_CACHE_SECONDS = 10 * 60
+
+MISMATCH_FORMATS = {"diff_change", "diff_add", "diff_remove"}
+
+
+def _revision_cache_key(revision: str) -> str:
+    return f"diff-revision:{revision}"
+
+
+def _rows_cache_key(scope: str, diff_id: str) -> str:
+    return f"diff-rows:{scope}:{diff_id}"
+
+
+def _serialize(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def encode(diff_output: dict[str, Any], since: str | None = None) -> dict[str, Any]:
+    rows = diff_output.get("rows", [])
+    if not all(isinstance(row, dict) for row in rows):
+        # e.g. the placeholder output of the dummy platform
+        return diff_output
+
+    row_cells = [[_serialize(row.get(column)) for column in COLUMNS] for row in rows]
+    row_digests = [
+        _digest(_serialize(row.get("key")) + "".join(cells))
+        for row, cells in zip(rows, row_cells)
+    ]
+
+    encoded = {key: value for key, value in diff_output.items() if key != "rows"}
+    revision = _digest(_serialize(encoded) + "".join(row_digests))
+    cache.set(_revision_cache_key(revision), row_digests, REVISION_CACHE_SECONDS)
+
+    indices: list[int] = list(range(len(rows)))
+    previous = cache.get(_revision_cache_key(since)) if since else None
+    if previous is not None:
+        indices = [
+            i
+            for i, digest in enumerate(row_digests)
+            if i >= len(previous) or previous[i] != digest
+        ]
+
+    cells: list[Any] = []
+    cell_indices: dict[str, int] = {}
+
+    def intern(i: int, column: int) -> int | None:
+        if COLUMNS[column] not in rows[i]:
+            return None
+        serialized = row_cells[i][column]
+        index = cell_indices.get(serialized)
+        if index is None:
+            index = cell_indices[serialized] = len(cells)
+            cells.append(rows[i][COLUMNS[column]])
+        return index
+
+    columns: dict[str, list[Any]] = {"key": [rows[i].get("key") for i in indices]}
+    for column, name in enumerate(COLUMNS):
+        if any(name in row for row in rows):
+            columns[name] = [intern(i, column) for i in indices]
+
+    if previous is not None:
+        columns["index"] = indices
+        encoded["format"] = "compact-delta"
+        encoded["since"] = since
+    else:
+        encoded["format"] = "compact"
+
+    encoded["revision"] = revision
+    encoded["row_count"] = len(rows)
+    encoded["cells"] = cells
+    encoded["rows"] = columns
+    return encoded
+
+
+def _is_mismatch(row: dict[str, Any]) -> bool:
+    base, current = row.get("base"), row.get("current")
+    if (base is None) != (current is None):
+        return True
+    # Rely on asm-differ's opinion, as the frontend does
+    return any(
+        text.get("format") in MISMATCH_FORMATS
+        for cell in (base, current)
+        if cell is not None
+        for text in cell.get("text", [])
+    )
+
+
+def window(
+    diff_output: dict[str, Any], scope: str, diff_id: str, limit: int
+) -> dict[str, Any]:
+    """
+    Replace the rows of the diff with its first `limit` rows, the total number
+    of rows and the indices of mismatching rows. The remaining rows can be
+    fetched with `get_rows(scope, diff_id, ...)` for a while.
+    """
+    rows = diff_output.get("rows", [])
+    if not all(isinstance(row, dict) for row in rows):
+        return diff_output
+
+    if len(rows) > limit:
+        cache.set(_rows_cache_key(scope, diff_id), rows, ROWS_CACHE_SECONDS)
+
+    windowed = {key: value for key, value in diff_output.items() if key != "rows"}
+    windowed["diff_id"] = diff_id
+    windowed["total_rows"] = len(rows)
+    windowed["mismatches"] = [i for i, row in enumerate(rows) if _is_mismatch(row)]
+    windowed["rows"] = rows[:limit]
+    return windowed
+
+
+def get_rows(
+    scope: str, diff_id: str, start: int, end: int
+) -> tuple[list[dict[str, Any]], int] | None:
+    """
+    Rows [start, end) of a windowed diff and its total number of rows,
+    or None if the diff is no longer cached
+    """
+    rows = cache.get(_rows_cache_key(scope, diff_id))
+    if rows is None:
+        return None
+    return rows[start:end], len(rows)
@@ -0,0 +1,202 @@
+"""
+The CPU-heavy part of diffing, run in a separate pool of processes so that
+pathological diffs can be bounded in time and memory (see DiffWrapper.diff).
+
+This module must stay importable without Django being set up.
+"""
+
+import dataclasses
+import resource
+import signal
+from types import FrameType
+from typing import Any, NamedTuple
+
+import diff as asm_differ
+
+from . import timings
+from .util import SizedLRUCache
+
+MAX_FUNC_SIZE_LINES = 25000
+
+# Processed target lines kept by each worker process, see process_base
+_base_lines = SizedLRUCache[str, list[Any]](4 * MAX_FUNC_SIZE_LINES, len)
+
+
+class DiffTimeout(Exception):
+    pass
+
+
+class DiffLimits(NamedTuple):
+    # Levenshtein's time and memory grow with the product of both functions'
+    # lengths, so larger diffs use difflib instead with -DIFFauto
+    # (see estimate_cost)
+    levenshtein_max_cells: int
+
+
+class DiffJobResult(NamedTuple):
+    result: dict[str, Any]
+    base_line_count: int
+    my_line_count: int
+    algorithm: str
+    timings: dict[str, Any]
+
+
+def create_config(
+    arch: asm_differ.ArchSettings, diff_flags: list[str]
+) -> asm_differ.Config:
+    show_rodata_refs = "-DIFFno_show_rodata_refs" not in diff_flags
+    algorithm = "difflib" if "-DIFFdifflib" in diff_flags else "levenshtein"
+    diff_function_symbols = "-DIFFdiff_function_symbols" in diff_flags
+
+    return asm_differ.Config(
+        arch=arch,
+        # Build/objdump options
+        diff_obj=True,
+        file="",
+        make=False,
+        source_old_binutils=True,
+        diff_section=".text",
+        inlines=False,
+        max_function_size_lines=MAX_FUNC_SIZE_LINES,
+        max_function_size_bytes=MAX_FUNC_SIZE_LINES * 4,
+        # Display options
+        formatter=asm_differ.PythonFormatter(arch_str=arch.name),
+        diff_mode=asm_differ.DiffMode.NORMAL,
+        base_shift=0,
+        skip_lines=0,
+        compress=None,
+        show_branches=True,
+        show_line_numbers=False,
+        show_source=False,
+        stop_at_ret=False,
+        ignore_large_imms=False,
+        ignore_addr_diffs=True,
+        algorithm=algorithm,
+        reg_categories={},
+        show_rodata_refs=show_rodata_refs,
+        diff_function_symbols=diff_function_symbols,
+        # Other
+        ref_file=None,
+    )
+
+
+def estimate_cost(base_lines: list[Any], my_lines: list[Any]) -> int:
+    """
+    The number of cells Levenshtein has to fill in to align both functions.
+    Identical leading and trailing instructions are free, so functions that
+    mostly match are cheap to diff however long they are.
+    """
+    base = [line.mnemonic for line in base_lines]
+    mine = [line.mnemonic for line in my_lines]
+
+    prefix = 0
+    limit = min(len(base), len(mine))
+    while prefix < limit and base[prefix] == mine[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and base[-suffix - 1] == mine[-suffix - 1]:
+        suffix += 1
+
+    return (len(base) - prefix - suffix) * (len(mine) - prefix - suffix)
+
+
+def choose_algorithm(
+    base_lines: list[Any],
+    my_lines: list[Any],
+    diff_flags: list[str],
+    limits: DiffLimits,
+) -> str:
+    if "-DIFFdifflib" in diff_flags:
+        return "difflib"
+    if (
+        "-DIFFauto" in diff_flags
+        and estimate_cost(base_lines, my_lines) > limits.levenshtein_max_cells
+    ):
+        return "difflib"
+    return "levenshtein"
+
+
+def process_base(
+    basedump: str, config: asm_differ.Config, base_key: str | None
+) -> list[Any]:
+    """
+    The processed lines of the target, which are the same for every compile of
+    a scratch. They're kept by the worker process rather than being stored with
+    the AssemblyDump, as they're asm-differ's own (frozen) Line objects, which
+    would have to be pickled into the database and could no longer be loaded
+    after upgrading asm-differ.
+    """
+    if base_key is None:
+        return asm_differ.process(basedump, config)
+
+    lines = _base_lines.get(base_key)
+    # Counted by the web process once the job returns, see DiffJobResult.timings
+    current = timings.current()
+    if current is not None:
+        current.cache["base-lines"] = "miss" if lines is None else "hit"
+    if lines is None:
+        lines = asm_differ.process(basedump, config)
+        _base_lines.put(base_key, lines)
+    return lines
+
+
+def run_diff(
+    arch_name: str,
+    diff_flags: list[str],
+    basedump: str,
+    mydump: str,
+    limits: DiffLimits,
+    base_key: str | None = None,
+) -> DiffJobResult:
+    config = create_config(asm_differ.get_arch(arch_name), diff_flags)
+
+    with timings.collect() as job_timings:
+        with timings.stage("process"):
+            base_lines = process_base(basedump, config, base_key)
+            my_lines = asm_differ.process(mydump, config)
+
+        algorithm = choose_algorithm(base_lines, my_lines, diff_flags, limits)
+        config = dataclasses.replace(config, algorithm=algorithm)
+        with timings.stage("do_diff"):
+            diff_output = asm_differ.do_diff(base_lines, my_lines, config)
+        with timings.stage("align_diffs"):
+            table_data = asm_differ.align_diffs(diff_output, diff_output, config)
+        with timings.stage("serialize"):
+            result = config.formatter.raw(table_data)
+
+    return DiffJobResult(
+        result, len(base_lines), len(my_lines), algorithm, job_timings.as_dict()
+    )
+
+
+def init_worker(max_memory_bytes: int) -> None:
+    if max_memory_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
+
+
+def _on_timeout(signum: int, frame: FrameType | None) -> None:
+    raise DiffTimeout("Diff took too long")
+
+
+def run_diff_job(
+    arch_name: str,
+    diff_flags: list[str],
+    basedump: str,
+    mydump: str,
+    limits: DiffLimits,
+    timeout: float,
+    base_key: str | None = None,
+) -> DiffJobResult:
+    """
+    Entry point for pool workers: run_diff, interrupted after `timeout` seconds
+    if it's running Python code at the time. The signal is only handled between
+    Python bytecodes, so it can't interrupt Levenshtein's C code; such diffs
+    are only stopped by DiffWrapper's run_diff_job giving up on the pool.
+    """
+    signal.signal(signal.SIGALRM, _on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return run_diff(arch_name, diff_flags, basedump, mydump, limits, base_key)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
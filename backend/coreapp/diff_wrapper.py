@@ -1,26 +1,212 @@
+import contextvars
+import hashlib
+import json
 import logging
+import multiprocessing
+import multiprocessing.pool
+import os
 import re
 import shlex
 import subprocess
+import threading
+import time
 from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, TypeVar
 
 import diff as asm_differ
 from django.conf import settings
+from django.db import DatabaseError
+from django.utils.timezone import now
 
 from coreapp.flags import ASMDIFF_FLAG_PREFIX
 from coreapp.platforms import DUMMY, Platform
 
+from . import diff_worker, elf, metrics, timings
 from .error import AssemblyError, DiffError, NmError, ObjdumpError
-from .models.scratch import Assembly
+from .models.scratch import Assembly, AssemblyDump
+from .object_store import LAST_USED_INTERVAL
 from .sandbox import Sandbox
 from .wrapper_result import DiffResult
 
 logger = logging.getLogger(__name__)
 
-MAX_FUNC_SIZE_LINES = 25000
+# Bump this to invalidate every stored AssemblyDump, e.g. after updating
+# asm-differ in a way that changes how dumps are preprocessed
+TARGET_DUMP_VERSION = 1
+
+# Only choose how dumps are diffed, not how they are preprocessed
+DIFF_ALGORITHM_FLAGS = frozenset(
+    ASMDIFF_FLAG_PREFIX + algorithm for algorithm in ["levenshtein", "difflib", "auto"]
+)
+
+# Runs objdump for diff targets concurrently with the compiled object's objdump
+_dump_executor: ThreadPoolExecutor | None = None
+_dump_executor_pid: int | None = None
+_dump_executor_lock = threading.Lock()
+
+T = TypeVar("T")
+
+
+def _submit(fn: Callable[..., T], *args: Any, **kwargs: Any) -> Future[T]:
+    global _dump_executor, _dump_executor_pid
+
+    # Worker threads don't survive a fork, so each process needs its own pool
+    with _dump_executor_lock:
+        if _dump_executor is None or _dump_executor_pid != os.getpid():
+            _dump_executor = ThreadPoolExecutor(
+                max_workers=settings.OBJDUMP_THREADS, thread_name_prefix="objdump"
+            )
+            _dump_executor_pid = os.getpid()
+
+    # Run in a copy of the current context so stage timings are still recorded
+    context = contextvars.copy_context()
+    return _dump_executor.submit(context.run, fn, *args, **kwargs)
+
+
+# Extra time given to a diff worker to report its own timeout before it is
+# considered stuck, e.g. in Levenshtein's C code, which the worker's timeout
+# signal can't interrupt
+DIFF_POOL_GRACE_SECONDS = 2
+
+_diff_pool: multiprocessing.pool.Pool | None = None
+_diff_pool_pid: int | None = None
+_diff_pool_lock = threading.Lock()
+
+
+def _get_diff_pool() -> multiprocessing.pool.Pool:
+    global _diff_pool, _diff_pool_pid
+
+    with _diff_pool_lock:
+        if _diff_pool is None or _diff_pool_pid != os.getpid():
+            # Forking a (possibly multithreaded) web worker isn't safe, so
+            # workers are started from a clean server process instead
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["coreapp.diff_worker"])
+            _diff_pool = context.Pool(
+                processes=settings.DIFF_POOL_PROCESSES,
+                initializer=diff_worker.init_worker,
+                initargs=(settings.DIFF_MAX_MEMORY_BYTES,),
+                maxtasksperchild=settings.DIFF_POOL_MAX_TASKS,
+            )
+            _diff_pool_pid = os.getpid()
+        return _diff_pool
+
+
+def _discard_diff_pool(pool: multiprocessing.pool.Pool) -> None:
+    global _diff_pool
+
+    with _diff_pool_lock:
+        if _diff_pool is pool:
+            _diff_pool = None
+    pool.terminate()
+
+
+def _run_on_pool(
+    arch_name: str,
+    diff_flags: list[str],
+    basedump: str,
+    mydump: str,
+    base_key: str | None,
+    limits: diff_worker.DiffLimits,
+    timeout: float,
+) -> diff_worker.DiffJobResult:
+    pool = _get_diff_pool()
+    async_result = pool.apply_async(
+        diff_worker.run_diff_job,
+        (arch_name, diff_flags, basedump, mydump, limits, timeout, base_key),
+    )
+    try:
+        return async_result.get(timeout + DIFF_POOL_GRACE_SECONDS)
+    except multiprocessing.TimeoutError:
+        # A worker stuck in C code can't be stopped on its own, and the pool
+        # can't stop a single worker, so the whole pool is replaced. Other
+        # diffs running on it fail too.
+        _discard_diff_pool(pool)
+        raise
+
+
+def has_algorithm_budget(diff_flags: list[str]) -> bool:
+    """
+    Whether Levenshtein is only given DIFF_ALGORITHM_BUDGET_SECONDS before the
+    diff falls back to difflib, rather than the whole DIFF_TIMEOUT_SECONDS
+    """
+    budget = settings.DIFF_ALGORITHM_BUDGET_SECONDS
+    return (
+        settings.DIFF_POOL_PROCESSES > 0
+        and 0 < budget
+        and budget + DIFF_POOL_GRACE_SECONDS < settings.DIFF_TIMEOUT_SECONDS
+        # An algorithm that was chosen explicitly is kept
+        and not ({"-DIFFlevenshtein", "-DIFFdifflib"} & set(diff_flags))
+    )
+
+
+def run_diff_job(
+    arch_name: str,
+    diff_flags: list[str],
+    basedump: str,
+    mydump: str,
+    base_key: str | None = None,
+) -> diff_worker.DiffJobResult:
+    """
+    Run asm-differ on a pool process, so that it can be stopped if it runs
+    for too long or uses too much memory. `base_key` identifies `basedump`,
+    see diff_worker.process_base.
+
+    Diffs that take longer than the algorithm budget (see has_algorithm_budget)
+    are run again with difflib, in the time that is left, as it's much faster
+    than Levenshtein on large functions.
+    """
+    timeout = settings.DIFF_TIMEOUT_SECONDS
+    limits = diff_worker.DiffLimits(
+        levenshtein_max_cells=settings.DIFF_LEVENSHTEIN_MAX_CELLS
+    )
+    args = (arch_name, diff_flags, basedump, mydump, base_key, limits)
+    fell_back = False
+    try:
+        with timings.stage("diff"):
+            if settings.DIFF_POOL_PROCESSES <= 0:
+                # Nothing can stop an in-process diff, so it isn't bounded at all
+                job = diff_worker.run_diff(
+                    arch_name, diff_flags, basedump, mydump, limits, base_key
+                )
+            elif has_algorithm_budget(diff_flags):
+                start = time.monotonic()
+                try:
+                    job = _run_on_pool(*args, settings.DIFF_ALGORITHM_BUDGET_SECONDS)
+                except (diff_worker.DiffTimeout, multiprocessing.TimeoutError):
+                    fell_back = True
+                    remaining = timeout - (time.monotonic() - start)
+                    job = _run_on_pool(
+                        arch_name,
+                        [*diff_flags, "-DIFFdifflib"],
+                        basedump,
+                        mydump,
+                        base_key,
+                        limits,
+                        remaining,
+                    )
+            else:
+                job = _run_on_pool(*args, timeout)
+    except (diff_worker.DiffTimeout, multiprocessing.TimeoutError):
+        metrics.TIMEOUTS.inc(DiffError.__name__)
+        raise DiffError(f"Diff took longer than {timeout} seconds")
+    except MemoryError:
+        raise DiffError("Diff used too much memory")
+    except Exception as e:
+        logger.exception("Error running asm-differ: %s", e)
+        raise DiffError(f"Error running asm-differ: {e}")
+
+    metrics.DIFFS.inc("difflib-fallback" if fell_back else job.algorithm)
+    current = timings.current()
+    if current is not None:
+        current.merge(job.timings)
+    for layer, outcome in job.timings.get("cache", {}).items():
+        metrics.CACHE_REQUESTS.inc(layer, outcome)
+    return job
+
 
 if TYPE_CHECKING:
     F = TypeVar("F")
@@ -85,40 +271,7 @@ class DiffWrapper:
     def create_config(
         arch: asm_differ.ArchSettings, diff_flags: list[str]
     ) -> asm_differ.Config:
-        show_rodata_refs = "-DIFFno_show_rodata_refs" not in diff_flags
-        algorithm = "difflib" if "-DIFFdifflib" in diff_flags else "levenshtein"
-        diff_function_symbols = "-DIFFdiff_function_symbols" in diff_flags
-
-        return asm_differ.Config(
-            arch=arch,
-            # Build/objdump options
-            diff_obj=True,
-            file="",
-            make=False,
-            source_old_binutils=True,
-            diff_section=".text",
-            inlines=False,
-            max_function_size_lines=MAX_FUNC_SIZE_LINES,
-            max_function_size_bytes=MAX_FUNC_SIZE_LINES * 4,
-            # Display options
-            formatter=asm_differ.PythonFormatter(arch_str=arch.name),
-            diff_mode=asm_differ.DiffMode.NORMAL,
-            base_shift=0,
-            skip_lines=0,
-            compress=None,
-            show_branches=True,
-            show_line_numbers=False,
-            show_source=False,
-            stop_at_ret=False,
-            ignore_large_imms=False,
-            ignore_addr_diffs=True,
-            algorithm=algorithm,
-            reg_categories={},
-            show_rodata_refs=show_rodata_refs,
-            diff_function_symbols=diff_function_symbols,
-            # Other
-            ref_file=None,
-        )
+        return diff_worker.create_config(arch, diff_flags)
 
     @staticmethod
     def get_objdump_target_function_flags(
@@ -130,16 +283,26 @@ class DiffWrapper:
         if platform.supports_objdump_disassemble:
             return [f"--disassemble={label}"]
 
+        try:
+            start_addr = elf.symbol_address(target_path.read_bytes(), label)
+        except elf.ElfError:
+            # e.g. COFF or OMF objects, fall back to nm
+            pass
+        else:
+            return [f"--start-address={start_addr or 0}"]
+
         if not platform.nm_cmd:
             raise NmError(f"No nm command for {platform.id}")
 
         try:
-            nm_proc = sandbox.run_subprocess(
-                [platform.nm_cmd] + [sandbox.rewrite_path(target_path)],
-                shell=True,
-                timeout=settings.OBJDUMP_TIMEOUT_SECONDS,
-            )
+            with timings.stage("nm"):
+                nm_proc = sandbox.run_subprocess(
+                    [platform.nm_cmd] + [sandbox.rewrite_path(target_path)],
+                    shell=True,
+                    timeout=settings.OBJDUMP_TIMEOUT_SECONDS,
+                )
         except subprocess.TimeoutExpired:
+            metrics.TIMEOUTS.inc(NmError.__name__)
             raise NmError("Timeout expired")
         except subprocess.CalledProcessError as e:
             raise NmError.from_process_error(e)
@@ -189,6 +352,8 @@ class DiffWrapper:
         label: str,
         objdump_flags: tuple[str, ...],
     ) -> str:
+        timings.cache_miss()
+
         flags = [
             flag for flag in objdump_flags if not flag.startswith(ASMDIFF_FLAG_PREFIX)
         ]
@@ -229,6 +394,7 @@ class DiffWrapper:
                         timeout=settings.OBJDUMP_TIMEOUT_SECONDS,
                     )
                 except subprocess.TimeoutExpired:
+                    metrics.TIMEOUTS.inc(ObjdumpError.__name__)
                     raise ObjdumpError("Timeout expired")
                 except subprocess.CalledProcessError as e:
                     raise ObjdumpError.from_process_error(e)
@@ -245,25 +411,28 @@ class DiffWrapper:
         diff_label: str,
         config: asm_differ.Config,
         diff_flags: list[str],
+        name: str = "dump",
     ) -> str:
         if len(elf_object) == 0:
             raise AssemblyError("Asm empty")
 
-        basedump = DiffWrapper.run_objdump(
-            elf_object,
-            platform,
-            tuple(config.arch.arch_flags),
-            diff_label,
-            tuple(diff_flags),
-        )
+        with timings.cache_lookup(f"objdump-{name}"):
+            basedump = DiffWrapper.run_objdump(
+                elf_object,
+                platform,
+                tuple(config.arch.arch_flags),
+                diff_label,
+                tuple(diff_flags),
+            )
         if not basedump:
             raise ObjdumpError("Error running objdump")
 
         # Preprocess the dump
         try:
-            basedump = asm_differ.preprocess_objdump_out(
-                None, elf_object, basedump, config
-            )
+            with timings.stage(f"preprocess-{name}"):
+                basedump = asm_differ.preprocess_objdump_out(
+                    None, elf_object, basedump, config
+                )
         except AssertionError as e:
             logger.exception("Error preprocessing dump: %s", e)
             raise DiffError(f"Error preprocessing dump: {e}")
@@ -274,12 +443,92 @@ class DiffWrapper:
         return basedump
 
     @staticmethod
-    def run_diff(
-        base_lines: list[str], my_lines: list[str], config: Any
-    ) -> dict[str, Any]:
-        diff_output = asm_differ.do_diff(base_lines, my_lines, config)
-        table_data = asm_differ.align_diffs(diff_output, diff_output, config)
-        return config.formatter.raw(table_data)
+    def target_dump_key(
+        target_assembly: Assembly,
+        platform: Platform,
+        diff_label: str,
+        config: asm_differ.Config,
+        diff_flags: list[str],
+    ) -> str:
+        key = [
+            TARGET_DUMP_VERSION,
+            target_assembly.hash,
+            platform.id,
+            platform.objdump_cmd,
+            config.arch.arch_flags,
+            diff_label,
+            sorted(set(diff_flags) - DIFF_ALGORITHM_FLAGS),
+        ]
+        return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def load_target_dump(key: str) -> AssemblyDump | None:
+        """
+        The target of a scratch never changes, so its preprocessed dump is
+        stored rather than being recreated on every compile.
+        """
+        try:
+            stored = AssemblyDump.objects.filter(key=key).first()
+            # Like stored objects, last_used only needs to be accurate enough
+            # for housekeeping to remove the dumps of scratches nobody compiles
+            timestamp = now()
+            if stored is not None and stored.last_used < timestamp - LAST_USED_INTERVAL:
+                AssemblyDump.objects.filter(key=key).update(last_used=timestamp)
+        except DatabaseError as e:
+            logger.warning("Error reading target dump: %s", e)
+            stored = None
+
+        timings.record_cache("target-dump", "miss" if stored is None else "hit")
+        return stored
+
+    @staticmethod
+    def store_target_dump(
+        key: str, target_assembly: Assembly, dump: str, max_score: int | None
+    ) -> None:
+        try:
+            AssemblyDump.objects.update_or_create(
+                key=key,
+                defaults={
+                    "assembly": target_assembly,
+                    "dump": dump,
+                    "max_score": max_score,
+                    "last_used": now(),
+                },
+            )
+        except DatabaseError as e:
+            logger.warning("Error storing target dump: %s", e)
+
+    @staticmethod
+    def is_exact_match(
+        target_elf: bytes,
+        compiled_elf: bytes,
+        platform: Platform,
+        diff_label: str,
+        objdump_flags: list[str],
+    ) -> bool:
+        """
+        Whether the function's bytes, relocations and labels are identical
+        in both objects, in which case diffing them can only give a perfect score
+        """
+        if not diff_label or not compiled_elf:
+            return False
+        if any(flag.startswith("--disassemble=") for flag in objdump_flags):
+            return False
+
+        # Mirror how much objdump will disassemble, see run_objdump
+        to_section_end = not platform.supports_objdump_disassemble
+        try:
+            with timings.stage("exact-match"):
+                target = elf.ElfFile(target_elf).function_signature(
+                    diff_label, to_section_end
+                )
+                compiled = elf.ElfFile(compiled_elf).function_signature(
+                    diff_label, to_section_end
+                )
+        except elf.ElfError:
+            return False
+
+        return target is not None and target == compiled
 
     @staticmethod
     def diff(
@@ -288,7 +537,12 @@ class DiffWrapper:
         diff_label: str,
         compiled_elf: bytes,
         diff_flags: list[str],
+        score_only: bool = False,
     ) -> DiffResult:
+        """
+        Diff the compiled object against the target. With `score_only`,
+        the result may only contain the score and not the diff rows.
+        """
         if platform == DUMMY:
             # Todo produce diff for dummy
             return DiffResult({"rows": ["a", "b"]})
@@ -303,21 +557,51 @@ class DiffWrapper:
 
         config = DiffWrapper.create_config(arch, diff_flags)
         warnings = []
-        try:
-            basedump = DiffWrapper.get_dump(
+
+        target_dump_key = DiffWrapper.target_dump_key(
+            target_assembly, platform, diff_label, config, diff_flags
+        )
+        stored = DiffWrapper.load_target_dump(target_dump_key)
+
+        if (
+            score_only
+            and stored is not None
+            and stored.max_score is not None
+            and DiffWrapper.is_exact_match(
+                bytes(target_assembly.elf_object),
+                compiled_elf,
+                platform,
+                diff_label,
+                objdump_flags,
+            )
+        ):
+            timings.record_cache("exact-match", "hit")
+            return DiffResult({"current_score": 0, "max_score": stored.max_score})
+
+        basedump = stored.dump if stored is not None else None
+
+        # Dump the target on the pool while the compiled object is dumped here
+        target_future: Future[str] | None = None
+        if basedump is None:
+            target_future = _submit(
+                DiffWrapper.get_dump,
                 bytes(target_assembly.elf_object),
                 platform,
                 diff_label,
                 config,
                 objdump_flags,
+                name="target",
             )
-        except Exception as e:
-            logger.exception("Error dumping target assembly: %s", e)
-            raise DiffError(f"Error dumping target assembly: {e}")
+
         if compiled_elf:
             try:
                 mydump = DiffWrapper.get_dump(
-                    compiled_elf, platform, diff_label, config, objdump_flags
+                    compiled_elf,
+                    platform,
+                    diff_label,
+                    config,
+                    objdump_flags,
+                    name="compiled",
                 )
             except Exception as e:
                 logger.exception("Error dumping compiled assembly: %s", e)
@@ -326,20 +610,38 @@ class DiffWrapper:
         else:
             mydump = ""
 
-        try:
-            base_lines = asm_differ.process(basedump, config)
-            my_lines = asm_differ.process(mydump, config)
-            result = DiffWrapper.run_diff(base_lines, my_lines, config)
-            diff_result = DiffResult(result)
-            if any(x.startswith("--disassemble=") for x in objdump_flags):
-                if len(base_lines) and len(my_lines) == 0:
-                    warnings.append(
-                        "Warning: No diff rows. Is your function signature correct?"
-                    )
-            if warnings:
-                diff_result.errors = "\n".join(warnings)
-        except Exception as e:
-            logger.exception("Error running asm-differ: %s", e)
-            raise DiffError(f"Error running asm-differ: {e}")
+        if target_future is not None:
+            try:
+                basedump = target_future.result()
+            except Exception as e:
+                logger.exception("Error dumping target assembly: %s", e)
+                raise DiffError(f"Error dumping target assembly: {e}")
+        assert basedump is not None
+
+        job = run_diff_job(arch.name, diff_flags, basedump, mydump, target_dump_key)
+        result = job.result
+        diff_result = DiffResult(result)
+        metrics.DIFF_ROWS.observe(len(result.get("rows", [])))
+        if any(x.startswith("--disassemble=") for x in objdump_flags):
+            if job.base_line_count and job.my_line_count == 0:
+                warnings.append(
+                    "Warning: No diff rows. Is your function signature correct?"
+                )
+        if job.algorithm == "difflib" and not (
+            {"-DIFFdifflib", "-DIFFauto"} & set(diff_flags)
+        ):
+            warnings.append(
+                "Warning: Levenshtein took too long, so difflib was used instead"
+            )
+        if warnings:
+            diff_result.errors = "\n".join(warnings)
+
+        # The max score only depends on the target, so remember it to allow
+        # score_only diffs of exact matches to skip diffing
+        max_score = result.get("max_score")
+        if stored is None or stored.max_score != max_score:
+            DiffWrapper.store_target_dump(
+                target_dump_key, target_assembly, basedump, max_score
+            )
 
         return diff_result
@@ -0,0 +1,261 @@
+"""
+Minimal ELF reader, used to avoid running nm and objdump where possible.
+
+Only section headers, symbol tables, string tables and relocations are read.
+Both 32 and 64-bit objects of either endianness are supported.
+"""
+
+import struct
+from collections.abc import Iterator
+from typing import NamedTuple
+
+ELF_MAGIC = b"\x7fELF"
+
+ELFCLASS32 = 1
+ELFCLASS64 = 2
+ELFDATA2LSB = 1
+ELFDATA2MSB = 2
+
+SHT_SYMTAB = 2
+SHT_RELA = 4
+SHT_NOBITS = 8
+SHT_REL = 9
+SHN_UNDEF = 0
+
+STT_SECTION = 3
+STT_FILE = 4
+
+
+class ElfError(Exception):
+    pass
+
+
+class Section(NamedTuple):
+    name: int
+    type: int
+    offset: int
+    size: int
+    link: int
+    info: int
+    entsize: int
+
+
+class Symbol(NamedTuple):
+    name: str
+    value: int
+    size: int
+    type: int
+    shndx: int
+
+
+class Relocation(NamedTuple):
+    offset: int
+    type: int
+    symbol: int
+    addend: int
+
+
+class FunctionSignature(NamedTuple):
+    """
+    Everything that determines the disassembly of a function:
+    its bytes, relocations and any labels within it, relative to its start
+    """
+
+    data: bytes
+    relocations: tuple[tuple[int, int, str, int], ...]
+    labels: tuple[tuple[int, str], ...]
+
+
+class ElfFile:
+    def __init__(self, data: bytes):
+        if data[:4] != ELF_MAGIC:
+            raise ElfError("Not an ELF object")
+
+        elf_class, elf_data = data[4], data[5]
+        if elf_data == ELFDATA2LSB:
+            self.endian = "<"
+        elif elf_data == ELFDATA2MSB:
+            self.endian = ">"
+        else:
+            raise ElfError(f"Unknown ELF data encoding {elf_data}")
+
+        if elf_class not in (ELFCLASS32, ELFCLASS64):
+            raise ElfError(f"Unknown ELF class {elf_class}")
+        self.is_64 = elf_class == ELFCLASS64
+
+        self.raw = data
+        self.data = memoryview(data)
+        try:
+            self.sections = self._read_sections()
+            self.symbols = self._read_symbols()
+        except (struct.error, IndexError) as e:
+            raise ElfError(f"Malformed ELF object: {e}")
+
+    def _unpack(self, fmt: str, offset: int) -> tuple[int, ...]:
+        return struct.unpack_from(self.endian + fmt, self.data, offset)
+
+    def _read_sections(self) -> list[Section]:
+        if self.is_64:
+            shoff, shentsize, shnum, self.shstrndx = self._unpack("Q10xHHH", 0x28)
+            section_fmt = "IIQQQQIIQQ"
+        else:
+            shoff, shentsize, shnum, self.shstrndx = self._unpack("I10xHHH", 0x20)
+            section_fmt = "IIIIIIIIII"
+
+        if shoff == 0 or shentsize < struct.calcsize(section_fmt):
+            raise ElfError("No section headers")
+
+        # Extended section numbering: the real count is in section 0
+        if shnum == 0:
+            shnum = self._unpack(section_fmt, shoff)[5]
+
+        sections = []
+        for i in range(shnum):
+            name, type, _, _, offset, size, link, info, _, entsize = self._unpack(
+                section_fmt, shoff + i * shentsize
+            )
+            sections.append(Section(name, type, offset, size, link, info, entsize))
+        return sections
+
+    def _string(self, strtab: Section, offset: int) -> str:
+        start = strtab.offset + offset
+        limit = min(strtab.offset + strtab.size, len(self.raw))
+        end = self.raw.find(b"\0", start, limit)
+        if end == -1:
+            end = limit
+        return self.raw[start:end].decode("utf-8", errors="replace")
+
+    def _read_symbols(self) -> list[Symbol]:
+        symtab = next((s for s in self.sections if s.type == SHT_SYMTAB), None)
+        if symtab is None:
+            return []
+
+        sym_fmt = "IBBHQQ" if self.is_64 else "IIIBBH"
+        if symtab.entsize < struct.calcsize(sym_fmt):
+            raise ElfError("Malformed symbol table")
+        strtab = self.sections[symtab.link]
+
+        symbols = []
+        for offset in range(symtab.offset, symtab.offset + symtab.size, symtab.entsize):
+            if self.is_64:
+                name, info, _, shndx, value, size = self._unpack(sym_fmt, offset)
+            else:
+                name, value, size, info, _, shndx = self._unpack(sym_fmt, offset)
+            symbols.append(
+                Symbol(self._string(strtab, name), value, size, info & 0xF, shndx)
+            )
+        return symbols
+
+    def section_name(self, index: int) -> str:
+        return self._string(self.sections[self.shstrndx], self.sections[index].name)
+
+    def section_data(self, index: int) -> memoryview:
+        section = self.sections[index]
+        if section.type == SHT_NOBITS:
+            return memoryview(bytes(section.size))
+        return self.data[section.offset : section.offset + section.size]
+
+    def relocations(self, index: int) -> Iterator[Relocation]:
+        """
+        Relocations that apply to section `index`
+        """
+        for section in self.sections:
+            if section.type not in (SHT_REL, SHT_RELA) or section.info != index:
+                continue
+
+            is_rela = section.type == SHT_RELA
+            if self.is_64:
+                fmt = "QQq" if is_rela else "QQ"
+            else:
+                fmt = "IIi" if is_rela else "II"
+            if section.entsize < struct.calcsize(fmt):
+                raise ElfError("Malformed relocation section")
+
+            for offset in range(
+                section.offset, section.offset + section.size, section.entsize
+            ):
+                entry = self._unpack(fmt, offset)
+                r_offset, r_info = entry[0], entry[1]
+                addend = entry[2] if is_rela else 0
+                if self.is_64:
+                    sym, type = r_info >> 32, r_info & 0xFFFFFFFF
+                else:
+                    sym, type = r_info >> 8, r_info & 0xFF
+                yield Relocation(r_offset, type, sym, addend)
+
+    def find_symbol(self, name: str) -> Symbol | None:
+        """
+        Find the defined symbol `name`, skipping the kinds that nm doesn't list
+        """
+        for symbol in self.symbols:
+            if (
+                symbol.name == name
+                and symbol.shndx != SHN_UNDEF
+                and symbol.type not in (STT_SECTION, STT_FILE)
+            ):
+                return symbol
+        return None
+
+    def function_signature(
+        self, name: str, to_section_end: bool
+    ) -> FunctionSignature | None:
+        """
+        Extract what objdump would disassemble for the symbol `name`:
+        up to the next symbol, or to the end of its section if `to_section_end`.
+        """
+        try:
+            return self._function_signature(name, to_section_end)
+        except (struct.error, IndexError) as e:
+            raise ElfError(f"Malformed ELF object: {e}")
+
+    def _function_signature(
+        self, name: str, to_section_end: bool
+    ) -> FunctionSignature | None:
+        symbol = self.find_symbol(name)
+        if symbol is None or symbol.shndx >= len(self.sections):
+            return None
+
+        section_data = self.section_data(symbol.shndx)
+        start, end = symbol.value, len(section_data)
+
+        in_section = [
+            s
+            for s in self.symbols
+            if s.shndx == symbol.shndx and s.type not in (STT_SECTION, STT_FILE)
+        ]
+        if not to_section_end:
+            end = min((s.value for s in in_section if s.value > start), default=end)
+
+        if start > end:
+            raise ElfError(f"Symbol {name} is outside of its section")
+
+        relocations = []
+        for reloc in self.relocations(symbol.shndx):
+            if start <= reloc.offset < end:
+                target = self.symbols[reloc.symbol]
+                if target.type == STT_SECTION:
+                    target_name = self.section_name(target.shndx)
+                else:
+                    target_name = target.name
+                relocations.append(
+                    (reloc.offset - start, reloc.type, target_name, reloc.addend)
+                )
+
+        labels = sorted(
+            (s.value - start, s.name) for s in in_section if start <= s.value < end
+        )
+
+        return FunctionSignature(
+            bytes(section_data[start:end]), tuple(sorted(relocations)), tuple(labels)
+        )
+
+
+def symbol_address(data: bytes, name: str) -> int | None:
+    """
+    Return the value of the defined symbol `name`, as nm would show it,
+    or None if the object has no such symbol.
+
+    Raises ElfError if `data` is not a well-formed ELF object.
+    """
+    symbol = ElfFile(data).find_symbol(name)
+    return symbol.value if symbol else None
@@ -6,6 +6,8 @@ from rest_framework.response import Response
 from rest_framework.status import HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERROR
 from rest_framework.views import exception_handler
 
+from . import metrics
+
 
 def custom_exception_handler(exc: Exception, context: Any) -> Response | None:
     # Call REST framework's default exception handler first,
@@ -42,6 +44,7 @@ class SubprocessError(Exception):
 
     def __init__(self, message: str):
         self.msg = f"{self.SUBPROCESS_NAME} error: {message}"
+        metrics.SUBPROCESS_ERRORS.inc(self.__class__.__name__)
 
         super().__init__(self.msg)
         self.stdout = ""
@@ -1,9 +1,21 @@
+from typing import TypeVar
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Case, Expression, Model, Q, QuerySet, Value, When
+from django.db.models.functions import Length
 from rest_framework.filters import SearchFilter
 from rest_framework.request import Request
 from rest_framework.serializers import ValidationError
 
 MAX_SEARCH_QUERY_LENGTH = 64
 
+# See ranked_search
+MAX_RANKED_CANDIDATES = 1000
+MIN_RANKED_QUERY_LENGTH = 3
+
+M = TypeVar("M", bound=Model)
+
 
 def validate_search_query(query: str) -> str:
     if len(query) > MAX_SEARCH_QUERY_LENGTH:
@@ -21,3 +33,43 @@ class NonEmptySearchFilter(SearchFilter):
 
         params = super().get_search_terms(request)
         return [term for term in params if term.strip() != ""]
+
+
+def ranked_search(queryset: QuerySet[M], field: str, query: str) -> QuerySet[M]:
+    """
+    Filter the queryset to rows whose `field` contains the query, best matches
+    first: prefix matches, then (on PostgreSQL) the most similar, then the
+    shortest. The lookups are served by the pg_trgm indexes of migration 0080
+    on PostgreSQL.
+
+    Only the first MAX_RANKED_CANDIDATES prefix and other matches are ranked,
+    so that common queries don't sort every match, and queries shorter than a
+    trigram aren't ranked at all, as the indexes can't find their matches.
+    """
+    if not query.strip():
+        return queryset
+
+    matches = queryset.filter(**{f"{field}__icontains": query})
+    if len(query) < MIN_RANKED_QUERY_LENGTH:
+        return matches.order_by()
+
+    prefix_candidates = (
+        queryset.filter(**{f"{field}__istartswith": query})
+        .order_by()
+        .values("pk")[:MAX_RANKED_CANDIDATES]
+    )
+    candidates = matches.order_by().values("pk")[:MAX_RANKED_CANDIDATES]
+
+    ordering: list[Expression] = [
+        Case(
+            When(**{f"{field}__istartswith": query}, then=Value(0)),
+            default=Value(1),
+        )
+    ]
+    if connection.vendor == "postgresql":
+        ordering.append(TrigramWordSimilarity(query, field).desc())
+    ordering.append(Length(field).asc())
+
+    return queryset.filter(Q(pk__in=prefix_candidates) | Q(pk__in=candidates)).order_by(
+        *ordering
+    )
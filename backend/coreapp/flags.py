@@ -210,7 +210,11 @@ COMMON_IDO_FLAGS: Flags = [
 COMMON_DIFF_FLAGS: Flags = [
     FlagSet(
         id="diff_algorithm",
-        flags=[ASMDIFF_FLAG_PREFIX + "levenshtein", ASMDIFF_FLAG_PREFIX + "difflib"],
+        flags=[
+            ASMDIFF_FLAG_PREFIX + "levenshtein",
+            ASMDIFF_FLAG_PREFIX + "difflib",
+            ASMDIFF_FLAG_PREFIX + "auto",
+        ],
     ),
     Checkbox("diff_function_symbols", ASMDIFF_FLAG_PREFIX + "diff_function_symbols"),
     IntOrHexParameterFlag("adjust_vma", "--adjust-vma"),
@@ -201,6 +201,69 @@ def remove_unchanged_same_author_forks(
     return perform_delete(to_delete, dry_run=dry_run)
 
 
+def remove_old_compile_jobs(
+    cutoff_datetime: datetime.datetime, dry_run: bool = False
+) -> int:
+    CompileJob = get_model("CompileJob")
+
+    to_delete = CompileJob.objects.filter(creation_time__lt=cutoff_datetime)
+    return perform_delete(to_delete, dry_run=dry_run)
+
+
+def remove_old_compile_snapshots(
+    cutoff_datetime: datetime.datetime, dry_run: bool = False
+) -> int:
+    CompileSnapshot = get_model("CompileSnapshot")
+
+    # Taken again by the next view, so that the objects of scratches that are
+    # no longer viewed can be removed
+    to_delete = CompileSnapshot.objects.filter(creation_time__lt=cutoff_datetime)
+    return perform_delete(to_delete, dry_run=dry_run)
+
+
+def remove_unused_stored_objects(
+    cutoff_datetime: datetime.datetime, dry_run: bool = False
+) -> int:
+    StoredObject = get_model("StoredObject")
+    CompileSnapshot = get_model("CompileSnapshot")
+
+    # Objects of compile snapshots are served without being stored again
+    in_snapshot = CompileSnapshot.objects.filter(
+        Q(left_object_hash=OuterRef("pk")) | Q(right_object_hash=OuterRef("pk"))
+    )
+    to_delete = StoredObject.objects.filter(last_used__lt=cutoff_datetime).exclude(
+        Exists(in_snapshot)
+    )
+    return perform_delete(to_delete, dry_run=dry_run)
+
+
+def remove_unused_assembly_dumps(
+    cutoff_datetime: datetime.datetime, dry_run: bool = False
+) -> int:
+    AssemblyDump = get_model("AssemblyDump")
+
+    # Dumped again by the next compile of their scratch
+    to_delete = AssemblyDump.objects.filter(last_used__lt=cutoff_datetime)
+    return perform_delete(to_delete, dry_run=dry_run)
+
+
+def remove_expired_sessions(
+    cutoff_datetime: datetime.datetime, dry_run: bool = False
+) -> int:
+    from .sessions import expired_sessions
+
+    # Sessions expire at their own expiry date rather than the cutoff
+    return perform_delete(expired_sessions(), dry_run=dry_run)
+
+
+def reconcile_scratch_counts(
+    cutoff_datetime: datetime.datetime, dry_run: bool = False
+) -> int:
+    from . import scratch_counts
+
+    return scratch_counts.reconcile(dry_run=dry_run)
+
+
 HOUSEKEEPING_TASKS = [
     ("Owner-less Scratches", remove_ownerless_scratches),
     ("Scratch-less Profiles", remove_anonymous_profiles),
@@ -209,4 +272,10 @@ HOUSEKEEPING_TASKS = [
     ("Orphan Asms", remove_orphan_asms),
     ("Unchanged Anonymous Forks", remove_unchanged_anonymous_forks),
     ("Unchanged Same-Author Forks", remove_unchanged_same_author_forks),
+    ("Old Compile Jobs", remove_old_compile_jobs),
+    ("Old Compile Snapshots", remove_old_compile_snapshots),
+    ("Unused Stored Objects", remove_unused_stored_objects),
+    ("Unused Assembly Dumps", remove_unused_assembly_dumps),
+    ("Expired Sessions", remove_expired_sessions),
+    ("Drifted Scratch Counts", reconcile_scratch_counts),
 ]
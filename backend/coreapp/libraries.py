@@ -1,3 +1,4 @@
+import hashlib
 from dataclasses import dataclass
 from functools import cache
 from pathlib import Path
@@ -66,3 +67,19 @@ def available_libraries() -> list[LibraryVersions]:
                 )
 
     return results
+
+
+@cache
+def response_tag() -> str:
+    """
+    Tag of the cached responses that include the available libraries, which
+    differ between hosts depending on what's been installed
+    """
+    versions = "\n".join(
+        sorted(
+            f"{lib.platform}/{lib.name}/{version}"
+            for lib in available_libraries()
+            for version in lib.supported_versions
+        )
+    )
+    return f"libraries:{hashlib.sha256(versions.encode()).hexdigest()}"
@@ -0,0 +1,393 @@
+"""
+Prometheus-style metrics for the compile/diff pipeline.
+
+Every process (gunicorn and compile workers alike) keeps its own values in
+memory and periodically writes them to a file in METRICS_DIR. The
+/api/metrics endpoint merges the files of all processes, so it reports totals
+for the whole backend rather than for whichever worker served the scrape.
+Counters and histograms of processes that have exited are kept; gauges only
+count processes that are still alive. When merging, the files of exited
+processes are folded into a single EXITED_FILE and removed, so they don't
+accumulate as workers are restarted.
+"""
+
+import atexit
+import fcntl
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, ClassVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 5
+
+# Holds the counters and histograms of processes that have exited
+EXITED_FILE = "exited.json"
+LOCK_FILE = ".lock"
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+Labels = tuple[str, ...]
+
+
+class Metric:
+    TYPE: ClassVar[str]
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: "Registry | None" = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self.values: dict[Labels, Any] = {}
+        self.registry.register(self)
+
+    def _key(self, labelvalues: Sequence[str]) -> Labels:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(v) for v in labelvalues)
+
+    def merge(self, into: dict[Labels, Any], labels: Labels, value: Any) -> None:
+        into[labels] = into.get(labels, 0.0) + value
+
+    def samples(
+        self, values: dict[Labels, Any]
+    ) -> Iterator[tuple[str, dict[str, str], float]]:
+        for labels, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labelnames, labels)), value
+
+
+class Counter(Metric):
+    TYPE = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        key = self._key(labelvalues)
+        with self.registry.updating():
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    TYPE = "gauge"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        key = self._key(labelvalues)
+        with self.registry.updating():
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    @contextmanager
+    def track_inprogress(self, *labelvalues: str) -> Iterator[None]:
+        self.inc(*labelvalues)
+        try:
+            yield
+        finally:
+            self.dec(*labelvalues)
+
+
+class Histogram(Metric):
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: "Registry | None" = None,
+    ):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        key = self._key(labelvalues)
+        with self.registry.updating():
+            # Per-bucket (not cumulative) counts followed by the sum
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0.0] * (len(self.buckets) + 1)
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def merge(self, into: dict[Labels, Any], labels: Labels, value: Any) -> None:
+        counts = into.setdefault(labels, [0.0] * len(value))
+        for i, v in enumerate(value):
+            counts[i] += v
+
+    def samples(
+        self, values: dict[Labels, Any]
+    ) -> Iterator[tuple[str, dict[str, str], float]]:
+        for labels, counts in sorted(values.items()):
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                yield f"{self.name}_bucket", {**base, "le": le}, cumulative
+            yield f"{self.name}_sum", base, counts[-1]
+            yield f"{self.name}_count", base, cumulative
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+        self._lock = threading.RLock()
+        self._pid: int | None = None
+        self._path: Path | None = None
+        self._dirty = False
+
+    def register(self, metric: Metric) -> None:
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self.metrics[metric.name] = metric
+
+    @contextmanager
+    def updating(self) -> Iterator[None]:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            yield
+            self._dirty = True
+
+    def _start(self) -> None:
+        # Values inherited from a parent process across fork() belong to
+        # the parent, which reports them itself
+        for metric in self.metrics.values():
+            metric.values.clear()
+        self._pid = os.getpid()
+        self._path = None
+
+        metrics_dir = settings.METRICS_DIR
+        if not metrics_dir:
+            return
+
+        self._path = Path(metrics_dir) / f"{self._pid}-{uuid.uuid4().hex}.json"
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            logger.warning("Error creating metrics directory: %s", e)
+        threading.Thread(target=self._flush_periodically, daemon=True).start()
+        atexit.register(self._flush_if_dirty)
+
+    def _flush_if_dirty(self) -> None:
+        if self._dirty:
+            self.flush()
+
+    def _flush_periodically(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            self._flush_if_dirty()
+
+    def _snapshot(self) -> dict[str, list[Any]]:
+        with self._lock:
+            return {
+                name: [[list(labels), value] for labels, value in metric.values.items()]
+                for name, metric in self.metrics.items()
+                if metric.values
+            }
+
+    def flush(self) -> None:
+        if self._path is None or self._pid != os.getpid():
+            return
+
+        self._dirty = False
+        data = {"pid": self._pid, "metrics": self._snapshot()}
+        try:
+            tmp_path = self._path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(data))
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            logger.warning("Error writing metrics: %s", e)
+
+    def collect(self) -> dict[str, dict[Labels, Any]]:
+        """
+        Merge the values of every process that has written to METRICS_DIR
+        """
+        metrics_dir = settings.METRICS_DIR
+        if not metrics_dir:
+            # Only this process's values are available
+            with self._lock:
+                return {
+                    name: {
+                        labels: value.copy() if isinstance(value, list) else value
+                        for labels, value in metric.values.items()
+                    }
+                    for name, metric in self.metrics.items()
+                }
+
+        self.flush()
+
+        directory = Path(metrics_dir)
+        with open(directory / LOCK_FILE, "a") as lock:
+            # Only one process folds exited processes' files at a time
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            return self._merge_files(directory)
+
+    def _merge_files(self, directory: Path) -> dict[str, dict[Labels, Any]]:
+        exited_path = directory / EXITED_FILE
+        exited: dict[str, dict[Labels, Any]] = {}
+        merged: dict[str, dict[Labels, Any]] = {}
+        removable = []
+        for path in directory.glob("*.json"):
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning("Error reading metrics from %s: %s", path, e)
+                continue
+
+            alive = path != exited_path and _pid_alive(data["pid"])
+            if not alive and path != exited_path:
+                removable.append(path)
+            for name, values in data["metrics"].items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                if alive:
+                    into = merged.setdefault(name, {})
+                elif isinstance(metric, Gauge):
+                    continue
+                else:
+                    into = exited.setdefault(name, {})
+                for labels, value in values:
+                    metric.merge(into, tuple(labels), value)
+
+        if removable:
+            data = {
+                "pid": None,
+                "metrics": {
+                    name: [[list(labels), value] for labels, value in values.items()]
+                    for name, values in exited.items()
+                },
+            }
+            try:
+                tmp_path = exited_path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps(data))
+                os.replace(tmp_path, exited_path)
+                for path in removable:
+                    path.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning("Error writing metrics: %s", e)
+
+        for name, values in exited.items():
+            into = merged.setdefault(name, {})
+            for labels, value in values.items():
+                self.metrics[name].merge(into, labels, value)
+        return merged
+
+    def exposition(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format
+        """
+        collected = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.TYPE}")
+            for sample, labels, value in metric.samples(collected.get(name, {})):
+                if labels:
+                    label_str = ",".join(
+                        f'{k}="{_escape(v)}"' for k, v in labels.items()
+                    )
+                    sample = f"{sample}{{{label_str}}}"
+                lines.append(f"{sample} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+COMPILES = Counter(
+    "decompme_compiles_total",
+    "Compilations run (i.e. not served from the compilation cache)",
+    ["compiler"],
+)
+COMPILE_DURATION = Histogram(
+    "decompme_compile_duration_seconds",
+    "Time spent running the compiler",
+    ["compiler"],
+)
+SUBPROCESS_ERRORS = Counter(
+    "decompme_subprocess_errors_total",
+    "Errors raised by compilers, assemblers and diff tooling",
+    ["kind"],
+)
+TIMEOUTS = Counter(
+    "decompme_timeouts_total",
+    "Subprocesses killed for exceeding their timeout",
+    ["kind"],
+)
+SANDBOX_IN_FLIGHT = Gauge(
+    "decompme_sandbox_runs_in_progress",
+    "Sandboxed subprocesses currently running",
+)
+CACHE_REQUESTS = Counter(
+    "decompme_cache_requests_total",
+    "Lookups in the compilation, assembly, objdump and response caches",
+    ["cache", "result"],
+)
+DIFF_ROWS = Histogram(
+    "decompme_diff_rows",
+    "Number of rows in each diff",
+    buckets=(10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000),
+)
+DIFFS = Counter(
+    "decompme_diffs_total",
+    "Diffs run, by the algorithm that was used",
+    ["algorithm"],
+)
+REQUEST_DURATION = Histogram(
+    "decompme_request_duration_seconds",
+    "Time spent handling each request",
+    ["view", "method"],
+)
+REQUESTS = Counter(
+    "decompme_requests_total",
+    "Requests handled",
+    ["view", "method", "status"],
+)
@@ -1,19 +1,26 @@
 import logging
 import re
+import time
 from collections.abc import Callable
 from typing import TYPE_CHECKING
 
+from django.conf import settings
 from django.contrib import auth
 from django.contrib.auth.models import User
 from django.http.request import HttpRequest
-from django.utils.timezone import now
 from rest_framework.request import Request as DRFRequest
 from rest_framework.response import Response
 
-from .models.profile import Profile
+from . import metrics, presence, timings
+from .models.profile import Profile, generate_pseudonym
 
 logger = logging.getLogger(__name__)
 
+KNOWN_METHODS = {"GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"}
+
+# Signed cookie with the pseudonym of a profile that hasn't been saved yet
+PLACEHOLDER_COOKIE = "profile_placeholder"
+
 if TYPE_CHECKING:
     pass
 
@@ -27,6 +34,7 @@ if TYPE_CHECKING:
     class Request(DRFRequest):
         user: User | AnonymousUser
         profile: Profile
+        profile_is_placeholder: bool
 
 else:
     Request = DRFRequest
@@ -42,28 +50,74 @@ def disable_csrf(
     return middleware
 
 
-def is_public_get_request(req: Request) -> bool:
-    public_paths = [
-        "/api/compiler",
-        "/api/healthz$",
-        "/api/library",
-        "/api/platform",
-        "/api/preset",
-        "/api/scratch-count$",
-        "/api/scratch/[A-Za-z0-9]+/compile$",
-        "/api/scratch/[A-Za-z0-9]+/export$",
-        "/api/scratch/[A-Za-z0-9]+/family$",
-        "/api/scratch/[A-Za-z0-9]+$",
-        "/api/scratch$",
-        "/api/search$",
-        "/api/stats$",
-        "/api/users",
-    ]
-    for path in public_paths:
-        if req.method == "GET" and re.match(path, req.path):
-            return True
-
-    return False
+def server_timing(
+    get_response: Callable[[HttpRequest], Response],
+) -> Callable[[HttpRequest], Response]:
+    """
+    Reports how long each stage of handling the request took in a Server-Timing
+    header, so slow stages show up in browser devtools and the nginx access log.
+    """
+
+    def middleware(request: HttpRequest) -> Response:
+        with timings.collect() as request_timings, timings.stage("total"):
+            response = get_response(request)
+        response["Server-Timing"] = request_timings.server_timing()
+        return response
+
+    return middleware
+
+
+def request_metrics(
+    get_response: Callable[[HttpRequest], Response],
+) -> Callable[[HttpRequest], Response]:
+    def middleware(request: HttpRequest) -> Response:
+        start = time.perf_counter()
+        response = get_response(request)
+        duration = time.perf_counter() - start
+
+        # Label by route rather than path to keep the number of series bounded
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        method = request.method if request.method in KNOWN_METHODS else "other"
+
+        metrics.REQUEST_DURATION.observe(duration, view, method)
+        metrics.REQUESTS.inc(view, method, str(response.status_code))
+        return response
+
+    return middleware
+
+
+# Paths whose GET responses are the same for everyone, see strip_session.
+# Compile jobs are found by their random id, which only whoever submitted the
+# job knows, and objects by their hash, so neither needs to know who asks.
+PUBLIC_GET_PATHS = re.compile(
+    "|".join(
+        f"(?:{path})"
+        for path in [
+            "/api/compile-job/[0-9a-f-]+$",
+            "/api/compiler",
+            "/api/healthz$",
+            "/api/library",
+            "/api/metrics$",
+            "/api/object/[0-9a-f]+$",
+            "/api/platform",
+            "/api/preset",
+            "/api/scratch-count$",
+            "/api/scratch/[A-Za-z0-9]+/compile$",
+            "/api/scratch/[A-Za-z0-9]+/export$",
+            "/api/scratch/[A-Za-z0-9]+/family$",
+            "/api/scratch/[A-Za-z0-9]+$",
+            "/api/scratch$",
+            "/api/search$",
+            "/api/stats$",
+            "/api/users",
+        ]
+    )
+)
+
+
+def is_public_get_request(req: HttpRequest) -> bool:
+    return req.method == "GET" and PUBLIC_GET_PATHS.match(req.path) is not None
 
 
 def is_ephemeral_profile_request(req: Request) -> bool:
@@ -82,6 +136,11 @@ def set_user_profile(
     """
 
     def middleware(request: Request) -> Response:
+        # Avoid looking up profiles for public endpoints
+        if is_public_get_request(request):
+            request.profile = Profile()
+            return get_response(request)
+
         user_agent = request.headers.get("User-Agent", "")
         bot_signatures = [
             "node",
@@ -127,35 +186,38 @@ def set_user_profile(
                 if profile and profile.user and request.user.is_anonymous:
                     request.user = profile.user
 
-        # Avoid creating persistent profiles for public endpoints
-        if not profile and is_public_get_request(request):
-            request.profile = Profile()
-            return get_response(request)
-
-        # Create new profile if none found
+        # Only save new profiles once they're needed, see materialize_profile
         if not profile:
-            profile = Profile(
-                user=request.user if request.user.is_authenticated else None
+            pseudonym = request.get_signed_cookie(
+                PLACEHOLDER_COOKIE,
+                default=None,
+                salt=PLACEHOLDER_COOKIE,
+                max_age=settings.SESSION_COOKIE_AGE,
             )
-
-            profile.save()
-            request.session["profile_id"] = profile.id
-
-            # More info to help identify why we are creating so many profiles...
-            x_forwarded_for = request.headers.get("X-Forwarded-For", "n/a")
-            logger.debug(
-                "Made new profile: User-Agent: %s, IP: %s, name: %s, request path: %s",
-                user_agent,
-                x_forwarded_for,
-                profile,
-                request.path,
+            request.profile = Profile(
+                user=request.user if request.user.is_authenticated else None,
+                pseudonym=pseudonym or generate_pseudonym(),
             )
+            request.profile_is_placeholder = True
+
+            response = get_response(request)
+            if not request.profile_is_placeholder:
+                # Saved, or replaced by logging in
+                response.delete_cookie(PLACEHOLDER_COOKIE)
+            elif pseudonym is None:
+                # Keeps the pseudonym the same until the profile is saved
+                response.set_signed_cookie(
+                    PLACEHOLDER_COOKIE,
+                    request.profile.pseudonym,
+                    salt=PLACEHOLDER_COOKIE,
+                    max_age=settings.SESSION_COOKIE_AGE,
+                    secure=settings.SESSION_COOKIE_SECURE,
+                    httponly=True,
+                    samesite=settings.SESSION_COOKIE_SAMESITE,
+                )
+            return response
 
-        # Update last seen timestamp if more than a minute since last updated
-        last_request_date = profile.last_request_date
-        profile.last_request_date = now()
-        if (profile.last_request_date - last_request_date).total_seconds() > 60:
-            profile.save(update_fields=["last_request_date"])
+        presence.seen(profile)
 
         request.profile = profile
 
@@ -164,6 +226,42 @@ def set_user_profile(
     return middleware
 
 
+def set_profile(request: Request, profile: Profile, is_placeholder: bool) -> None:
+    """
+    Replace the request's profile, e.g. on logging in or out. Views are given
+    a DRF request that wraps the one seen by set_user_profile, so both are
+    updated for it to keep or remove the placeholder cookie accordingly.
+    """
+    for r in (request, getattr(request, "_request", request)):
+        r.profile = profile
+        r.profile_is_placeholder = is_placeholder
+
+
+def materialize_profile(request: Request) -> Profile:
+    """
+    Save the request's placeholder profile, if it has one, for actions that
+    need a persistent profile, e.g. owning a scratch. Other unsaved profiles,
+    e.g. of bots, are returned as they are.
+    """
+    profile = request.profile
+    if not getattr(request, "profile_is_placeholder", False):
+        return profile
+
+    profile.save()
+    set_profile(request, profile, is_placeholder=False)
+    request.session["profile_id"] = profile.id
+
+    # More info to help identify why we are creating so many profiles...
+    logger.debug(
+        "Made new profile: User-Agent: %s, IP: %s, name: %s, request path: %s",
+        request.headers.get("User-Agent", ""),
+        request.headers.get("X-Forwarded-For", "n/a"),
+        profile,
+        request.path,
+    )
+    return profile
+
+
 def strip_cookie_vary(
     get_response: Callable[[HttpRequest], Response],
 ) -> Callable[[Request], Response]:
@@ -185,10 +283,19 @@ def strip_cookie_vary(
 def strip_session(
     get_response: Callable[[HttpRequest], Response],
 ) -> Callable[[Request], Response]:
+    """
+    Handles public GET requests without a session, as their responses are the
+    same for everyone. Without the session cookie, the session isn't loaded or
+    saved, the user isn't looked up and no cookies are set.
+    """
+
     def middleware(request: Request) -> Response:
+        if not is_public_get_request(request):
+            return get_response(request)
+
+        request.COOKIES.pop(settings.SESSION_COOKIE_NAME, None)
         response = get_response(request)
-        if is_public_get_request(request):
-            response.cookies.clear()
+        response.cookies.clear()
         return response
 
     return middleware
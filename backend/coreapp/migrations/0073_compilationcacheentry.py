@@ -0,0 +1,30 @@
+# Generated by Django 5.2.11 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("coreapp", "0072_add_indexes_to_scratch_sort_columns"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompilationCacheEntry",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("compiler", models.CharField(max_length=100)),
+                ("elf_object", models.BinaryField()),
+                ("errors", models.TextField(blank=True)),
+                ("size", models.IntegerField()),
+                ("creation_time", models.DateTimeField(auto_now_add=True)),
+                ("last_used", models.DateTimeField(db_index=True)),
+            ],
+            options={
+                "verbose_name_plural": "Compilation cache entries",
+            },
+        ),
+    ]
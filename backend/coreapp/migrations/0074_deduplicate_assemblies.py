@@ -0,0 +1,140 @@
+import hashlib
+import logging
+
+from django.apps.registry import Apps
+from django.db import migrations, reset_queries, transaction
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+
+def deduplicate_assemblies(apps: Apps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    """
+    Assembly cache keys used to include the process startup time, so every
+    restart created a new Assembly for the same asm. Collapse assemblies of the
+    same asm with identical object bytes into the oldest one.
+    """
+    Scratch = apps.get_model("coreapp", "Scratch")
+    Assembly = apps.get_model("coreapp", "Assembly")
+
+    groups = list(
+        Assembly.objects.filter(source_asm__isnull=False)
+        .values_list("source_asm_id", "arch")
+        .annotate(count=Count("hash"))
+        .filter(count__gt=1)
+        .order_by()
+    )
+
+    processed = 0
+    removed = 0
+    for source_asm_id, arch, _ in groups:
+        processed += 1
+
+        canonical: dict[bytes, str] = {}  # object digest -> Assembly.hash
+        duplicates: dict[str, str] = {}  # Assembly.hash -> canonical Assembly.hash
+
+        qs = (
+            Assembly.objects.filter(source_asm_id=source_asm_id, arch=arch)
+            .order_by("time")
+            .values_list("hash", "elf_object")
+        )
+        for hash, elf_object in qs:
+            digest = hashlib.sha256(bytes(elf_object)).digest()
+            if digest in canonical:
+                duplicates[hash] = canonical[digest]
+            else:
+                canonical[digest] = hash
+
+        if duplicates:
+            with transaction.atomic():
+                for duplicate, original in duplicates.items():
+                    Scratch.objects.filter(target_assembly_id=duplicate).update(
+                        target_assembly_id=original
+                    )
+                Assembly.objects.filter(hash__in=duplicates.keys()).delete()
+            removed += len(duplicates)
+            reset_queries()  # cleanup query log cache to avoid OOM
+
+        if processed % 1_000 == 0:
+            logger.info(
+                f"Processed {processed:,} asms with multiple assemblies... (removed: {removed:,})"
+            )
+
+    logger.info(
+        f"Finished processing {processed:,} asms with multiple assemblies (removed: {removed:,})"
+    )
+
+
+def rehash_assemblies(apps: Apps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    """
+    The remaining assemblies are still under keys that include the process
+    startup time, so they'd never be found by CompilerWrapper.assemble_asm
+    again. Move each of them to its current key, which also includes the
+    platform: assemblies shared by scratches of several platforms with the same
+    arch are copied for each platform.
+    """
+    from rest_framework.exceptions import ValidationError
+
+    # compilers first, as it's imported by platforms
+    from coreapp import compilers, platforms, util  # noqa: F401
+
+    Scratch = apps.get_model("coreapp", "Scratch")
+    Assembly = apps.get_model("coreapp", "Assembly")
+
+    uses = list(
+        Scratch.objects.filter(target_assembly__source_asm__isnull=False)
+        .values_list("target_assembly_id", "platform")
+        .distinct()
+        .order_by("target_assembly_id")
+    )
+
+    processed = 0
+    moved = 0
+    for old_hash, platform_id in uses:
+        processed += 1
+        try:
+            platform = platforms.from_id(platform_id)
+        except ValidationError:
+            continue
+
+        assembly = Assembly.objects.get(hash=old_hash)
+        assert assembly.source_asm_id is not None
+        new_hash = util.gen_hash(
+            (platform.id, assembly.source_asm_id, platform.assembler_version)
+        )
+        if new_hash == old_hash:
+            continue
+
+        with transaction.atomic():
+            if not Assembly.objects.filter(hash=new_hash).exists():
+                Assembly.objects.create(
+                    hash=new_hash,
+                    arch=assembly.arch,
+                    source_asm_id=assembly.source_asm_id,
+                    elf_object=assembly.elf_object,
+                )
+                Assembly.objects.filter(hash=new_hash).update(time=assembly.time)
+            Scratch.objects.filter(
+                target_assembly_id=old_hash, platform=platform.id
+            ).update(target_assembly_id=new_hash)
+            if not Scratch.objects.filter(target_assembly_id=old_hash).exists():
+                Assembly.objects.filter(hash=old_hash).delete()
+        moved += 1
+        reset_queries()  # cleanup query log cache to avoid OOM
+
+        if processed % 1_000 == 0:
+            logger.info(f"Processed {processed:,} assemblies... (moved: {moved:,})")
+
+    logger.info(f"Finished processing {processed:,} assemblies (moved: {moved:,})")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("coreapp", "0073_compilationcacheentry"),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_assemblies, migrations.RunPython.noop),
+        migrations.RunPython(rehash_assemblies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.11 on 2026-10-18 02:50
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("coreapp", "0074_deduplicate_assemblies"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompileJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("compile", "Compile"), ("score", "Score")],
+                        max_length=16,
+                    ),
+                ),
+                ("request", models.JSONField(blank=True, default=dict)),
+                ("update_score", models.BooleanField(default=False)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=16,
+                    ),
+                ),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("worker", models.CharField(blank=True, max_length=100)),
+                ("creation_time", models.DateTimeField(auto_now_add=True)),
+                ("start_time", models.DateTimeField(blank=True, null=True)),
+                ("finish_time", models.DateTimeField(blank=True, null=True)),
+                (
+                    "scratch",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="coreapp.scratch",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "creation_time"], name="compilejob_queue_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.11 on 2026-10-18 02:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("coreapp", "0075_compilejob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssemblyDump",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("dump", models.TextField()),
+                ("creation_time", models.DateTimeField(auto_now_add=True)),
+                ("last_used", models.DateTimeField(db_index=True)),
+                (
+                    "assembly",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dumps",
+                        to="coreapp.assembly",
+                    ),
+                ),
+            ],
+        ),
+    ]
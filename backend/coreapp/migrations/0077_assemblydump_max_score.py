@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-18 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("coreapp", "0076_assemblydump"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assemblydump",
+            name="max_score",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
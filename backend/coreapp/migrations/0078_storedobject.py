@@ -0,0 +1,25 @@
+# Generated by Django 5.2.11 on 2026-10-18 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("coreapp", "0077_assemblydump_max_score"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredObject",
+            fields=[
+                (
+                    "sha256",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("data", models.BinaryField()),
+                ("size", models.IntegerField()),
+                ("creation_time", models.DateTimeField(auto_now_add=True)),
+                ("last_used", models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.11 on 2026-10-18 03:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("coreapp", "0078_storedobject"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompileSnapshot",
+            fields=[
+                (
+                    "scratch",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="compile_snapshot",
+                        serialize=False,
+                        to="coreapp.scratch",
+                    ),
+                ),
+                ("key", models.CharField(max_length=64)),
+                ("compiler_output", models.TextField(blank=True)),
+                ("diff_output", models.JSONField(blank=True, null=True)),
+                ("score", models.IntegerField(blank=True, null=True)),
+                ("max_score", models.IntegerField(blank=True, null=True)),
+                (
+                    "left_object_hash",
+                    models.CharField(blank=True, max_length=64, null=True),
+                ),
+                (
+                    "right_object_hash",
+                    models.CharField(blank=True, max_length=64, null=True),
+                ),
+                ("creation_time", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
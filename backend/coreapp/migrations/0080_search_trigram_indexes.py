@@ -0,0 +1,46 @@
+from django.apps.registry import Apps
+from django.db import migrations
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+# Trigram indexes on the expression that icontains lookups compare on
+# PostgreSQL, UPPER(column), so that searches don't scan whole tables
+TRIGRAM_INDEXES = [
+    ("coreapp_scratch_name_trgm", "coreapp_scratch", "name"),
+    ("coreapp_scratch_diff_label_trgm", "coreapp_scratch", "diff_label"),
+    ("coreapp_preset_name_trgm", "coreapp_preset", "name"),
+    ("auth_user_username_trgm", "auth_user", "username"),
+]
+
+
+def create_trigram_indexes(apps: Apps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" '
+            f'ON "{table}" USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps: Apps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently to not lock the tables while they're built
+    atomic = False
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("coreapp", "0079_compilesnapshot"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
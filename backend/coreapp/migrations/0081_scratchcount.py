@@ -0,0 +1,86 @@
+# Generated by Django 5.2.11 on 2026-10-18 03:23
+
+import django.utils.timezone
+from django.apps.registry import Apps
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.models import Count
+
+COUNTED_FIELDS = {
+    "platform": "platform",
+    "compiler": "compiler",
+    "preset": "preset_id",
+    "owner": "owner_id",
+}
+
+
+def populate_scratch_counts(
+    apps: Apps, schema_editor: BaseDatabaseSchemaEditor
+) -> None:
+    Scratch = apps.get_model("coreapp", "Scratch")
+    ScratchCount = apps.get_model("coreapp", "ScratchCount")
+
+    counts = [ScratchCount(kind="all", key="", count=Scratch.objects.count())]
+    for kind, field in COUNTED_FIELDS.items():
+        rows = (
+            Scratch.objects.order_by()
+            .values_list(field)
+            .annotate(count=Count("pk"))
+            .values_list(field, "count")
+        )
+        counts += [
+            ScratchCount(kind=kind, key=str(value), count=count)
+            for value, count in rows
+            if value is not None
+        ]
+    ScratchCount.objects.bulk_create(counts, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("coreapp", "0080_search_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScratchCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("all", "All"),
+                            ("platform", "Platform"),
+                            ("compiler", "Compiler"),
+                            ("preset", "Preset"),
+                            ("owner", "Owner"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("key", models.CharField(blank=True, max_length=100)),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "last_changed",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "key"), name="scratch_count_kind_key_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_scratch_counts, migrations.RunPython.noop),
+    ]
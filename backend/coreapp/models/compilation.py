@@ -0,0 +1,54 @@
+from django.contrib import admin
+from django.db import models
+
+from ..pagination import LargeTableAdminMixin
+
+
+class CompilationCacheEntry(models.Model):
+    """
+    A successful compilation, keyed by a hash of all of its inputs.
+    Shared by every backend worker and kept across restarts.
+    """
+
+    key = models.CharField(max_length=64, primary_key=True)
+    compiler = models.CharField(max_length=100)
+    elf_object = models.BinaryField()
+    errors = models.TextField(blank=True)
+    size = models.IntegerField()
+    creation_time = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name_plural = "Compilation cache entries"
+
+    def __str__(self) -> str:
+        return f"{self.compiler} ({self.key[:12]})"
+
+
+class CompilationCacheEntryAdmin(
+    LargeTableAdminMixin, admin.ModelAdmin[CompilationCacheEntry]
+):
+    list_display = ["key", "compiler", "size", "creation_time", "last_used"]
+    list_filter = ["compiler"]
+    exclude = ["elf_object"]
+
+
+class StoredObject(models.Model):
+    """
+    An object file returned by compile, served by its hash from /api/object
+    rather than being inlined into every compile response
+    """
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    size = models.IntegerField()
+    creation_time = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return self.sha256
+
+
+class StoredObjectAdmin(LargeTableAdminMixin, admin.ModelAdmin[StoredObject]):
+    list_display = ["sha256", "size", "creation_time", "last_used"]
+    exclude = ["data"]
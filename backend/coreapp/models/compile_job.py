@@ -0,0 +1,55 @@
+import uuid
+
+from django.contrib import admin
+from django.db import models
+
+from .scratch import Scratch
+
+
+class CompileJob(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    class Kind(models.TextChoices):
+        # Compile and diff a scratch, optionally with unsaved changes
+        COMPILE = "compile"
+        # Compile and diff a scratch as saved, and store its score
+        SCORE = "score"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    scratch = models.ForeignKey(Scratch, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    # The validated compile request; see ScratchCompileSerializer
+    request = models.JSONField(default=dict, blank=True)
+    update_score = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.QUEUED
+    )
+    result = models.JSONField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    creation_time = models.DateTimeField(auto_now_add=True)
+    start_time = models.DateTimeField(null=True, blank=True)
+    finish_time = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "creation_time"], name="compilejob_queue_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} {self.scratch_id} ({self.status})"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.Status.DONE, self.Status.FAILED)
+
+
+class CompileJobAdmin(admin.ModelAdmin[CompileJob]):
+    raw_id_fields = ["scratch"]
+    list_display = ["id", "kind", "scratch", "status", "worker", "creation_time"]
+    list_filter = ["status", "kind"]
@@ -9,7 +9,8 @@ from requests import RequestException
 from rest_framework import status
 from rest_framework.exceptions import APIException
 
-from ..middleware import Request
+from .. import response_cache, scratch_counts
+from ..middleware import Request, set_profile
 from .profile import Profile
 from .scratch import Scratch
 
@@ -124,12 +125,26 @@ class GitHubUser(models.Model):
         profile.save()
 
         # If the previous profile was anonymous, give its scratches to the logged-in profile
-        if request.profile.is_anonymous() and profile.id != request.profile.id:
-            Scratch.objects.filter(owner=request.profile).update(owner=profile)
+        if (
+            request.profile.is_anonymous()
+            and request.profile.id is not None
+            and profile.id != request.profile.id
+        ):
+            moved = Scratch.objects.filter(owner=request.profile).update(owner=profile)
+            response_cache.invalidate(
+                response_cache.owner_tag(request.profile.id),
+                response_cache.owner_tag(profile.id),
+            )
+            scratch_counts.move(
+                scratch_counts.Kind.OWNER,
+                str(request.profile.id),
+                str(profile.id),
+                moved,
+            )
             request.profile.delete()
 
         login(request, gh_user.user)
-        request.profile = profile
+        set_profile(request, profile, is_placeholder=False)
         request.session["profile_id"] = profile.id
 
         return gh_user
@@ -7,6 +7,8 @@ from django.contrib.auth.models import User
 from django.db import models
 from django.utils import timezone
 
+from ..pagination import LargeTableAdminMixin
+
 with (Path(__file__).resolve().parent / "pseudonym_data.json").open() as f:
     PSEUDONYM_DATA = json.load(f)
 
@@ -66,6 +68,6 @@ class Profile(models.Model):
         return delta.total_seconds() < (60 * 2)
 
 
-class ProfileAdmin(admin.ModelAdmin[Profile]):
+class ProfileAdmin(LargeTableAdminMixin, admin.ModelAdmin[Profile]):
     raw_id_fields = ["user"]
     search_fields = ["user__username", "pseudonym"]
@@ -9,8 +9,10 @@ from django.conf import settings
 from django.contrib import admin
 from django.db import IntegrityError, models
 from django.utils.crypto import get_random_string
+from django.utils.timezone import now
 
 from ..libraries import Library
+from ..pagination import LargeTableAdminMixin
 from .profile import Profile
 
 logger = logging.getLogger(__name__)
@@ -33,6 +35,10 @@ class Asm(models.Model):
         return self.data if len(self.data) < 20 else self.data[:17] + "..."
 
 
+class AsmAdmin(LargeTableAdminMixin, admin.ModelAdmin[Asm]):
+    pass
+
+
 class Assembly(models.Model):
     hash = models.CharField(max_length=64, primary_key=True)
     time = models.DateTimeField(auto_now_add=True)
@@ -41,10 +47,32 @@ class Assembly(models.Model):
     elf_object = models.BinaryField(blank=True)
 
 
-class AssemblyAdmin(admin.ModelAdmin[Assembly]):
+class AssemblyAdmin(LargeTableAdminMixin, admin.ModelAdmin[Assembly]):
     raw_id_fields = ["source_asm"]
 
 
+class AssemblyDump(models.Model):
+    """
+    The preprocessed objdump output of an Assembly, as used for diffing.
+    Keyed on everything that affects the dump, see DiffWrapper.target_dump_key
+    """
+
+    key = models.CharField(max_length=64, primary_key=True)
+    assembly = models.ForeignKey(
+        Assembly, on_delete=models.CASCADE, related_name="dumps"
+    )
+    dump = models.TextField()
+    # The max score of diffs against this dump, known after the first diff
+    max_score = models.IntegerField(null=True, blank=True)
+    creation_time = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(db_index=True)
+
+
+class AssemblyDumpAdmin(LargeTableAdminMixin, admin.ModelAdmin[AssemblyDump]):
+    raw_id_fields = ["assembly"]
+    list_display = ["key", "assembly", "creation_time", "last_used"]
+
+
 class LibrariesField(models.JSONField):
     def __init__(self, **kwargs: Any):
         class MyEncoder(json.JSONEncoder):
@@ -198,6 +226,72 @@ class Scratch(models.Model):
             return False
 
 
-class ScratchAdmin(admin.ModelAdmin[Scratch]):
+class ScratchAdmin(LargeTableAdminMixin, admin.ModelAdmin[Scratch]):
     raw_id_fields = ["owner", "parent", "family", "context_fk"]
     readonly_fields = ["target_assembly"]
+
+
+class CompileSnapshot(models.Model):
+    """
+    The outcome of successfully compiling a scratch as it was last saved, for
+    as long as its key (see scratch_compile_key) matches the scratch. Viewers
+    are served its diff rather than compiling and diffing it again.
+    """
+
+    scratch = models.OneToOneField(
+        Scratch,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="compile_snapshot",
+    )
+    key = models.CharField(max_length=64)
+    compiler_output = models.TextField(blank=True)
+    diff_output = models.JSONField(null=True, blank=True)
+    score = models.IntegerField(null=True, blank=True)
+    max_score = models.IntegerField(null=True, blank=True)
+    left_object_hash = models.CharField(max_length=64, null=True, blank=True)
+    right_object_hash = models.CharField(max_length=64, null=True, blank=True)
+    creation_time = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.scratch_id} ({self.key[:12]})"
+
+
+class CompileSnapshotAdmin(LargeTableAdminMixin, admin.ModelAdmin[CompileSnapshot]):
+    list_display = ["scratch", "key", "score", "max_score", "creation_time"]
+    raw_id_fields = ["scratch"]
+
+
+class ScratchCount(models.Model):
+    """
+    The number of scratches in total or with a given platform, compiler,
+    preset or owner, see coreapp.scratch_counts
+    """
+
+    class Kind(models.TextChoices):
+        ALL = "all"
+        PLATFORM = "platform"
+        COMPILER = "compiler"
+        PRESET = "preset"
+        OWNER = "owner"
+
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    key = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+    last_changed = models.DateTimeField(default=now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "key"], name="scratch_count_kind_key_unique"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} {self.key}: {self.count}"
+
+
+class ScratchCountAdmin(admin.ModelAdmin[ScratchCount]):
+    list_display = ["kind", "key", "count", "last_changed"]
+    list_filter = ["kind"]
+    search_fields = ["key"]
@@ -0,0 +1,76 @@
+"""
+Content-addressed storage of the object files returned by compile.
+
+Compile responses only contain the hashes of the target and compiled
+objects; the objects themselves are served by /api/object/<sha256>, which
+browsers and nginx can cache indefinitely as the content never changes.
+"""
+
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.utils.timezone import now
+
+from .models.compilation import StoredObject
+
+logger = logging.getLogger(__name__)
+
+# Objects used more recently than this aren't written again to refresh their
+# last_used, e.g. the target's object, which is the same for every compilation
+# of a scratch. It only needs to be accurate enough for housekeeping.
+LAST_USED_INTERVAL = timedelta(hours=1)
+
+
+def object_hash(data: bytes) -> str | None:
+    return hashlib.sha256(data).hexdigest() if data else None
+
+
+def store(*objects: bytes) -> list[str | None]:
+    """
+    Store the given objects and return their hashes, or None for empty objects
+    """
+    hashes: list[str | None] = []
+    to_store: dict[str, StoredObject] = {}
+    timestamp = now()
+    for data in objects:
+        sha256 = object_hash(data)
+        hashes.append(sha256)
+        if sha256 is None:
+            continue
+        to_store[sha256] = StoredObject(
+            sha256=sha256, data=data, size=len(data), last_used=timestamp
+        )
+
+    if to_store:
+        try:
+            recently_used = StoredObject.objects.filter(
+                sha256__in=to_store, last_used__gte=timestamp - LAST_USED_INTERVAL
+            ).values_list("sha256", flat=True)
+            for sha256 in recently_used:
+                del to_store[sha256]
+        except DatabaseError as e:
+            logger.warning("Error looking up stored objects: %s", e)
+
+    if to_store:
+        try:
+            # Refreshes last_used of objects that are already stored
+            StoredObject.objects.bulk_create(
+                to_store.values(),
+                update_conflicts=True,
+                unique_fields=["sha256"],
+                update_fields=["last_used"],
+            )
+        except DatabaseError as e:
+            logger.warning("Error storing objects: %s", e)
+    return hashes
+
+
+def load(sha256: str) -> bytes | None:
+    data = (
+        StoredObject.objects.filter(sha256=sha256)
+        .values_list("data", flat=True)
+        .first()
+    )
+    return bytes(data) if data is not None else None
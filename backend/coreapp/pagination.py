@@ -1,7 +1,10 @@
-from typing import Any
+from typing import Any, ClassVar
 
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connection
 from django.db.models import QuerySet
+from django.utils.functional import cached_property
 from rest_framework.exceptions import ParseError
 from rest_framework.pagination import CursorPagination
 from rest_framework.request import Request
@@ -25,3 +28,42 @@ class SafeCursorPagination(CursorPagination):
     def _cursor_has_position(self) -> bool:
         cursor = getattr(self, "cursor", None)
         return getattr(cursor, "position", None) is not None
+
+
+class EstimatedCountPaginator(Paginator[Any]):
+    """
+    Paginator for admin pages of huge tables, which never counts all of a
+    table's rows: unfiltered PostgreSQL tables are counted with the planner's
+    estimate, and other counts are capped at `max_count`
+    """
+
+    max_count = 10_000
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        if not queryset.query.where and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # Small or never analyzed (-1) tables are cheap enough to count
+            if row is not None and row[0] > self.max_count:
+                return int(row[0])
+
+        return queryset[: self.max_count].count()
+
+
+class LargeTableAdminMixin:
+    """
+    Keeps admin change lists of huge tables from counting all of their rows
+    """
+
+    paginator: ClassVar[type] = EstimatedCountPaginator
+    # Otherwise filtered change lists count the whole table as well
+    show_full_result_count: ClassVar[bool] = False
@@ -1,20 +1,23 @@
 import functools
+import hashlib
 import logging
+import shlex
+import subprocess
 from collections import OrderedDict
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
+from django.conf import settings
 from rest_framework.exceptions import ValidationError
 
-from coreapp import compilers
+from coreapp import compilers, scratch_counts
 from coreapp.flags import (
     COMMON_DIFF_FLAGS,
     COMMON_MIPS_DIFF_FLAGS,
     COMMON_MSDOS_DIFF_FLAGS,
     Flags,
 )
-from coreapp.models.scratch import Scratch
 
 logger = logging.getLogger(__name__)
 
@@ -40,8 +43,41 @@ class Platform:
             return asm_prelude_path.read_text()
         return ""
 
+    @property
+    @functools.lru_cache
+    def assembler_version(self) -> str:
+        """
+        Identifies the assembler toolchain: a digest of the assemble command,
+        the asm prelude and, for binutils assemblers, the `--version` output.
+        """
+        binutils_version = ""
+        assembler = next(
+            (t for t in shlex.split(self.assemble_cmd) if t.endswith("-as")), None
+        )
+        if assembler:
+            # Run as the assembler itself is, see CompilerWrapper.assemble_asm
+            from coreapp.error import SandboxError
+            from coreapp.sandbox import Sandbox
+
+            try:
+                with Sandbox() as sandbox:
+                    version_proc = sandbox.run_subprocess(
+                        [assembler, "--version"],
+                        mounts=[],
+                        timeout=settings.ASSEMBLY_TIMEOUT_SECONDS,
+                    )
+                binutils_version = version_proc.stdout.partition("\n")[0]
+            except (OSError, subprocess.SubprocessError, SandboxError) as e:
+                logger.warning("Could not get %s version: %s", assembler, e)
+
+        digest = hashlib.sha256()
+        for part in (self.assemble_cmd, self.asm_prelude, binutils_version):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()[:16]
+
     def get_num_scratches(self) -> int:
-        return Scratch.objects.filter(platform=self.id).count()
+        return scratch_counts.get(scratch_counts.Kind.PLATFORM, self.id)
 
     def to_json(
         self,
@@ -0,0 +1,105 @@
+"""
+Buffered updates of when profiles were last seen.
+
+Saving Profile.last_request_date in the request path takes an UPDATE per
+active profile per minute on every worker. Instead, each process collects them
+and writes them with a single bulk update every FLUSH_INTERVAL_SECONDS, and
+when it exits. Profile.is_online only needs to be accurate to a couple of
+minutes, so it isn't affected by the delay. The bulk update doesn't send
+post_save, so the cached responses about the profiles are invalidated here.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from django.db import DatabaseError, close_old_connections
+from django.utils.timezone import now
+
+from . import response_cache
+from .models.profile import Profile
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 5
+
+# Profiles seen more recently than this aren't updated again
+UPDATE_INTERVAL_SECONDS = 60
+
+
+class PresenceBuffer:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._pending: dict[int, datetime] = {}
+
+    def seen(self, profile: Profile) -> None:
+        """
+        Record that a saved profile made a request just now
+        """
+        timestamp = now()
+        since_update = timestamp - profile.last_request_date
+        profile.last_request_date = timestamp
+        if since_update.total_seconds() <= UPDATE_INTERVAL_SECONDS:
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            self._pending[profile.id] = timestamp
+
+    def _start(self) -> None:
+        # Updates inherited from a parent process across fork() belong to
+        # the parent, which writes them itself
+        self._pending.clear()
+        self._pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, daemon=True).start()
+        atexit.register(self.flush)
+
+    def _flush_periodically(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            if self._pending:
+                close_old_connections()
+                self.flush()
+
+    def flush(self) -> int:
+        """
+        Write the pending updates, returning how many profiles were updated
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            Profile.objects.bulk_update(
+                [
+                    Profile(id=profile_id, last_request_date=last_request_date)
+                    for profile_id, last_request_date in pending.items()
+                ],
+                ["last_request_date"],
+                batch_size=1000,
+            )
+        except DatabaseError as e:
+            logger.warning("Error saving last request dates: %s", e)
+            return 0
+        response_cache.invalidate(
+            *(response_cache.owner_tag(profile_id) for profile_id in pending)
+        )
+        return len(pending)
+
+
+BUFFER = PresenceBuffer()
+
+
+def seen(profile: Profile) -> None:
+    BUFFER.seen(profile)
+
+
+def flush() -> int:
+    return BUFFER.flush()
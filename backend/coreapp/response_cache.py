@@ -0,0 +1,219 @@
+"""
+Server-side cache of the responses of public views, see server_cacheable.
+
+Responses are tagged with what they include, e.g. "presets" for any presets or
+"preset:<id>" for a particular one, and cached under a key that includes the
+current version of each of their tags. Saving or deleting a model replaces the
+versions of the tags it affects (see connect()), so cached responses that
+include it are never served again, and expire from the cache in time.
+
+Saving a scratch only invalidates the responses about it and its owner, see
+scratch_tag() and owner_tag(). Lists of everyone's scratches ("scratches") are
+only invalidated when scratches are added or removed, and otherwise expire, as
+they'd be invalidated by every compilation that updates a score. They're
+cached for a minute at most.
+
+The versions must be shared by every process that serves or changes what's
+cached, as they are with the default file-based cache on one host, so
+responses aren't cached at all with the per-worker locmem cache (see CACHES in
+settings). Backends on more than one host, or in containers that don't share
+the cache directory, must use a shared CACHE_URL instead, e.g. redis://.
+Cached responses are specific to the build, so different builds can share it.
+"""
+
+import hashlib
+import uuid
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
+
+from . import timings
+
+if TYPE_CHECKING:
+    from .models.best_fork import BestFork
+    from .models.profile import Profile
+    from .models.scratch import Scratch
+
+R = TypeVar("R", bound=HttpResponseBase)
+
+TAG_VERSION_PREFIX = "response-tag:"
+RESPONSE_PREFIX = "response:"
+
+
+def scratch_tag(slug: str) -> str:
+    """
+    Tag of the cached responses about a particular scratch
+    """
+    return f"scratch:{slug}"
+
+
+def owner_tag(profile_id: int | str) -> str:
+    """
+    Tag of the cached responses about a profile, including its scratches
+    """
+    return f"owner:{profile_id}"
+
+
+def _cache() -> BaseCache:
+    return caches["responses"]
+
+
+def _tag_versions(tags: Iterable[str]) -> list[str] | None:
+    """
+    The current version of each tag, or None if they aren't available
+    """
+    keys = sorted({TAG_VERSION_PREFIX + tag for tag in tags})
+    cache = _cache()
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            # Unless another worker has just added one
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+        versions |= cache.get_many(missing)
+        if any(key not in versions for key in missing):
+            return None
+    return [f"{key}={versions[key]}" for key in keys]
+
+
+def invalidate(*tags: str) -> None:
+    """
+    Stop serving the cached responses with any of the tags, once the current
+    transaction commits
+    """
+    keys = [TAG_VERSION_PREFIX + tag for tag in tags]
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def get_or_set(
+    request: HttpRequest,
+    tags: Iterable[str],
+    timeout: int,
+    get_response: Callable[[], R],
+) -> R | HttpResponse:
+    """
+    The cached response to the request, or the response from get_response(),
+    which is cached if it's a successful JSON response
+    """
+    if (
+        request.method != "GET"
+        or "If-None-Match" in request.headers
+        or "If-Modified-Since" in request.headers
+    ):
+        return get_response()
+
+    versions = _tag_versions(tags)
+    if versions is None:
+        return get_response()
+
+    # The response depends on Accept, as DRF can also render it as HTML
+    key_parts = [
+        settings.BUILD_ID,
+        request.get_full_path(),
+        request.headers.get("Accept", ""),
+        *versions,
+    ]
+    key = RESPONSE_PREFIX + hashlib.sha256("\n".join(key_parts).encode()).hexdigest()
+
+    cache = _cache()
+    cached = cache.get(key)
+    if cached is not None:
+        timings.record_cache("response", "hit")
+        status, headers, content = cached
+        return HttpResponse(content, status=status, headers=headers)
+    timings.record_cache("response", "miss")
+
+    response = get_response()
+    render = getattr(response, "render", None)
+    if render is not None:
+        render()
+    if (
+        isinstance(response, HttpResponse)
+        and response.status_code == 200
+        and response.get("Content-Type", "").startswith("application/json")
+        and not response.cookies
+    ):
+        cache.set(
+            key,
+            (response.status_code, dict(response.items()), response.content),
+            timeout,
+        )
+    return response
+
+
+def _scratch_saved(instance: "Scratch", created: bool = False, **kwargs: Any) -> None:
+    tags = [scratch_tag(instance.slug)]
+    if instance.owner_id is not None:
+        tags.append(owner_tag(instance.owner_id))
+    if created:
+        tags.append("scratches")
+    invalidate(*tags)
+
+
+def _scratch_deleted(instance: "Scratch", **kwargs: Any) -> None:
+    tags = [scratch_tag(instance.slug), "scratches"]
+    if instance.owner_id is not None:
+        tags.append(owner_tag(instance.owner_id))
+    invalidate(*tags)
+
+
+def _best_fork_changed(instance: "BestFork", **kwargs: Any) -> None:
+    from .models.scratch import Scratch
+
+    # The scratch that was improved on, which is shown with its best fork
+    tags = [scratch_tag(instance.scratch_id)]
+    owner_id = (
+        Scratch.objects.filter(slug=instance.scratch_id)
+        .values_list("owner_id", flat=True)
+        .first()
+    )
+    if owner_id is not None:
+        tags.append(owner_tag(owner_id))
+    invalidate(*tags)
+
+
+def _preset_changed(instance: Model, **kwargs: Any) -> None:
+    invalidate("presets", f"preset:{instance.pk}")
+
+
+def _profile_changed(instance: "Profile", **kwargs: Any) -> None:
+    invalidate("profiles", owner_tag(instance.pk))
+
+
+def _user_changed(instance: Model, **kwargs: Any) -> None:
+    from .models.profile import Profile
+
+    # Either a User or a GitHubUser
+    user_id = getattr(instance, "user_id", instance.pk)
+    profile_ids = Profile.objects.filter(user_id=user_id).values_list("id", flat=True)
+    invalidate("profiles", *(owner_tag(profile_id) for profile_id in profile_ids))
+
+
+def connect() -> None:
+    from django.contrib.auth.models import User
+
+    from .models.best_fork import BestFork
+    from .models.github import GitHubUser
+    from .models.preset import Preset
+    from .models.profile import Profile
+    from .models.scratch import Scratch
+
+    receivers: list[tuple[type[Model], Callable[..., None]]] = [
+        (BestFork, _best_fork_changed),
+        (Preset, _preset_changed),
+        (Profile, _profile_changed),
+        (User, _user_changed),
+        (GitHubUser, _user_changed),
+    ]
+    for sender, receiver in receivers:
+        post_save.connect(receiver, sender=sender)
+        post_delete.connect(receiver, sender=sender)
+    post_save.connect(_scratch_saved, sender=Scratch)
+    post_delete.connect(_scratch_deleted, sender=Scratch)
@@ -9,6 +9,7 @@ from typing import Any, Self
 
 from django.conf import settings
 
+from coreapp import metrics, timings
 from coreapp.error import SandboxError
 
 logger = logging.getLogger(__name__)
@@ -22,6 +23,10 @@ else:
 
 class Sandbox(contextlib.AbstractContextManager["Sandbox"]):
     def __enter__(self) -> Self:
+        with timings.stage("sandbox"):
+            return self._setup()
+
+    def _setup(self) -> Self:
         self.use_jail = settings.USE_SANDBOX_JAIL
 
         tmpdir: Path | None = None
@@ -36,7 +41,8 @@ class Sandbox(contextlib.AbstractContextManager["Sandbox"]):
         return self
 
     def __exit__(self, *exc: Any) -> None:
-        self.temp_dir.cleanup()
+        with timings.stage("sandbox"):
+            self.temp_dir.cleanup()
 
     @staticmethod
     def quote_options(opts: str) -> str:
@@ -129,15 +135,16 @@ class Sandbox(contextlib.AbstractContextManager["Sandbox"]):
             f"{key}={shlex.quote(value)}" for key, value in env.items() if key != "PATH"
         )
         logger.debug(f"Sandbox Command: {debug_env_str} {shlex.join(command)}")
-        return subprocess.run(
-            command,
-            text=True,
-            errors="backslashreplace",
-            env=env,
-            cwd=self.path,
-            check=True,
-            shell=False,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            timeout=timeout,
-        )
+        with metrics.SANDBOX_IN_FLIGHT.track_inprogress():
+            return subprocess.run(
+                command,
+                text=True,
+                errors="backslashreplace",
+                env=env,
+                cwd=self.path,
+                check=True,
+                shell=False,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                timeout=timeout,
+            )
@@ -0,0 +1,203 @@
+"""
+Counts of scratches in total and by platform, compiler, preset and owner.
+
+Counting scratches with COUNT(*) scans the scratch table, so the counts are
+kept in ScratchCount rows instead. They are adjusted as scratches are created,
+reassigned and deleted (see connect()), and reconciled by housekeeping as
+updates that bypass signals, e.g. QuerySet.update(), leave them out of date.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Any
+
+from django.db.models import (
+    CharField,
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils.timezone import now
+
+from . import response_cache
+from .models.scratch import Scratch, ScratchCount
+
+Kind = ScratchCount.Kind
+CountKey = tuple[str, str]
+
+# The fields of Scratch that each kind of count is by
+COUNTED_FIELDS = {
+    Kind.PLATFORM: "platform",
+    Kind.COMPILER: "compiler",
+    Kind.PRESET: "preset_id",
+    Kind.OWNER: "owner_id",
+}
+
+
+def _keys(scratch: Scratch) -> frozenset[CountKey] | None:
+    """
+    The counts that include the scratch, or None if its fields weren't loaded
+    """
+    values = scratch.__dict__
+    if any(field not in values for field in COUNTED_FIELDS.values()):
+        return None
+
+    keys = {(Kind.ALL.value, "")}
+    for kind, field in COUNTED_FIELDS.items():
+        if values[field] is not None:
+            keys.add((kind.value, str(values[field])))
+    return frozenset(keys)
+
+
+def adjust(keys: Iterable[CountKey], delta: int) -> None:
+    keys = list(keys)
+    if not keys or delta == 0:
+        return
+
+    timestamp = now()
+    ScratchCount.objects.bulk_create(
+        [
+            ScratchCount(kind=kind, key=key, last_changed=timestamp)
+            for kind, key in keys
+        ],
+        ignore_conflicts=True,
+    )
+    match = Q()
+    for kind, key in keys:
+        match |= Q(kind=kind, key=key)
+    ScratchCount.objects.filter(match).update(
+        count=F("count") + delta, last_changed=timestamp
+    )
+    _invalidate_responses(keys)
+
+
+def response_tag(kind: Kind, key: str = "") -> str:
+    """
+    Tag of the cached responses that include the count, see response_cache
+    """
+    return f"scratch-count:{kind}:{key}"
+
+
+def _invalidate_responses(keys: Iterable[CountKey]) -> None:
+    response_cache.invalidate(
+        "scratch-counts", *(response_tag(Kind(kind), key) for kind, key in keys)
+    )
+
+
+def move(kind: Kind, from_key: str, to_key: str, count: int) -> None:
+    """
+    Record that `count` scratches were moved from one key to another in bulk
+    """
+    adjust([(kind.value, from_key)], -count)
+    adjust([(kind.value, to_key)], count)
+
+
+def lookup(kind: Kind, key: str = "") -> tuple[int, datetime | None]:
+    """
+    The count and when it last changed, if it ever has
+    """
+    row = (
+        ScratchCount.objects.filter(kind=kind, key=key)
+        .values_list("count", "last_changed")
+        .first()
+    )
+    return row if row is not None else (0, None)
+
+
+def get(kind: Kind, key: str = "") -> int:
+    return lookup(kind, key)[0]
+
+
+def annotation(kind: Kind, outer_field: str = "pk") -> Coalesce:
+    """
+    The count for the value of `outer_field` of each row, for annotating
+    querysets, e.g. of presets with Kind.PRESET
+    """
+    counts = ScratchCount.objects.filter(
+        kind=kind, key=Cast(OuterRef(outer_field), output_field=CharField())
+    ).values("count")[:1]
+    return Coalesce(Subquery(counts), Value(0), output_field=IntegerField())
+
+
+def reconcile(dry_run: bool = False) -> int:
+    """
+    Recount all scratches and correct the counts that are wrong, returning how
+    many were wrong
+    """
+    actual: dict[CountKey, int] = {(Kind.ALL.value, ""): Scratch.objects.count()}
+    for kind, field in COUNTED_FIELDS.items():
+        rows = (
+            Scratch.objects.order_by()
+            .values_list(field)
+            .annotate(count=Count("pk"))
+            .values_list(field, "count")
+        )
+        for value, count in rows:
+            if value is not None:
+                actual[(kind.value, str(value))] = count
+
+    stored = {
+        (kind, key): count
+        for kind, key, count in ScratchCount.objects.values_list("kind", "key", "count")
+    }
+    wrong = [
+        key
+        for key in actual.keys() | stored.keys()
+        if actual.get(key, 0) != stored.get(key, 0)
+    ]
+
+    if wrong and not dry_run:
+        timestamp = now()
+        ScratchCount.objects.bulk_create(
+            [
+                ScratchCount(
+                    kind=kind,
+                    key=key,
+                    count=actual.get((kind, key), 0),
+                    last_changed=timestamp,
+                )
+                for kind, key in wrong
+            ],
+            update_conflicts=True,
+            unique_fields=["kind", "key"],
+            update_fields=["count", "last_changed"],
+            batch_size=1000,
+        )
+        _invalidate_responses(wrong)
+    return len(wrong)
+
+
+def _scratch_initialized(instance: Scratch, **kwargs: Any) -> None:
+    instance._counted_keys = _keys(instance)  # type: ignore[attr-defined]
+
+
+def _scratch_saved(
+    instance: Scratch, created: bool, raw: bool = False, **kwargs: Any
+) -> None:
+    if raw:
+        return
+
+    keys = _keys(instance)
+    previous = getattr(instance, "_counted_keys", None)
+    if created:
+        adjust(keys or (), 1)
+    elif keys is not None and previous is not None and keys != previous:
+        adjust(keys - previous, 1)
+        adjust(previous - keys, -1)
+    instance._counted_keys = keys  # type: ignore[attr-defined]
+
+
+def _scratch_deleted(instance: Scratch, **kwargs: Any) -> None:
+    adjust(_keys(instance) or (), -1)
+
+
+def connect() -> None:
+    post_init.connect(_scratch_initialized, sender=Scratch)
+    post_save.connect(_scratch_saved, sender=Scratch)
+    post_delete.connect(_scratch_deleted, sender=Scratch)
@@ -9,7 +9,7 @@ from rest_framework.relations import PKOnlyObject, SlugRelatedField
 
 from coreapp import platforms
 
-from . import compilers
+from . import compilers, scratch_counts
 from .libraries import Library
 from .models.best_fork import BestFork
 from .models.github import GitHubUser
@@ -17,6 +17,7 @@ from .models.preset import Preset
 from .models.profile import Profile
 from .models.project import Project, ProjectMember
 from .models.scratch import Context, Scratch
+from .scratch_counts import Kind
 
 
 def serialize_profile(profile: Profile, num_scratches: bool = False) -> dict[str, Any]:
@@ -49,7 +50,7 @@ def serialize_profile(profile: Profile, num_scratches: bool = False) -> dict[str
         }
 
         if num_scratches:
-            res["num_scratches"] = Scratch.objects.filter(owner__user=user).count()
+            res["num_scratches"] = scratch_counts.get(Kind.OWNER, str(profile.id))
             res["num_presets"] = Preset.objects.filter(owner__user=user).count()
 
         return res
@@ -128,7 +129,7 @@ class PresetSerializer(serializers.ModelSerializer[Preset]):
         annotated_count = getattr(preset, "num_scratches", None)
         if annotated_count is not None:
             return int(annotated_count)
-        return Scratch.objects.filter(preset=preset).count()
+        return scratch_counts.get(Kind.PRESET, str(preset.id))
 
     def validate_platform(self, platform: str) -> str:
         try:
@@ -0,0 +1,25 @@
+"""
+Session engine that reads sessions from the "sessions" cache before the
+database, as with Django's cached_db engine, and removes expired sessions a
+batch at a time so that they can be cleared alongside the backend, see
+housekeeping.remove_expired_sessions.
+"""
+
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.base_session import AbstractBaseSession
+from django.db.models import QuerySet
+from django.utils.timezone import now
+
+CLEAR_EXPIRED_BATCH_SIZE = 1000
+
+
+def expired_sessions() -> QuerySet[AbstractBaseSession]:
+    return SessionStore.get_model_class().objects.filter(expire_date__lt=now())
+
+
+class SessionStore(cached_db.SessionStore):
+    @classmethod
+    def clear_expired(cls) -> None:
+        from .housekeeping import perform_delete
+
+        perform_delete(expired_sessions(), batch_size=CLEAR_EXPIRED_BATCH_SIZE)
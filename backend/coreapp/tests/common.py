@@ -2,6 +2,7 @@ from collections.abc import Callable
 from typing import Any
 from unittest import skip, skipIf
 
+from django.core.cache import caches
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -21,6 +22,9 @@ def requiresCompiler(*compilers: Compiler) -> Callable[..., Any]:
 class BaseTestCase(APITestCase):
     def setUp(self) -> None:
         super().setUp()
+        # The cache outlives each test's database transaction
+        for cache in caches.all():
+            cache.clear()
         self.claim_tokens: dict[str, str] = dict()  # slug -> claim_token
         self.client.credentials(HTTP_USER_AGENT="Firefrogz 1.0")
 
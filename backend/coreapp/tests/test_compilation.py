@@ -1,12 +1,16 @@
+import importlib
+import multiprocessing
 from collections.abc import Callable
 from typing import Any
 from unittest.mock import patch
 
+import diff as asm_differ
+from django.apps import apps
 from django.urls import reverse
 from parameterized import param, parameterized
 from rest_framework import status
 
-from coreapp import compilers
+from coreapp import compile_queue, compilers, diff_wrapper, platforms, util
 from coreapp.compiler_wrapper import CompilerWrapper
 from coreapp.compilers import (
     GCC281PM,
@@ -21,10 +25,13 @@ from coreapp.compilers import (
     DummyCompiler,
 )
 from coreapp.diff_wrapper import DiffWrapper
+from coreapp.error import DiffError
 from coreapp.flags import Language
-from coreapp.models.scratch import Asm, Assembly
+from coreapp.models.compile_job import CompileJob
+from coreapp.models.scratch import Asm, Assembly, AssemblyDump, Scratch
 from coreapp.platforms import N64
 from coreapp.tests.common import BaseTestCase, requiresCompiler
+from coreapp.views.scratch import run_compile_job
 
 
 def all_compilers_name_func(
@@ -46,6 +53,23 @@ class CompilationTests(BaseTestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_compile_timings(self) -> None:
+        """
+        Ensure that compile timings are reported when requested
+        """
+        scratch = self.create_nop_scratch()
+        url = reverse("scratch-compile", kwargs={"pk": scratch.slug})
+
+        response = self.client.post(url, {"source_code": "int x;"}, format="json")
+        self.assertNotIn("timings", response.json())
+        self.assertIn("total;dur=", response.headers["Server-Timing"])
+
+        response = self.client.post(
+            url + "?timings=1", {"source_code": "int x;"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("stages", response.json()["timings"])
+
     @requiresCompiler(GCC281PM)
     def test_simple_compilation(self) -> None:
         """
@@ -74,6 +98,67 @@ class CompilationTests(BaseTestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    @requiresCompiler(GCC281PM)
+    def test_target_dump_is_stored(self) -> None:
+        """
+        Ensure that the target is only disassembled once per scratch
+        """
+        scratch_dict = {
+            "compiler": GCC281PM.id,
+            "platform": N64.id,
+            "context": "",
+            "target_asm": "glabel func_80929D04\njr $ra\nnop",
+        }
+        scratch = self.create_scratch(scratch_dict)
+        self.assertEqual(
+            AssemblyDump.objects.filter(assembly=scratch.target_assembly).count(), 1
+        )
+
+        with patch.object(
+            DiffWrapper, "get_dump", wraps=DiffWrapper.get_dump
+        ) as get_dump:
+            response = self.client.post(
+                reverse("scratch-compile", kwargs={"pk": scratch.slug}),
+                {"source_code": "void func_80929D04(void) {}"},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [call.kwargs["name"] for call in get_dump.call_args_list], ["compiled"]
+        )
+
+        # The diff algorithm doesn't change the dump
+        response = self.client.post(
+            reverse("scratch-compile", kwargs={"pk": scratch.slug}),
+            {"diff_flags": ["-DIFFdifflib"]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            AssemblyDump.objects.filter(assembly=scratch.target_assembly).count(), 1
+        )
+
+    @requiresCompiler(IDO71)
+    def test_target_lines_are_reused(self) -> None:
+        """
+        Ensure that diff workers only process the target's dump once
+        """
+        target_asm = Asm(hash="target-lines", data=".text\nglabel func\njr $ra\nnop")
+        with patch("coreapp.models.scratch.Assembly.save", autospec=True):
+            target_assembly = CompilerWrapper.assemble_asm(N64, target_asm)
+
+        with (
+            self.settings(DIFF_POOL_PROCESSES=0),
+            patch("diff.process", wraps=asm_differ.process) as process,
+        ):
+            first = DiffWrapper.diff(target_assembly, N64, "func", b"", diff_flags=[])
+            second = DiffWrapper.diff(target_assembly, N64, "func", b"", diff_flags=[])
+
+        self.assertEqual(first.result, second.result)
+        # Once for the target, then once per diff for the (empty) compiled dump
+        self.assertEqual(process.call_count, 3)
+
     @requiresCompiler(GCC281PM)
     def test_giant_compilation(self) -> None:
         """
@@ -244,6 +329,44 @@ nop
             len(result.elf_object), 0, "The compilation result should be non-null"
         )
 
+    def test_assembly_cache_key(self) -> None:
+        """
+        Ensure the assembly cache key only depends on the platform, asm and toolchain
+        """
+        asm = Asm.objects.create(hash="assembly-cache-key", data="jr $ra\nnop")
+
+        assembly = CompilerWrapper.assemble_asm(platforms.DUMMY, asm)
+
+        self.assertEqual(
+            assembly.hash,
+            util.gen_hash(
+                (platforms.DUMMY.id, asm.hash, platforms.DUMMY.assembler_version)
+            ),
+        )
+        self.assertEqual(CompilerWrapper.assemble_asm(platforms.DUMMY, asm), assembly)
+        self.assertEqual(Assembly.objects.filter(source_asm=asm).count(), 1)
+
+    def test_migrated_assemblies_are_rehashed(self) -> None:
+        """
+        Ensure assemblies under the old keys are moved to the current ones
+        """
+        migration = importlib.import_module(
+            "coreapp.migrations.0074_deduplicate_assemblies"
+        )
+        asm = Asm.objects.create(hash="old-assembly-key", data="jr $ra\nnop")
+        old = Assembly.objects.create(hash="old", arch="dummy", source_asm=asm)
+        scratch = Scratch.objects.create(
+            platform=platforms.DUMMY.id, compiler="dummy", target_assembly=old
+        )
+
+        migration.rehash_assemblies(apps, None)
+
+        scratch.refresh_from_db()
+        self.assertEqual(
+            scratch.target_assembly, CompilerWrapper.assemble_asm(platforms.DUMMY, asm)
+        )
+        self.assertFalse(Assembly.objects.filter(hash="old").exists())
+
     def test_language_flags(self) -> None:
         """
         Ensure compiler flags that switch source language are reflected in metadata.
@@ -281,6 +404,106 @@ nop
         self.assertEqual(200, diff_result.get("current_score"))
         self.assertEqual(None, diff.errors)
 
+    @requiresCompiler(IDO71)
+    def test_diff_pool_matches_in_process_diff(self) -> None:
+        """
+        Ensure diffing on the pool gives the same result as diffing in-process,
+        and that running out of memory is reported as a DiffError.
+        """
+        target_asm = Asm(hash="diff-pool", data=".text\nglabel func\njr $ra\nnop")
+        with patch("coreapp.models.scratch.Assembly.save", autospec=True):
+            target_assembly = CompilerWrapper.assemble_asm(N64, target_asm)
+
+        pooled = DiffWrapper.diff(target_assembly, N64, "func", b"", diff_flags=[])
+        with self.settings(DIFF_POOL_PROCESSES=0):
+            in_process = DiffWrapper.diff(
+                target_assembly, N64, "func", b"", diff_flags=[]
+            )
+            self.assertEqual(pooled.result, in_process.result)
+
+            with (
+                patch("coreapp.diff_worker.run_diff", side_effect=MemoryError),
+                self.assertRaisesMessage(DiffError, "too much memory"),
+            ):
+                DiffWrapper.diff(target_assembly, N64, "func", b"", diff_flags=[])
+
+    @requiresCompiler(IDO71)
+    def test_diff_algorithm_selection(self) -> None:
+        """
+        Ensure that the automatic diff algorithm scores like whichever of
+        difflib and Levenshtein the size estimate selects, on a diff that the
+        two score differently.
+        """
+        operands = "$t0, $t1, $t2"
+        ordered = ["addu", "subu", "and", "or", "xor", "nor"]
+        others = ["slt", "sltu", "sllv", "srlv", "srav", "dadd"]
+        # difflib matches the pair of luis first, which leaves nothing else to
+        # match; Levenshtein matches the six ordered instructions instead
+        target_lines = ["lui $t0, 1"] * 2 + [
+            f"{mnemonic} {operands}"
+            for pair in zip(ordered, others)
+            for mnemonic in pair
+        ]
+        current_lines = [f"{mnemonic} {operands}" for mnemonic in ordered] + [
+            "lui $t0, 1"
+        ] * 2
+
+        def assemble(name: str, lines: list[str]) -> Assembly:
+            asm = Asm(
+                hash=f"diff-algorithm-{name}",
+                data="\n".join([".text", "glabel func", *lines, "jr $ra", "nop"]),
+            )
+            with patch("coreapp.models.scratch.Assembly.save", autospec=True):
+                return CompilerWrapper.assemble_asm(N64, asm)
+
+        target_assembly = assemble("target", target_lines)
+        current_assembly = assemble("current", current_lines)
+
+        def score(diff_flags: list[str]) -> int:
+            result = DiffWrapper.diff(
+                target_assembly,
+                N64,
+                "func",
+                bytes(current_assembly.elf_object),
+                diff_flags,
+            ).result
+            return result["current_score"]  # type: ignore
+
+        levenshtein = score(["-DIFFlevenshtein"])
+        difflib = score(["-DIFFdifflib"])
+        self.assertLess(levenshtein, difflib)
+
+        # Scratches that haven't chosen keep using Levenshtein
+        self.assertEqual(score([]), levenshtein)
+
+        # Levenshtein has about 14 * 8 cells to fill in after the common suffix
+        with self.settings(DIFF_LEVENSHTEIN_MAX_CELLS=1000):
+            self.assertEqual(score(["-DIFFauto"]), levenshtein)
+        with self.settings(DIFF_LEVENSHTEIN_MAX_CELLS=10):
+            self.assertEqual(score(["-DIFFauto"]), difflib)
+            self.assertEqual(score(["-DIFFlevenshtein"]), levenshtein)
+            self.assertEqual(score([]), levenshtein)
+
+        # Levenshtein that runs out of its time budget is stopped, and the diff
+        # is run again with difflib, unless Levenshtein was chosen explicitly
+        run_on_pool = diff_wrapper._run_on_pool
+
+        def slow_levenshtein(*args: Any) -> Any:
+            if "-DIFFdifflib" not in args[1]:
+                raise multiprocessing.TimeoutError()
+            return run_on_pool(*args)
+
+        with (
+            self.settings(DIFF_ALGORITHM_BUDGET_SECONDS=2, DIFF_TIMEOUT_SECONDS=10),
+            patch(
+                "coreapp.diff_wrapper._run_on_pool", side_effect=slow_levenshtein
+            ) as pooled,
+        ):
+            self.assertEqual(score([]), difflib)
+            self.assertEqual(pooled.call_args_list[0].args[-1], 2)
+            with self.assertRaisesMessage(DiffError, "longer than"):
+                score(["-DIFFlevenshtein"])
+
     @parameterized.expand(
         input=[
             (c,)
@@ -330,3 +553,45 @@ nop
         self.assertTrue(diff_result is not None and "rows" in diff_result)
         self.assertGreater(len(diff_result["rows"]), 0)
         self.assertEqual(None, diff.errors)
+
+
+class CompileQueueTests(BaseTestCase):
+    def test_queued_compile(self) -> None:
+        """
+        Ensure that compilations can be run by a compile worker and polled for
+        """
+        scratch = self.create_nop_scratch()
+
+        with self.settings(COMPILE_QUEUE_ENABLED=True):
+            # Returns straight away, rather than keeping the web worker waiting
+            response = self.client.post(
+                reverse("scratch-compile", kwargs={"pk": scratch.slug}),
+                {"source_code": "int x;"},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            job_id = response.json()["job"]
+
+            self.assertTrue(compile_queue.run_next_job(run_compile_job))
+            self.assertFalse(compile_queue.run_next_job(run_compile_job))
+
+            response = self.client.get(reverse("compile-job", kwargs={"id": job_id}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()["success"])
+        self.assertEqual(
+            CompileJob.objects.get(id=job_id).status, CompileJob.Status.DONE
+        )
+
+    def test_failed_compile_job(self) -> None:
+        scratch = self.create_nop_scratch()
+        job = compile_queue.submit_job(scratch, CompileJob.Kind.COMPILE)
+
+        def handler(job: CompileJob) -> dict[str, Any]:
+            raise ValueError("oh no")
+
+        self.assertTrue(compile_queue.run_next_job(handler))
+
+        response = self.client.get(reverse("compile-job", kwargs={"id": job.id}))
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.json()["detail"], "oh no")
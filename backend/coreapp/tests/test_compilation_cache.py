@@ -0,0 +1,159 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from coreapp.compilation_cache import CompilationCache, compilation_cache_key
+from coreapp.libraries import Library
+from coreapp.models.compilation import CompilationCacheEntry
+from coreapp.util import SizedLRUCache
+from coreapp.wrapper_result import CompilationResult
+
+
+class SizedLRUCacheTests(TestCase):
+    def test_evicts_least_recently_used_by_size(self) -> None:
+        cache = SizedLRUCache[str, bytes](10, len)
+        cache.put("a", b"1234")
+        cache.put("b", b"1234")
+        cache.get("a")
+        cache.put("c", b"1234")
+
+        self.assertEqual(cache.get("a"), b"1234")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), b"1234")
+        self.assertEqual(cache.size, 8)
+
+    def test_oversized_values_are_not_cached(self) -> None:
+        cache = SizedLRUCache[str, bytes](4, len)
+        cache.put("a", b"12345")
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.size, 0)
+
+
+class CompilationCacheTests(TestCase):
+    def test_key_depends_on_all_inputs(self) -> None:
+        base = ("gcc2.8.1pm", "-O2", "int x;", "", "func", ())
+        key = compilation_cache_key(*base)
+
+        self.assertEqual(
+            key, compilation_cache_key("gcc2.8.1pm", " -O2 ", "int x;", "", "func", ())
+        )
+        self.assertNotEqual(
+            key, compilation_cache_key("gcc2.8.1pm", "-O1", "int x;", "", "func", ())
+        )
+        self.assertNotEqual(
+            key,
+            compilation_cache_key("gcc2.8.1pm", "-O2", "int x;", "int y;", "func", ()),
+        )
+        self.assertNotEqual(
+            key,
+            compilation_cache_key(
+                "gcc2.8.1pm",
+                "-O2",
+                "int x;",
+                "",
+                "func",
+                (Library(name="lib", version="1"),),
+            ),
+        )
+
+    def test_shared_between_processes(self) -> None:
+        """
+        Ensure that results stored by one worker can be served to another
+        """
+        result = CompilationResult(b"\x7fELF", "warning")
+
+        CompilationCache(1024, 1024).put("key", "dummy", result)
+        other_worker = CompilationCache(1024, 1024)
+
+        self.assertEqual(other_worker.get("key"), result)
+        self.assertEqual(other_worker.get("key"), result)
+        self.assertIsNone(other_worker.get("missing"))
+
+        stats = other_worker.stats()
+        self.assertEqual(stats["db_hits"], 1)
+        self.assertEqual(stats["memory_hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_db_eviction(self) -> None:
+        cache = CompilationCache(1024, 10)
+        for key in ["a", "b", "c"]:
+            cache.put(key, "dummy", CompilationResult(b"1234", ""))
+
+        self.assertEqual(cache.evict(), 1)
+        self.assertFalse(CompilationCacheEntry.objects.filter(key="a").exists())
+        self.assertEqual(CompilationCacheEntry.objects.count(), 2)
+
+
+class CompilationCoalescingTests(TestCase):
+    def setUp(self) -> None:
+        lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(lock_dir.cleanup)
+        self.lock_path = Path(lock_dir.name)
+        settings = self.settings(COMPILATION_LOCK_PATH=self.lock_path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_concurrent_compiles_are_coalesced(self) -> None:
+        cache = CompilationCache(1024, 1024)
+        release = threading.Event()
+        compiles = 0
+
+        def compile() -> CompilationResult:
+            nonlocal compiles
+            compiles += 1
+            release.wait(5)
+            return CompilationResult(b"\x7fELF", "")
+
+        results: list[CompilationResult] = []
+
+        def request() -> None:
+            results.append(cache.get_or_compile("key", "dummy", compile))
+
+        # Keep database access on the test thread
+        with patch.object(cache, "get", return_value=None), patch.object(cache, "put"):
+            threads = [threading.Thread(target=request) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+
+            deadline = time.monotonic() + 5
+            while cache.stats()["coalesced"] < 4 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            release.set()
+
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(compiles, 1)
+        self.assertEqual(results, [CompilationResult(b"\x7fELF", "")] * 5)
+        self.assertEqual(cache.stats()["coalesced"], 4)
+        self.assertEqual(list(self.lock_path.iterdir()), [])
+
+    def test_compiled_result_is_cached(self) -> None:
+        cache = CompilationCache(1024, 1024)
+        result = CompilationResult(b"\x7fELF", "")
+
+        self.assertEqual(cache.get_or_compile("key", "dummy", lambda: result), result)
+        self.assertTrue(CompilationCacheEntry.objects.filter(key="key").exists())
+
+        def compile() -> CompilationResult:
+            raise AssertionError("should have been cached")
+
+        other_worker = CompilationCache(1024, 1024)
+        self.assertEqual(other_worker.get_or_compile("key", "dummy", compile), result)
+
+    def test_errors_are_not_cached(self) -> None:
+        cache = CompilationCache(1024, 1024)
+
+        def compile() -> CompilationResult:
+            raise ValueError("oh no")
+
+        with self.assertRaises(ValueError):
+            cache.get_or_compile("key", "dummy", compile)
+
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(list(self.lock_path.iterdir()), [])
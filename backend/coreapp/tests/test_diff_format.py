@@ -0,0 +1,94 @@
+from typing import Any
+
+from django.test import TestCase
+
+from coreapp import diff_format
+
+
+def cell(text: str) -> dict[str, Any]:
+    return {"text": [{"text": text}]}
+
+
+def diff_output(current: list[str]) -> dict[str, Any]:
+    return {
+        "arch_str": "mips",
+        "current_score": 10,
+        "max_score": 100,
+        "header": {"base": [], "current": []},
+        "rows": [
+            {"key": str(i), "base": cell("nop"), "current": cell(text)}
+            for i, text in enumerate(current)
+        ],
+    }
+
+
+def decode(
+    encoded: dict[str, Any], rows: list[dict[str, Any]] | None = None
+) -> list[dict[str, Any]]:
+    columns = encoded["rows"]
+    indices = columns.get("index", range(len(columns["key"])))
+    rows = (rows or [])[: encoded["row_count"]]
+    rows += [{}] * (encoded["row_count"] - len(rows))
+    for i, index in enumerate(indices):
+        row = {"key": columns["key"][i]}
+        for column in ("base", "current", "previous"):
+            if column in columns and columns[column][i] is not None:
+                row[column] = encoded["cells"][columns[column][i]]
+        rows[index] = row
+    return rows
+
+
+class DiffFormatTests(TestCase):
+    def test_compact(self) -> None:
+        output = diff_output(["nop", "jr $ra", "nop"])
+        encoded = diff_format.encode(output)
+
+        self.assertEqual(encoded["format"], "compact")
+        self.assertEqual(encoded["current_score"], 10)
+        # Every "nop" cell is only sent once
+        self.assertEqual(encoded["cells"], [cell("nop"), cell("jr $ra")])
+        self.assertEqual(decode(encoded), output["rows"])
+
+    def test_delta(self) -> None:
+        first = diff_format.encode(diff_output(["nop", "jr $ra", "nop"]))
+        output = diff_output(["nop", "addiu $v0, $zero, 1", "nop", "nop"])
+        delta = diff_format.encode(output, since=first["revision"])
+
+        self.assertEqual(delta["format"], "compact-delta")
+        self.assertEqual(delta["since"], first["revision"])
+        self.assertEqual(delta["rows"]["index"], [1, 3])
+        self.assertEqual(decode(delta, decode(first)), output["rows"])
+
+        shrunk = diff_output(["nop"])
+        delta = diff_format.encode(shrunk, since=first["revision"])
+        self.assertEqual(delta["rows"]["index"], [])
+        self.assertEqual(decode(delta, decode(first)), shrunk["rows"])
+
+    def test_unknown_revision(self) -> None:
+        encoded = diff_format.encode(diff_output(["nop"]), since="unknown")
+
+        self.assertEqual(encoded["format"], "compact")
+        self.assertNotIn("since", encoded)
+
+    def test_same_output_same_revision(self) -> None:
+        first = diff_format.encode(diff_output(["nop"]))
+        second = diff_format.encode(diff_output(["nop"]), since=first["revision"])
+
+        self.assertEqual(first["revision"], second["revision"])
+        self.assertEqual(second["rows"]["key"], [])
+
+    def test_window(self) -> None:
+        output = diff_output(["nop", "jr $ra", "nop"])
+        output["rows"][1]["current"]["text"][0]["format"] = "diff_change"
+        del output["rows"][2]["current"]
+
+        windowed = diff_format.window(output, "scratch", "diff", 1)
+
+        self.assertEqual(windowed["current_score"], 10)
+        self.assertEqual(windowed["total_rows"], 3)
+        self.assertEqual(windowed["mismatches"], [1, 2])
+        self.assertEqual(windowed["rows"], output["rows"][:1])
+        self.assertEqual(
+            diff_format.get_rows("scratch", "diff", 1, 10), (output["rows"][1:], 3)
+        )
+        self.assertIsNone(diff_format.get_rows("other", "diff", 1, 10))
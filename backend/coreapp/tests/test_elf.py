@@ -0,0 +1,169 @@
+import struct
+
+from django.test import SimpleTestCase
+from parameterized import parameterized
+
+from coreapp import elf
+
+# STB_GLOBAL, STT_FUNC
+FUNC = (1 << 4) | 2
+R_MIPS_26 = 4
+
+Sym = tuple[str, int, int, int]
+Reloc = tuple[int, int, int]
+
+
+def build_elf(
+    elf_class: int,
+    endian: str,
+    symbols: list[Sym],
+    text: bytes = b"",
+    relocs: list[Reloc] | None = None,
+) -> bytes:
+    """
+    Build a minimal relocatable object with .text, .rel.text, .symtab,
+    .strtab and .shstrtab sections.
+    Symbols are (name, value, info, shndx), relocations (offset, type, symbol).
+    """
+    is_64 = elf_class == elf.ELFCLASS64
+    ehsize, shentsize = (64, 64) if is_64 else (52, 40)
+    symsize, relsize = (24, 16) if is_64 else (16, 8)
+
+    strtab = b"\0"
+    entries = [b"\0" * symsize]
+    for name, value, info, shndx in symbols:
+        st_name = len(strtab)
+        strtab += name.encode() + b"\0"
+        if is_64:
+            fields = (st_name, info, 0, shndx, value, 0)
+            entries.append(struct.pack(endian + "IBBHQQ", *fields))
+        else:
+            fields = (st_name, value, 0, info, 0, shndx)
+            entries.append(struct.pack(endian + "IIIBBH", *fields))
+    symtab = b"".join(entries)
+
+    rel = b""
+    for offset, type, sym in relocs or []:
+        if is_64:
+            rel += struct.pack(endian + "QQ", offset, (sym << 32) | type)
+        else:
+            rel += struct.pack(endian + "II", offset, (sym << 8) | type)
+
+    # name, type, data, link, info, entsize
+    sections: list[tuple[str, int, bytes, int, int, int]] = [
+        ("", 0, b"", 0, 0, 0),
+        (".text", 1, text, 0, 0, 0),
+        (".rel.text", elf.SHT_REL, rel, 3, 1, relsize),
+        (".symtab", elf.SHT_SYMTAB, symtab, 4, 0, symsize),
+        (".strtab", 3, strtab, 0, 0, 0),
+        (".shstrtab", 3, b"", 0, 0, 0),
+    ]
+    shstrtab = b"\0"
+    name_offsets = []
+    for name, *_ in sections:
+        name_offsets.append(len(shstrtab) if name else 0)
+        if name:
+            shstrtab += name.encode() + b"\0"
+    sections[-1] = (".shstrtab", 3, shstrtab, 0, 0, 0)
+
+    body = b""
+    headers = b""
+    section_fmt = "IIQQQQIIQQ" if is_64 else "IIIIIIIIII"
+    for name_offset, (_, sh_type, data, link, info, entsize) in zip(
+        name_offsets, sections
+    ):
+        offset = ehsize + len(body)
+        body += data
+        headers += struct.pack(
+            endian + section_fmt,
+            name_offset, sh_type, 0, 0, offset, len(data), link, info, 1, entsize,
+        )  # fmt: skip
+    shoff = ehsize + len(body)
+
+    ident = elf.ELF_MAGIC + bytes(
+        [elf_class, elf.ELFDATA2MSB if endian == ">" else elf.ELFDATA2LSB, 1]
+    )
+    header_fmt = "HHIQQQIHHHHHH" if is_64 else "HHIIIIIHHHHHH"
+    header = ident.ljust(16, b"\0") + struct.pack(
+        endian + header_fmt,
+        1, 8, 1, 0, 0, shoff, 0, ehsize, 0, 0, shentsize, len(sections),
+        len(sections) - 1,
+    )  # fmt: skip
+
+    return header + body + headers
+
+
+ELF_VARIANTS = [
+    ("elf32_be", elf.ELFCLASS32, ">"),
+    ("elf32_le", elf.ELFCLASS32, "<"),
+    ("elf64_be", elf.ELFCLASS64, ">"),
+    ("elf64_le", elf.ELFCLASS64, "<"),
+]
+
+
+class ElfTests(SimpleTestCase):
+    @parameterized.expand(ELF_VARIANTS)  # type: ignore
+    def test_symbol_address(self, _: str, elf_class: int, endian: str) -> None:
+        data = build_elf(
+            elf_class,
+            endian,
+            [
+                ("func", 0x40, FUNC, 1),
+                ("func_80929D04", 0x80, FUNC, 1),
+                ("undefined", 0, FUNC, elf.SHN_UNDEF),
+                ("section", 0x10, elf.STT_SECTION, 1),
+            ],
+        )
+
+        self.assertEqual(elf.symbol_address(data, "func"), 0x40)
+        self.assertEqual(elf.symbol_address(data, "func_80929D04"), 0x80)
+        self.assertIsNone(elf.symbol_address(data, "fun"))
+        self.assertIsNone(elf.symbol_address(data, "undefined"))
+        self.assertIsNone(elf.symbol_address(data, "section"))
+
+    @parameterized.expand(ELF_VARIANTS)  # type: ignore
+    def test_function_signature(self, _: str, elf_class: int, endian: str) -> None:
+        def signature(
+            symbols: list[Sym], text: bytes, relocs: list[Reloc]
+        ) -> elf.FunctionSignature | None:
+            data = build_elf(elf_class, endian, symbols, text, relocs)
+            return elf.ElfFile(data).function_signature("func", False)
+
+        code = b"\x0c\x00\x00\x00\x00\x00\x00\x00\x03\xe0\x00\x08\x00\x00\x00\x00"
+        target = signature(
+            [("func", 0, FUNC, 1), ("callee", 0, FUNC, elf.SHN_UNDEF)],
+            code,
+            [(0, R_MIPS_26, 2)],
+        )
+        assert target is not None
+        self.assertEqual(target.data, code)
+        self.assertEqual(target.relocations, ((0, R_MIPS_26, "callee", 0),))
+
+        # Same function at a different offset, followed by another function
+        compiled = signature(
+            [
+                ("other", 0, FUNC, 1),
+                ("func", 8, FUNC, 1),
+                ("next", 24, FUNC, 1),
+                ("callee", 0, FUNC, elf.SHN_UNDEF),
+            ],
+            b"\0" * 8 + code + b"\0" * 8,
+            [(8, R_MIPS_26, 4)],
+        )
+        self.assertEqual(target, compiled)
+
+        different_callee = signature(
+            [("func", 0, FUNC, 1), ("callee2", 0, FUNC, elf.SHN_UNDEF)],
+            code,
+            [(0, R_MIPS_26, 2)],
+        )
+        self.assertNotEqual(target, different_callee)
+
+    def test_not_elf(self) -> None:
+        with self.assertRaises(elf.ElfError):
+            elf.symbol_address(b"\x4c\x01" + b"\0" * 64, "func")
+
+    def test_truncated(self) -> None:
+        data = build_elf(elf.ELFCLASS32, ">", [("func", 0x40, FUNC, 1)])
+        with self.assertRaises(elf.ElfError):
+            elf.symbol_address(data[:-8], "func")
@@ -4,18 +4,32 @@ from unittest.mock import patch
 from django.contrib.auth.models import User
 from django.test import TestCase
 
+from coreapp import object_store
 from coreapp.housekeeping import (
     perform_delete,
     remove_anonymous_profiles,
+    remove_old_compile_jobs,
+    remove_old_compile_snapshots,
     remove_orphan_asms,
     remove_orphan_assemblies,
     remove_orphan_contexts,
     remove_ownerless_scratches,
     remove_unchanged_anonymous_forks,
     remove_unchanged_same_author_forks,
+    remove_unused_assembly_dumps,
+    remove_unused_stored_objects,
 )
+from coreapp.models.compilation import StoredObject
+from coreapp.models.compile_job import CompileJob
 from coreapp.models.profile import Profile
-from coreapp.models.scratch import Asm, Assembly, Context, Scratch
+from coreapp.models.scratch import (
+    Asm,
+    Assembly,
+    AssemblyDump,
+    CompileSnapshot,
+    Context,
+    Scratch,
+)
 
 
 class HousekeepingTests(TestCase):
@@ -114,6 +128,89 @@ class HousekeepingTests(TestCase):
         self.assertEqual(deleted, 3)
         self.assertFalse(Asm.objects.filter(pk__in=[asm.pk for asm in asms]).exists())
 
+    def test_removes_old_compile_jobs(self) -> None:
+        scratch = self.create_scratch(owner=None)
+        old_job = CompileJob.objects.create(
+            scratch=scratch, kind=CompileJob.Kind.COMPILE
+        )
+        new_job = CompileJob.objects.create(
+            scratch=scratch, kind=CompileJob.Kind.COMPILE
+        )
+        CompileJob.objects.filter(pk=old_job.pk).update(
+            creation_time=self.cutoff_datetime - datetime.timedelta(seconds=1)
+        )
+
+        deleted = remove_old_compile_jobs(self.cutoff_datetime)
+
+        self.assertEqual(deleted, 1)
+        self.assertFalse(CompileJob.objects.filter(pk=old_job.pk).exists())
+        self.assertTrue(CompileJob.objects.filter(pk=new_job.pk).exists())
+
+    def test_removes_unused_stored_objects(self) -> None:
+        old_hash, new_hash = object_store.store(b"old", b"new")
+        StoredObject.objects.filter(sha256=old_hash).update(
+            last_used=self.cutoff_datetime - datetime.timedelta(seconds=1)
+        )
+
+        deleted = remove_unused_stored_objects(self.cutoff_datetime)
+
+        self.assertEqual(deleted, 1)
+        self.assertIsNone(object_store.load(old_hash or ""))
+        self.assertEqual(object_store.load(new_hash or ""), b"new")
+
+    def test_removes_unused_assembly_dumps(self) -> None:
+        old_dump = AssemblyDump.objects.create(
+            key="old",
+            assembly=self.assembly,
+            dump="",
+            last_used=self.cutoff_datetime - datetime.timedelta(seconds=1),
+        )
+        new_dump = AssemblyDump.objects.create(
+            key="new",
+            assembly=self.assembly,
+            dump="",
+            last_used=self.cutoff_datetime + datetime.timedelta(seconds=1),
+        )
+
+        deleted = remove_unused_assembly_dumps(self.cutoff_datetime)
+
+        self.assertEqual(deleted, 1)
+        self.assertFalse(AssemblyDump.objects.filter(pk=old_dump.pk).exists())
+        self.assertTrue(AssemblyDump.objects.filter(pk=new_dump.pk).exists())
+
+    def test_keeps_stored_objects_of_compile_snapshots(self) -> None:
+        (snapshot_hash,) = object_store.store(b"snapshot")
+        StoredObject.objects.filter(sha256=snapshot_hash).update(
+            last_used=self.cutoff_datetime - datetime.timedelta(seconds=1)
+        )
+        CompileSnapshot.objects.create(
+            scratch=self.create_scratch(owner=self.foo),
+            key="key",
+            right_object_hash=snapshot_hash,
+        )
+
+        deleted = remove_unused_stored_objects(self.cutoff_datetime)
+
+        self.assertEqual(deleted, 0)
+        self.assertEqual(object_store.load(snapshot_hash or ""), b"snapshot")
+
+    def test_removes_old_compile_snapshots(self) -> None:
+        old_snapshot = CompileSnapshot.objects.create(
+            scratch=self.create_scratch(owner=self.foo), key="old"
+        )
+        new_snapshot = CompileSnapshot.objects.create(
+            scratch=self.create_scratch(owner=self.foo), key="new"
+        )
+        CompileSnapshot.objects.filter(pk=old_snapshot.pk).update(
+            creation_time=self.cutoff_datetime - datetime.timedelta(seconds=1)
+        )
+
+        deleted = remove_old_compile_snapshots(self.cutoff_datetime)
+
+        self.assertEqual(deleted, 1)
+        self.assertFalse(CompileSnapshot.objects.filter(pk=old_snapshot.pk).exists())
+        self.assertTrue(CompileSnapshot.objects.filter(pk=new_snapshot.pk).exists())
+
     def test_removes_scratchless_anonymous_profiles_created_before_cutoff(self) -> None:
         old_scratchless_profile = Profile.objects.create(user=None)
         old_profile_with_scratch = Profile.objects.create(user=None)
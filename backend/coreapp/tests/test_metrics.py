@@ -0,0 +1,84 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase
+
+from coreapp import metrics
+
+
+class MetricsTests(TestCase):
+    def setUp(self) -> None:
+        self.registry = metrics.Registry()
+        self.compiles = metrics.Counter(
+            "compiles_total", "Compiles", ["compiler"], registry=self.registry
+        )
+        self.in_flight = metrics.Gauge("in_flight", "Running", registry=self.registry)
+        self.duration = metrics.Histogram(
+            "duration_seconds", "Duration", buckets=(1, 5), registry=self.registry
+        )
+
+    def test_exposition(self) -> None:
+        with self.settings(METRICS_DIR=""):
+            self.compiles.inc("gcc")
+            self.compiles.inc("gcc", amount=2)
+            self.compiles.inc('a"b')
+            self.in_flight.inc()
+            self.duration.observe(0.5)
+            self.duration.observe(3)
+
+            exposition = self.registry.exposition()
+
+        self.assertIn("# TYPE compiles_total counter", exposition)
+        self.assertIn('compiles_total{compiler="gcc"} 3\n', exposition)
+        self.assertIn('compiles_total{compiler="a\\"b"} 1\n', exposition)
+        self.assertIn("in_flight 1\n", exposition)
+        self.assertIn('duration_seconds_bucket{le="1.0"} 1\n', exposition)
+        self.assertIn('duration_seconds_bucket{le="5.0"} 2\n', exposition)
+        self.assertIn('duration_seconds_bucket{le="+Inf"} 2\n', exposition)
+        self.assertIn("duration_seconds_sum 3.5\n", exposition)
+        self.assertIn("duration_seconds_count 2\n", exposition)
+
+    def test_aggregates_across_processes(self) -> None:
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            # A worker that has since exited
+            dead_pid = 2**22 + 1
+            (Path(metrics_dir) / f"{dead_pid}-worker.json").write_text(
+                json.dumps(
+                    {
+                        "pid": dead_pid,
+                        "metrics": {
+                            "compiles_total": [[["gcc"], 5]],
+                            "in_flight": [[[], 3]],
+                            "duration_seconds": [[[], [1, 0, 0, 0.25]]],
+                        },
+                    }
+                )
+            )
+
+            with self.settings(METRICS_DIR=metrics_dir):
+                self.compiles.inc("gcc")
+                self.in_flight.inc()
+                self.duration.observe(0.5)
+
+                collected = self.registry.collect()
+
+            assert self.registry._path is not None
+            # The dead process's file is folded into the exited processes' one
+            self.assertEqual(
+                sorted(path.name for path in Path(metrics_dir).glob("*.json")),
+                sorted([metrics.EXITED_FILE, self.registry._path.name]),
+            )
+
+            with self.settings(METRICS_DIR=metrics_dir):
+                collected_again = self.registry.collect()
+
+        self.assertEqual(collected["compiles_total"], {("gcc",): 6})
+        # Gauges of dead processes are dropped
+        self.assertEqual(collected["in_flight"], {(): 1})
+        self.assertEqual(collected["duration_seconds"], {(): [2, 0, 0, 0.75]})
+        self.assertEqual(collected_again, collected)
+
+    def test_wrong_labels(self) -> None:
+        with self.assertRaises(ValueError):
+            self.compiles.inc()
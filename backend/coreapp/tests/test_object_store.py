@@ -0,0 +1,25 @@
+from django.test import TestCase
+from django.utils.timezone import now
+
+from coreapp import object_store
+from coreapp.models.compilation import StoredObject
+
+
+class ObjectStoreTests(TestCase):
+    def test_stores_objects_by_hash(self) -> None:
+        first, empty = object_store.store(b"object", b"")
+
+        self.assertIsNone(empty)
+        self.assertEqual(object_store.load(first or ""), b"object")
+
+    def test_skips_writing_recently_used_objects(self) -> None:
+        (sha256,) = object_store.store(b"object")
+
+        # Only looked up
+        with self.assertNumQueries(1):
+            object_store.store(b"object")
+
+        long_ago = now() - 2 * object_store.LAST_USED_INTERVAL
+        StoredObject.objects.filter(sha256=sha256).update(last_used=long_ago)
+        object_store.store(b"object")
+        self.assertGreater(StoredObject.objects.get(sha256=sha256).last_used, long_ago)
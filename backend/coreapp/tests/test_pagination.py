@@ -0,0 +1,28 @@
+from django.test import TestCase
+
+from coreapp.models.scratch import Asm
+from coreapp.pagination import EstimatedCountPaginator
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self) -> None:
+        for i in range(5):
+            Asm.objects.create(hash=f"asm-{i}", data=f"nop {i}")
+
+    def test_counts_small_tables(self) -> None:
+        paginator = EstimatedCountPaginator(Asm.objects.order_by("hash"), 2)
+
+        self.assertEqual(paginator.count, 5)
+        self.assertEqual(paginator.num_pages, 3)
+
+    def test_caps_count(self) -> None:
+        paginator = EstimatedCountPaginator(
+            Asm.objects.filter(data__startswith="nop").order_by("hash"), 2
+        )
+        paginator.max_count = 3
+
+        self.assertEqual(paginator.count, 3)
+        # Rows past the cap are only reachable by filtering further
+        self.assertEqual(
+            list(paginator.page(2)), list(Asm.objects.order_by("hash")[2:3])
+        )
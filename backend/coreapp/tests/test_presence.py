@@ -0,0 +1,38 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils.timezone import now
+
+from coreapp import response_cache
+from coreapp.models.profile import Profile
+from coreapp.presence import PresenceBuffer
+
+
+class PresenceTests(TestCase):
+    def test_buffers_last_request_dates(self) -> None:
+        buffer = PresenceBuffer()
+        long_ago = now() - timedelta(hours=1)
+        away = [Profile.objects.create(last_request_date=long_ago) for _ in range(2)]
+        recent = Profile.objects.create()
+
+        with self.assertNumQueries(0):
+            for profile in [*away, recent]:
+                buffer.seen(profile)
+
+        self.assertFalse(Profile.objects.get(pk=away[0].pk).is_online())
+        self.assertTrue(away[0].is_online())
+
+        with (
+            self.assertNumQueries(1),
+            patch("coreapp.response_cache.invalidate") as invalidate,
+        ):
+            self.assertEqual(buffer.flush(), 2)
+        # Their cached responses show them online again
+        invalidate.assert_called_once_with(
+            *(response_cache.owner_tag(profile.id) for profile in away)
+        )
+        self.assertEqual(buffer.flush(), 0)
+
+        for profile in away:
+            self.assertTrue(Profile.objects.get(pk=profile.pk).is_online())
@@ -25,17 +25,11 @@ class ProjectTests(BaseTestCase):
         Test that you can create a project via the JSON API, and that it only works when is_staff=True
         """
 
-        # Make a request so we can get a profile
-        response = self.client.get(reverse("project-list"))
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
-        profile = Profile.objects.first()
-        assert profile is not None
-
-        # Give the profile a User and GitHubUser
-        profile.user = User(username="test")
-        profile.user.save()
-        profile.save()
-        GitHubUser.objects.create(user=profile.user, github_id=1234)
+        # Log in as a user with a profile and GitHubUser
+        user = User.objects.create(username="test")
+        Profile.objects.create(user=user)
+        self.client.force_login(user)
+        GitHubUser.objects.create(user=user, github_id=1234)
 
         data = {
             "slug": "example-project",
@@ -55,8 +49,8 @@ class ProjectTests(BaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
         # Succeed when admin
-        profile.user.is_staff = True
-        profile.user.save()
+        user.is_staff = True
+        user.save()
         response = self.client.post(
             reverse("project-list"),
             data,
@@ -84,13 +78,11 @@ class ProjectTests(BaseTestCase):
                 assert p is not None
                 self.assertNotEqual(p.description, "new description")
 
-                # add project member
-                profile = Profile.objects.first()
-                assert profile is not None
-                profile.user = User(username="test")
-                profile.user.save()
-                profile.save()
-                ProjectMember(project=project, user=profile.user).save()
+                # log in as a project member
+                user = User.objects.create(username="test")
+                Profile.objects.create(user=user)
+                self.client.force_login(user)
+                ProjectMember(project=project, user=user).save()
 
                 # try again
                 response = self.client.patch(
@@ -1,5 +1,7 @@
 import subprocess
+import uuid
 
+from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -20,6 +22,43 @@ class RequestTests(APITestCase):
         self.assertEqual(Profile.objects.count(), 0)
         self.assertNotIn("sessionid", response.cookies)
 
+    def test_public_requests_skip_session(self) -> None:
+        """
+        Ensure that public GETs don't load the session, user or profile, even
+        when logged in.
+        """
+        user = User.objects.create(username="test")
+        Profile.objects.create(user=user)
+        self.client.force_login(user)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("healthz"), HTTP_USER_AGENT="browser")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("sessionid", response.cookies)
+
+    def test_compile_jobs_and_objects_skip_session(self) -> None:
+        """
+        Ensure that polling for a compile job and fetching objects don't load
+        the session: jobs are only known to whoever submitted them, and objects
+        are addressed by their content, so neither depends on who asks.
+        """
+        user = User.objects.create(username="test")
+        Profile.objects.create(user=user)
+        self.client.force_login(user)
+
+        paths = [
+            reverse("compile-job", args=[uuid.uuid4()]),
+            reverse("object", args=["0" * 64]),
+        ]
+        for path in paths:
+            # Only looking up the job or object
+            with self.assertNumQueries(1):
+                response = self.client.get(path, HTTP_USER_AGENT="browser")
+
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertNotIn("sessionid", response.cookies)
+
     def test_cookie_less_current_user_does_not_create_profile(self) -> None:
         """
         Ensure that a passive current-user read does not create a session profile.
@@ -33,9 +72,10 @@ class RequestTests(APITestCase):
         self.assertEqual(Profile.objects.count(), 0)
         self.assertNotIn("sessionid", response.cookies)
 
-    def test_anonymous_scratch_create_creates_profile(self) -> None:
+    def test_anonymous_scratch_claim_creates_profile(self) -> None:
         """
-        Ensure that stateful anonymous requests still create a session profile.
+        Ensure that anonymous requests only create a session profile once it's
+        needed to own a scratch.
         """
 
         scratch_dict = {
@@ -52,6 +92,17 @@ class RequestTests(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+        self.assertEqual(Profile.objects.count(), 0)
+        self.assertNotIn("sessionid", response.cookies)
+
+        response = self.client.post(
+            reverse("scratch-claim", kwargs={"pk": response.json()["slug"]}),
+            {"token": response.json()["claim_token"]},
+            format="json",
+            HTTP_USER_AGENT="browser",
+        )
+        self.assertTrue(response.json()["success"])
+
         self.assertEqual(Profile.objects.count(), 1)
         self.assertIn("sessionid", response.cookies)
 
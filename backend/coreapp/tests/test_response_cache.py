@@ -0,0 +1,134 @@
+import json
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from coreapp import response_cache, scratch_counts
+from coreapp.decorators.cache import server_cacheable
+from coreapp.models.preset import Preset
+from coreapp.models.profile import Profile
+from coreapp.models.scratch import Assembly, Scratch
+from coreapp.scratch_counts import Kind
+
+
+class PresetNames(APIView):
+    calls = 0
+
+    def get(self, request: Request) -> Response:
+        PresetNames.calls += 1
+        return Response([preset.name for preset in Preset.objects.order_by("id")])
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self) -> None:
+        caches["responses"].clear()
+        PresetNames.calls = 0
+        self.factory = RequestFactory()
+
+    def get(self, tags: list[str], path: str = "/api/preset") -> list[str]:
+        view = server_cacheable(timeout=60, tags=tags)(PresetNames.as_view())
+        response = view(self.factory.get(path, HTTP_ACCEPT="application/json"))
+        self.assertEqual(response.status_code, 200)
+        if isinstance(response, Response):
+            response.render()
+        return json.loads(response.content)
+
+    def create_preset(self, name: str) -> Preset:
+        with self.captureOnCommitCallbacks(execute=True):
+            return Preset.objects.create(name=name, platform="dummy", compiler="dummy")
+
+    def test_invalidated_by_tagged_models(self) -> None:
+        self.create_preset("first")
+
+        self.assertEqual(self.get(["presets"]), ["first"])
+        self.assertEqual(self.get(["presets"]), ["first"])
+        self.assertEqual(PresetNames.calls, 1)
+
+        # Other paths are cached separately
+        self.get(["presets"], "/api/preset?page_size=1")
+        self.assertEqual(PresetNames.calls, 2)
+
+        # Unrelated changes don't invalidate it
+        with self.captureOnCommitCallbacks(execute=True):
+            Profile.objects.create()
+        self.get(["presets"])
+        self.assertEqual(PresetNames.calls, 2)
+
+        self.create_preset("second")
+        self.assertEqual(self.get(["presets"]), ["first", "second"])
+        self.assertEqual(PresetNames.calls, 3)
+
+    def test_invalidated_by_scratch_counts(self) -> None:
+        preset = self.create_preset("preset")
+        tags = [scratch_counts.response_tag(Kind.PRESET, str(preset.id))]
+
+        self.get(tags)
+        with self.captureOnCommitCallbacks(execute=True):
+            scratch_counts.adjust([(Kind.PRESET.value, "other")], 1)
+        self.get(tags)
+        self.assertEqual(PresetNames.calls, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            scratch_counts.adjust([(Kind.PRESET.value, str(preset.id))], 1)
+        self.get(tags)
+        self.assertEqual(PresetNames.calls, 2)
+
+    def test_shared_between_workers(self) -> None:
+        self.get(["presets"])
+
+        # Another worker has its own connection to the same cache
+        other_worker_cache = caches.create_connection("responses")
+        with patch("coreapp.response_cache._cache", return_value=other_worker_cache):
+            self.get(["presets"])
+        self.assertEqual(PresetNames.calls, 1)
+
+    def test_scratch_changes_invalidate_their_scratch_and_owner(self) -> None:
+        owner = Profile.objects.create()
+        assembly = Assembly.objects.create(hash="target-assembly", arch="mips")
+        with self.captureOnCommitCallbacks(execute=True):
+            scratch = Scratch.objects.create(
+                target_assembly=assembly,
+                platform="dummy",
+                compiler="dummy",
+                owner=owner,
+            )
+
+        paths = {
+            "scratches": "/api/scratch",
+            response_cache.scratch_tag(scratch.slug): f"/api/scratch/{scratch.slug}",
+            response_cache.owner_tag(owner.id): "/api/user/owner/scratches",
+        }
+
+        def get_all() -> set[str]:
+            calls = PresetNames.calls
+            changed = set()
+            for tag, path in paths.items():
+                self.get([tag], path)
+                if PresetNames.calls > calls:
+                    changed.add(tag)
+                calls = PresetNames.calls
+            return changed
+
+        get_all()
+
+        # e.g. a compilation updating the score
+        scratch.score = 10
+        with self.captureOnCommitCallbacks(execute=True):
+            scratch.save(update_fields=["score"])
+        self.assertEqual(
+            get_all(),
+            {
+                response_cache.scratch_tag(scratch.slug),
+                response_cache.owner_tag(owner.id),
+            },
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Scratch.objects.create(
+                target_assembly=assembly, platform="dummy", compiler="dummy"
+            )
+        self.assertEqual(get_all(), {"scratches"})
@@ -4,6 +4,7 @@ import json
 import zipfile
 from time import sleep
 from typing import Any
+from unittest.mock import patch
 from urllib.parse import urlencode
 
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -11,10 +12,16 @@ from django.db.models import ProtectedError
 from django.urls import reverse
 from rest_framework import status
 
-from coreapp import compilers, platforms
+from coreapp import compilers, diff_format, platforms
 from coreapp.compilers import EE_GCC29_991111, GCC281PM, IDO53, IDO71, MWCC_242_81
 from coreapp.libraries import Library
-from coreapp.models.scratch import Assembly, Context, LibrariesField, Scratch
+from coreapp.models.scratch import (
+    Assembly,
+    CompileSnapshot,
+    Context,
+    LibrariesField,
+    Scratch,
+)
 from coreapp.platforms import GC_WII, N64
 from coreapp.tests.common import BaseTestCase, requiresCompiler
 from coreapp.views.scratch import compile_scratch_update_score
@@ -509,8 +516,93 @@ class ScratchModificationTests(BaseTestCase):
         )
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertNotIn("left_object", response.json())
-        self.assertNotIn("right_object", response.json())
+        self.assertNotIn("left_object_hash", response.json())
+        self.assertNotIn("right_object_hash", response.json())
+
+    def test_compile_objects_are_served_by_hash(self) -> None:
+        scratch = self.create_nop_scratch()
+
+        response = self.client.get(
+            reverse("scratch-compile", kwargs={"pk": scratch.slug})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sha256 = response.json()["right_object_hash"]
+
+        url = reverse("object", args=[sha256])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.content.startswith(b"compiled("))
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(reverse("object", args=["0" * 64]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_compile_etag(self) -> None:
+        scratch = self.create_nop_scratch()
+        url = reverse("scratch-compile", kwargs={"pk": scratch.slug})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertIn("public", response["Cache-Control"])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        # POSTs compile unsaved changes, so aren't cacheable
+        response = self.client.post(url, {}, format="json")
+        self.assertNotIn("ETag", response)
+
+        # Nor are responses formatted for a particular client
+        for params in ["rows=10", "diff_format=compact", "since=abc", "timings=1"]:
+            response = self.client.get(f"{url}?{params}", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("ETag", response)
+            self.assertNotIn("X-Globally-Cacheable", response)
+
+        scratch.source_code = "int x;"
+        scratch.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_compile_snapshot(self) -> None:
+        scratch = self.create_nop_scratch()
+        url = reverse("scratch-compile", kwargs={"pk": scratch.slug})
+
+        # Scoring the new scratch takes the snapshot, which views are served
+        # without compiling or diffing again
+        snapshot = CompileSnapshot.objects.get(scratch=scratch)
+
+        with (
+            patch("coreapp.views.scratch.compile_scratch") as compile_scratch,
+            patch("coreapp.views.scratch.diff_compilation") as diff_compilation,
+        ):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        compile_scratch.assert_not_called()
+        diff_compilation.assert_not_called()
+        self.assertEqual(
+            response.json()["right_object_hash"], snapshot.right_object_hash
+        )
+        self.assertEqual(response.json()["diff_output"], snapshot.diff_output)
+
+        # Saving changes the snapshot's key, so the next view compiles again
+        scratch.source_code = "int x;"
+        scratch.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(
+            response.json()["right_object_hash"], snapshot.right_object_hash
+        )
+        updated = CompileSnapshot.objects.get(scratch=scratch)
+        self.assertNotEqual(updated.key, snapshot.key)
 
     @requiresCompiler(GCC281PM, EE_GCC29_991111)
     def test_compile_post_rejects_mismatched_compiler_platform(self) -> None:
@@ -828,6 +920,29 @@ class ScratchDetailTests(BaseTestCase):
         response = self.client.get(reverse("scratch-family", args=[scratch1.slug]))
         self.assertEqual(len(response.json()), 1)
 
+    def test_diff_rows(self) -> None:
+        scratch = self.create_nop_scratch()
+        url = reverse("scratch-diff-rows", args=[scratch.slug])
+
+        response = self.client.get(url, {"diff_id": "unknown"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        rows = [{"key": str(i)} for i in range(3)]
+        diff_format.window({"rows": rows}, scratch.slug, "diff", 1)
+
+        response = self.client.get(url, {"diff_id": "diff", "start": "1", "end": "5"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(), {"start": 1, "total_rows": 3, "rows": rows[1:]}
+        )
+
+        # Rows are only available through the scratch that was compiled
+        other = self.create_nop_scratch()
+        response = self.client.get(
+            reverse("scratch-diff-rows", args=[other.slug]), {"diff_id": "diff"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
 
 class ScratchExportTests(BaseTestCase):
     @requiresCompiler(IDO71)
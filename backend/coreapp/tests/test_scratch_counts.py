@@ -0,0 +1,92 @@
+from django.test import TestCase
+
+from coreapp import scratch_counts
+from coreapp.models.preset import Preset
+from coreapp.models.profile import Profile
+from coreapp.models.scratch import Assembly, Scratch, ScratchCount
+from coreapp.scratch_counts import Kind
+
+
+class ScratchCountTests(TestCase):
+    def setUp(self) -> None:
+        self.assembly = Assembly.objects.create(hash="target-assembly", arch="mips")
+        self.profile = Profile.objects.create()
+        self.preset = Preset.objects.create(
+            name="preset", platform="dummy", compiler="dummy"
+        )
+
+    def create_scratch(self, **kwargs: object) -> Scratch:
+        return Scratch.objects.create(
+            target_assembly=self.assembly,
+            platform="dummy",
+            compiler="dummy",
+            **kwargs,
+        )
+
+    def test_counts_created_scratches(self) -> None:
+        self.create_scratch(owner=self.profile, preset=self.preset)
+        self.create_scratch()
+
+        self.assertEqual(scratch_counts.get(Kind.ALL), 2)
+        self.assertEqual(scratch_counts.get(Kind.PLATFORM, "dummy"), 2)
+        self.assertEqual(scratch_counts.get(Kind.COMPILER, "dummy"), 2)
+        self.assertEqual(scratch_counts.get(Kind.PRESET, str(self.preset.id)), 1)
+        self.assertEqual(scratch_counts.get(Kind.OWNER, str(self.profile.id)), 1)
+        self.assertEqual(scratch_counts.get(Kind.PLATFORM, "n64"), 0)
+
+    def test_counts_reassigned_scratches(self) -> None:
+        scratch = self.create_scratch(owner=self.profile)
+        other = Profile.objects.create()
+
+        scratch = Scratch.objects.get(pk=scratch.pk)
+        scratch.owner = other
+        scratch.compiler = "other"
+        scratch.save()
+        # Saving without changes doesn't count it again
+        scratch.save()
+
+        self.assertEqual(scratch_counts.get(Kind.ALL), 1)
+        self.assertEqual(scratch_counts.get(Kind.OWNER, str(self.profile.id)), 0)
+        self.assertEqual(scratch_counts.get(Kind.OWNER, str(other.id)), 1)
+        self.assertEqual(scratch_counts.get(Kind.COMPILER, "dummy"), 0)
+        self.assertEqual(scratch_counts.get(Kind.COMPILER, "other"), 1)
+
+    def test_counts_deleted_scratches(self) -> None:
+        scratch = self.create_scratch(owner=self.profile)
+        self.create_scratch(owner=self.profile)
+        self.create_scratch()
+
+        scratch.delete()
+        Scratch.objects.filter(owner=self.profile).delete()
+
+        self.assertEqual(scratch_counts.get(Kind.ALL), 1)
+        self.assertEqual(scratch_counts.get(Kind.OWNER, str(self.profile.id)), 0)
+
+    def test_preset_annotation(self) -> None:
+        self.create_scratch(preset=self.preset)
+        other = Preset.objects.create(name="other", platform="dummy", compiler="dummy")
+
+        presets = Preset.objects.annotate(
+            num_scratches=scratch_counts.annotation(Kind.PRESET)
+        ).order_by("-num_scratches")
+
+        self.assertEqual(
+            [(preset.id, preset.num_scratches) for preset in presets],
+            [(self.preset.id, 1), (other.id, 0)],
+        )
+
+    def test_reconcile(self) -> None:
+        self.create_scratch(owner=self.profile)
+        self.create_scratch()
+        # Bulk updates bypass the signals
+        Scratch.objects.update(compiler="other")
+        ScratchCount.objects.filter(kind=Kind.ALL).update(count=5)
+
+        self.assertEqual(scratch_counts.reconcile(dry_run=True), 3)
+        self.assertEqual(scratch_counts.get(Kind.ALL), 5)
+
+        self.assertEqual(scratch_counts.reconcile(), 3)
+        self.assertEqual(scratch_counts.reconcile(), 0)
+        self.assertEqual(scratch_counts.get(Kind.ALL), 2)
+        self.assertEqual(scratch_counts.get(Kind.COMPILER, "dummy"), 0)
+        self.assertEqual(scratch_counts.get(Kind.COMPILER, "other"), 2)
@@ -1,6 +1,10 @@
+from unittest.mock import patch
+
 from django.urls import reverse
 from rest_framework import status
 
+from coreapp.filters.search import ranked_search
+from coreapp.models.scratch import Scratch
 from coreapp.tests.common import BaseTestCase
 
 
@@ -40,3 +44,37 @@ class SearchTests(BaseTestCase):
         )
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ranks_prefix_matches_first(self) -> None:
+        for name in ["my_func", "func_long_name", "func_a", "other"]:
+            scratch = self.create_nop_scratch()
+            scratch.name = name
+            scratch.save()
+
+        results = ranked_search(Scratch.objects.all(), "name", "FUNC")
+
+        self.assertEqual(
+            list(results.values_list("name", flat=True)),
+            ["func_a", "func_long_name", "my_func"],
+        )
+
+    def test_ranks_prefix_matches_beyond_candidates(self) -> None:
+        for name in ["my_func", "other_func", "func_a"]:
+            scratch = self.create_nop_scratch()
+            scratch.name = name
+            scratch.save()
+
+        with patch("coreapp.filters.search.MAX_RANKED_CANDIDATES", 1):
+            results = ranked_search(Scratch.objects.all(), "name", "func")
+
+        self.assertEqual(results.values_list("name", flat=True)[0], "func_a")
+
+    def test_short_queries_are_not_ranked(self) -> None:
+        for name in ["my_fn", "fn_a", "other"]:
+            scratch = self.create_nop_scratch()
+            scratch.name = name
+            scratch.save()
+
+        results = ranked_search(Scratch.objects.all(), "name", "fn")
+
+        self.assertCountEqual(results.values_list("name", flat=True), ["my_fn", "fn_a"])
@@ -0,0 +1,38 @@
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+from django.contrib.sessions.models import Session
+from django.test import TestCase
+
+from coreapp.housekeeping import remove_expired_sessions
+from coreapp.sessions import SessionStore
+
+
+class SessionTests(TestCase):
+    def create_session(self, expire_in: timedelta) -> str:
+        session = SessionStore()
+        session["profile_id"] = 1
+        session.set_expiry(expire_in)
+        session.save()
+        return str(session.session_key)
+
+    def test_clear_expired(self) -> None:
+        expired = [self.create_session(timedelta(seconds=-1)) for _ in range(5)]
+        active = self.create_session(timedelta(days=1))
+
+        with patch("coreapp.sessions.CLEAR_EXPIRED_BATCH_SIZE", 2):
+            SessionStore.clear_expired()
+
+        self.assertFalse(Session.objects.filter(pk__in=expired).exists())
+        self.assertEqual(SessionStore(active).get("profile_id"), 1)
+
+    def test_housekeeping_removes_expired_sessions(self) -> None:
+        expired = self.create_session(timedelta(seconds=-1))
+        active = self.create_session(timedelta(days=1))
+        cutoff_datetime = datetime.now(UTC) - timedelta(days=1)
+
+        self.assertEqual(remove_expired_sessions(cutoff_datetime, dry_run=True), 1)
+        self.assertEqual(remove_expired_sessions(cutoff_datetime), 1)
+
+        self.assertFalse(Session.objects.filter(pk=expired).exists())
+        self.assertTrue(Session.objects.filter(pk=active).exists())
@@ -0,0 +1,50 @@
+from django.test import TestCase
+
+from coreapp import timings
+
+
+class TimingsTests(TestCase):
+    def test_stages_are_only_recorded_while_collecting(self) -> None:
+        with timings.stage("compile"):
+            pass
+
+        with timings.collect() as collected:
+            with timings.stage("nm"):
+                pass
+            with timings.stage("nm"):
+                pass
+            timings.record_cache("compilation", "miss")
+
+        self.assertIsNone(timings.current())
+        self.assertEqual(list(collected.stages), ["nm"])
+        self.assertEqual(collected.cache, {"compilation": "miss"})
+
+    def test_cache_lookup(self) -> None:
+        def memoized(miss: bool) -> None:
+            if miss:
+                timings.cache_miss()
+
+        with timings.collect() as collected:
+            with timings.cache_lookup("objdump-target"):
+                memoized(miss=False)
+            with timings.cache_lookup("objdump-compiled"):
+                memoized(miss=True)
+
+        self.assertEqual(
+            collected.cache, {"objdump-target": "hit", "objdump-compiled": "miss"}
+        )
+        self.assertIn("objdump-target", collected.stages)
+
+    def test_server_timing(self) -> None:
+        collected = timings.Timings()
+        collected.add("compile", 12.345)
+        collected.merge({"stages": {"compile": 1}, "cache": {"compilation": "db"}})
+
+        self.assertEqual(
+            collected.server_timing(),
+            'compile;dur=13.35, cache-compilation;desc="db"',
+        )
+        self.assertEqual(
+            collected.as_dict(),
+            {"stages": {"compile": 13.35}, "cache": {"compilation": "db"}},
+        )
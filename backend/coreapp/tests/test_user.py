@@ -4,6 +4,7 @@ from django.urls import reverse
 from rest_framework import status
 
 from coreapp import compilers, platforms
+from coreapp.middleware import PLACEHOLDER_COOKIE
 from coreapp.models.github import GitHubUser
 from coreapp.models.profile import Profile
 from coreapp.tests.common import BaseTestCase
@@ -167,15 +168,49 @@ class UserTests(BaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json()["is_anonymous"], True)
 
-        self.assertEqual(Profile.objects.count(), 2)  # logged-out
+        # the logged-out profile isn't saved until it's needed
+        self.assertEqual(Profile.objects.count(), 1)
 
         for i in range(3):
             # verify we are logged out
             response = self.client.get(self.current_user_url)
             self.assertEqual(response.json()["is_anonymous"], True)
 
-        # all the above GETs should have used the same logged-out profile
-        self.assertEqual(Profile.objects.count(), 2)
+        self.assertEqual(Profile.objects.count(), 1)
+
+    def test_placeholder_profile(self) -> None:
+        """
+        Ensure that anonymous profiles are only saved once they claim a scratch,
+        keeping the pseudonym they were given before.
+        """
+        for i in range(2):
+            response = self.client.post(
+                "/api/scratch",
+                {
+                    "compiler": compilers.DUMMY.id,
+                    "platform": platforms.DUMMY.id,
+                    "context": "",
+                    "target_asm": "jr $ra\nnop\n",
+                },
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(Profile.objects.count(), 0)
+        placeholder = self.client.cookies[PLACEHOLDER_COOKIE].value
+
+        response = self.client.post(
+            f"/api/scratch/{response.json()['slug']}/claim",
+            {"token": response.json()["claim_token"]},
+        )
+        self.assertTrue(response.json()["success"])
+
+        self.assertEqual(Profile.objects.count(), 1)
+        profile = Profile.objects.get()
+        self.assertTrue(placeholder.startswith(f"{profile.pseudonym}:"))
+        self.assertEqual(self.client.cookies[PLACEHOLDER_COOKIE].value, "")
+
+        response = self.client.get(self.current_user_url)
+        self.assertEqual(response.json()["id"], profile.id)
 
     @responses.activate
     def test_own_scratch(self) -> None:
@@ -197,6 +232,8 @@ class UserTests(BaseTestCase):
         slug = response.json()["slug"]
 
         self.test_github_login()
+        # The placeholder profile is replaced by the logged-in one
+        self.assertEqual(self.client.cookies[PLACEHOLDER_COOKIE].value, "")
 
         response = self.client.post(
             f"/api/scratch/{slug}/claim", {"token": claim_token}
@@ -212,6 +249,39 @@ class UserTests(BaseTestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
+    @responses.activate
+    def test_claim_as_placeholder_then_login(self) -> None:
+        """
+        Claim a scratch anonymously, before the profile is saved, then log in and
+        verify that the scratch moves to your logged-in user.
+        """
+        response = self.client.post(
+            "/api/scratch",
+            {
+                "compiler": compilers.DUMMY.id,
+                "platform": platforms.DUMMY.id,
+                "context": "",
+                "target_asm": "jr $ra\nnop\n",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(self.client.cookies[PLACEHOLDER_COOKIE].value, "")
+        slug = response.json()["slug"]
+
+        response = self.client.post(
+            f"/api/scratch/{slug}/claim", {"token": response.json()["claim_token"]}
+        )
+        self.assertTrue(response.json()["success"])
+
+        self.test_github_login()
+
+        response = self.client.get(f"/api/scratch/{slug}")
+        self.assertEqual(response.json()["owner"]["username"], GITHUB_USER["login"])
+
+        response = self.client.get(self.current_user_url)
+        self.assertFalse(response.json()["is_anonymous"])
+        self.assertEqual(self.client.cookies[PLACEHOLDER_COOKIE].value, "")
+
     @responses.activate
     def test_cant_delete_scratch(self) -> None:
         """
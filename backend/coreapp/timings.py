@@ -0,0 +1,118 @@
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from . import metrics
+
+
+class Timings:
+    """
+    How long each stage of a request took (in ms), and whether each cache
+    layer it went through was hit.
+    """
+
+    def __init__(self) -> None:
+        self.stages: dict[str, float] = {}
+        self.cache: dict[str, str] = {}
+        # Stages may run concurrently, e.g. the target and compiled objdumps
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, ms: float) -> None:
+        # Stages that run more than once (e.g. nm) are summed
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + ms
+
+    def merge(self, data: dict[str, Any]) -> None:
+        """
+        Merge timings recorded elsewhere, e.g. by a compile worker
+        """
+        for stage, ms in data.get("stages", {}).items():
+            self.add(stage, ms)
+        self.cache.update(data.get("cache", {}))
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "stages": {stage: round(ms, 2) for stage, ms in self.stages.items()},
+            "cache": dict(self.cache),
+        }
+
+    def server_timing(self) -> str:
+        """
+        Format as a Server-Timing header value, see
+        https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/Server-Timing
+        """
+        metrics = [f"{stage};dur={ms:.2f}" for stage, ms in self.stages.items()]
+        metrics += [
+            f'cache-{layer};desc="{outcome}"' for layer, outcome in self.cache.items()
+        ]
+        return ", ".join(metrics)
+
+
+_current: ContextVar[Timings | None] = ContextVar("timings", default=None)
+
+
+def current() -> Timings | None:
+    return _current.get()
+
+
+@contextmanager
+def collect() -> Iterator[Timings]:
+    """
+    Record the timings of everything run within this block
+    """
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - start) * 1000)
+
+
+def record_cache(layer: str, outcome: str) -> None:
+    metrics.CACHE_REQUESTS.inc(layer, outcome)
+    timings = _current.get()
+    if timings is not None:
+        timings.cache[layer] = outcome
+
+
+# Set by cache_miss() while inside a cache_lookup() block
+_cache_missed: ContextVar[list[bool] | None] = ContextVar("cache_missed", default=None)
+
+
+@contextmanager
+def cache_lookup(layer: str) -> Iterator[None]:
+    """
+    Time a call to a memoized function. It is recorded as a hit
+    unless the function body calls `cache_miss()`.
+    """
+    missed = [False]
+    token = _cache_missed.set(missed)
+    try:
+        with stage(layer):
+            yield
+    finally:
+        _cache_missed.reset(token)
+    record_cache(layer, "miss" if missed[0] else "hit")
+
+
+def cache_miss() -> None:
+    missed = _cache_missed.get()
+    if missed is not None:
+        missed[0] = True
@@ -2,9 +2,12 @@ from django.urls import path
 from rest_framework.routers import DefaultRouter
 
 from coreapp.views import (
+    compile_job,
     compiler,
     health,
     library,
+    metrics,
+    objects,
     platform,
     preset,
     project,
@@ -23,6 +26,11 @@ router.register(r"project", project.ProjectViewSet)
 urlpatterns = [
     *router.urls,
     path("compiler", compiler.CompilerDetail.as_view(), name="compiler"),
+    path(
+        "compile-job/<uuid:id>",
+        compile_job.CompileJobDetail.as_view(),
+        name="compile-job",
+    ),
     path("healthz", health.HealthCheck.as_view(), name="healthz"),
     path(
         "compiler/<str:platform>/<str:compiler>",
@@ -35,6 +43,8 @@ urlpatterns = [
         name="available-compilers",
     ),
     path("library", library.LibraryDetail.as_view(), name="library"),
+    path("metrics", metrics.Metrics.as_view(), name="metrics"),
+    path("object/<str:sha256>", objects.ObjectDetail.as_view(), name="object"),
     path("platform", platform.PlatformDetail.as_view(), name="platform"),
     path(
         "platform/<slug:id>",
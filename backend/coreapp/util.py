@@ -1,12 +1,62 @@
 import hashlib
 import logging
-import time
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Generic, TypeVar
 
 logger = logging.getLogger(__name__)
 
-_startup_time = int(time.time())
-logger.info("Startup time: %s", _startup_time)
+K = TypeVar("K")
+V = TypeVar("V")
 
 
 def gen_hash(key: tuple[str, ...]) -> str:
-    return hashlib.sha256(str(key + (_startup_time,)).encode("utf-8")).hexdigest()
+    return hashlib.sha256(str(key).encode("utf-8")).hexdigest()
+
+
+class SizedLRUCache(Generic[K, V]):
+    """
+    A thread-safe LRU cache that is bounded by the total size of its values
+    (as reported by `sizeof`) rather than by the number of entries.
+    """
+
+    def __init__(self, max_size: int, sizeof: Callable[[V], int]):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self._entries: OrderedDict[K, tuple[V, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: K, value: V) -> None:
+        value_size = self.sizeof(value)
+        if value_size > self.max_size:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+
+            self._entries[key] = (value, value_size)
+            self.size += value_size
+
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
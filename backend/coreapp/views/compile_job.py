@@ -0,0 +1,58 @@
+from uuid import UUID
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .. import compile_queue, timings
+from ..models.compile_job import CompileJob
+
+
+def compile_job_response(job: CompileJob, wait_seconds: float) -> Response:
+    if wait_seconds > 0 and not job.is_finished:
+        job = compile_queue.wait_for_job(job.id, wait_seconds)
+
+    if job.status == CompileJob.Status.DONE:
+        result = dict(job.result or {})
+        job_timings = result.pop("timings", None)
+        if job_timings is not None:
+            if current := timings.current():
+                current.merge(job_timings)
+            if job.request.get("include_timings"):
+                result["timings"] = job_timings
+        return Response(result)
+
+    if job.status == CompileJob.Status.FAILED:
+        return Response(job.result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response(
+        {"job": str(job.id), "status": job.status},
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+def requested_wait(request: Request) -> float:
+    """
+    How long the request asked to wait for its job with `?wait=<seconds>`, as
+    web workers aren't kept waiting for jobs unless clients ask them to
+    """
+    try:
+        wait = float(request.query_params.get("wait", "0"))
+    except ValueError:
+        raise ValidationError({"wait": "Must be a number."})
+    return min(max(wait, 0), settings.COMPILE_QUEUE_WAIT_SECONDS)
+
+
+class CompileJobDetail(APIView):
+    """
+    Poll for the result of a queued compilation.
+    Pass `?wait=<seconds>` to wait for the job to finish before responding.
+    """
+
+    def get(self, request: Request, id: UUID) -> Response:
+        job = get_object_or_404(CompileJob, id=id)
+        return compile_job_response(job, requested_wait(request))
@@ -1,6 +1,7 @@
 import typing
 from datetime import datetime
 
+from django.http import HttpRequest
 from django.utils.decorators import method_decorator
 from django.utils.timezone import now
 from rest_framework.exceptions import NotFound
@@ -11,7 +12,7 @@ from rest_framework.views import APIView
 from coreapp import compilers
 from coreapp.models.preset import Preset
 
-from ..decorators.cache import globally_cacheable
+from ..decorators.cache import globally_cacheable, server_cacheable
 from ..decorators.django import condition
 
 boot_time = now()
@@ -21,6 +22,13 @@ def endpoint_updated(request: Request, **_: typing.Any) -> datetime:
     return max(Preset.most_recent_updated(request), boot_time)
 
 
+def compiler_cache_tags(request: HttpRequest, **_: typing.Any) -> list[str]:
+    return [compilers.response_tag()]
+
+
+@method_decorator(
+    server_cacheable(timeout=300, tags=compiler_cache_tags), name="dispatch"
+)
 @method_decorator(
     globally_cacheable(max_age=300, stale_while_revalidate=30), name="dispatch"
 )
@@ -55,6 +63,9 @@ class SingleCompilerDetail(APIView):
         )
 
 
+@method_decorator(
+    server_cacheable(timeout=300, tags=compiler_cache_tags), name="dispatch"
+)
 @method_decorator(
     globally_cacheable(max_age=300, stale_while_revalidate=30), name="dispatch"
 )
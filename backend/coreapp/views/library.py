@@ -1,3 +1,4 @@
+from django.http import HttpRequest
 from django.utils.decorators import method_decorator
 from django.utils.timezone import now
 from rest_framework.request import Request
@@ -6,12 +7,19 @@ from rest_framework.views import APIView
 
 from coreapp import libraries
 
-from ..decorators.cache import globally_cacheable
+from ..decorators.cache import globally_cacheable, server_cacheable
 from ..decorators.django import condition
 
 boot_time = now()
 
 
+def library_cache_tags(request: HttpRequest, **kwargs: object) -> list[str]:
+    return [libraries.response_tag()]
+
+
+@method_decorator(
+    server_cacheable(timeout=300, tags=library_cache_tags), name="dispatch"
+)
 @method_decorator(
     globally_cacheable(max_age=300, stale_while_revalidate=30), name="dispatch"
 )
@@ -0,0 +1,17 @@
+from django.http import HttpResponse
+from rest_framework.request import Request
+from rest_framework.views import APIView
+
+from .. import metrics
+
+
+class Metrics(APIView):
+    """
+    Backend metrics in the Prometheus text exposition format
+    """
+
+    def get(self, request: Request) -> HttpResponse:
+        return HttpResponse(
+            metrics.REGISTRY.exposition(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
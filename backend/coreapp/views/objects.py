@@ -0,0 +1,37 @@
+import re
+
+from django.http import HttpResponse
+from rest_framework.request import Request
+from rest_framework.views import APIView
+
+from .. import object_store
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _cacheable(response: HttpResponse, sha256: str) -> HttpResponse:
+    # Objects are content-addressed, so they never change
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    response["ETag"] = f'"{sha256}"'
+    return response
+
+
+class ObjectDetail(APIView):
+    """
+    The raw bytes of an object file returned by compile, see object_store
+    """
+
+    def get(self, request: Request, sha256: str) -> HttpResponse:
+        if not SHA256_RE.match(sha256):
+            return HttpResponse(status=404)
+
+        if request.headers.get("If-None-Match") == f'"{sha256}"':
+            return _cacheable(HttpResponse(status=304), sha256)
+
+        data = object_store.load(sha256)
+        if data is None:
+            return HttpResponse(status=404)
+
+        return _cacheable(
+            HttpResponse(data, content_type="application/octet-stream"), sha256
+        )
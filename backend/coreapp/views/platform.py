@@ -9,9 +9,9 @@ from rest_framework.views import APIView
 
 from coreapp import compilers
 from coreapp.models.preset import Preset
-from coreapp.views.compiler import CompilerDetail
+from coreapp.views.compiler import CompilerDetail, compiler_cache_tags
 
-from ..decorators.cache import globally_cacheable
+from ..decorators.cache import globally_cacheable, server_cacheable
 from ..decorators.django import condition
 
 boot_time = now()
@@ -21,6 +21,9 @@ def endpoint_updated(request: Request) -> datetime:
     return max(Preset.most_recent_updated(request), boot_time)
 
 
+@method_decorator(
+    server_cacheable(timeout=300, tags=compiler_cache_tags), name="dispatch"
+)
 @method_decorator(
     globally_cacheable(max_age=300, stale_while_revalidate=30), name="dispatch"
 )
@@ -34,6 +37,7 @@ class PlatformDetail(APIView):
         return Response(CompilerDetail.platforms_json())
 
 
+@server_cacheable(timeout=300, tags=compiler_cache_tags)
 @api_view(["GET"])
 @globally_cacheable(max_age=300, stale_while_revalidate=30)
 def single_platform(request: Request, id: str) -> Response:
@@ -3,7 +3,7 @@ from typing import Any
 
 import django_filters
 from django import forms
-from django.db.models import Count
+from django.http import HttpRequest
 from django.utils.decorators import method_decorator
 from rest_framework import filters, serializers, status
 from rest_framework.decorators import action
@@ -19,8 +19,11 @@ from coreapp.models.profile import Profile
 from coreapp.pagination import SafeCursorPagination
 from coreapp.serializers import PresetSerializer, TinyPresetSerializer
 
-from ..decorators.cache import globally_cacheable
+from .. import scratch_counts
+from ..decorators.cache import globally_cacheable, server_cacheable
 from ..filters.search import NonEmptySearchFilter
+from ..middleware import materialize_profile
+from ..scratch_counts import Kind
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +68,22 @@ class PresetFilterSet(django_filters.FilterSet):
         fields = ["platform", "compiler", "owner"]
 
 
+def preset_cache_tags(request: HttpRequest, pk: str | None = None) -> list[str] | None:
+    if pk is None:
+        return ["presets", "profiles", "scratch-counts"]
+    if not pk.isdigit():
+        return None
+    preset_id = str(int(pk))
+    return [
+        f"preset:{preset_id}",
+        "profiles",
+        scratch_counts.response_tag(Kind.PRESET, preset_id),
+    ]
+
+
+@method_decorator(
+    server_cacheable(timeout=300, tags=preset_cache_tags), name="dispatch"
+)
 @method_decorator(
     globally_cacheable(max_age=300, stale_while_revalidate=30), name="dispatch"
 )
@@ -73,7 +92,7 @@ class PresetViewSet(ModelViewSet):  # type: ignore
     queryset = (
         Preset.objects.select_related("owner__user", "owner__user__github")
         .all()
-        .annotate(num_scratches=Count("scratch"))
+        .annotate(num_scratches=scratch_counts.annotation(Kind.PRESET))
     )
     pagination_class = PresetPagination
     filterset_class = PresetFilterSet
@@ -97,7 +116,7 @@ class PresetViewSet(ModelViewSet):  # type: ignore
         if profile.is_anonymous():
             raise AuthorizationException()
 
-        serializer.save(owner=profile)
+        serializer.save(owner=materialize_profile(self.request))  # type: ignore[arg-type]
 
     def destroy(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         return Response(
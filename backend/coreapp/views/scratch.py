@@ -1,41 +1,55 @@
-import base64
+import functools
 import hashlib
+import importlib.metadata
 import io
 import json
 import logging
 import re
 import zipfile
 from datetime import datetime
-from typing import Any
+from typing import Any, TypeVar
 
 import django_filters
+from django.conf import settings
 from django.core.files import File
 from django.db.models import Case, F, FloatField, Value, When
 from django.db.models.functions import Cast
 from django.db.models.query import QuerySet
-from django.http import HttpResponse, QueryDict
+from django.http import HttpRequest, HttpResponse, QueryDict
+from django.http.response import HttpResponseBase
+from django.utils.cache import get_conditional_response
 from django.utils.decorators import method_decorator
+from django.utils.http import quote_etag
 from rest_framework import filters, mixins, serializers, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import APIException
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
-from coreapp import compilers, platforms
+from coreapp import (
+    compile_queue,
+    compilers,
+    diff_format,
+    object_store,
+    platforms,
+    response_cache,
+    timings,
+)
 
 from ..compiler_wrapper import CompilerWrapper
 from ..decompiler_wrapper import DecompilerWrapper
-from ..decorators.cache import globally_cacheable
+from ..decorators.cache import globally_cacheable, server_cacheable
 from ..decorators.django import condition
 from ..diff_wrapper import DiffWrapper
 from ..error import CompilationError, DiffError
 from ..filters.scratch import ScratchFilter
 from ..filters.search import NonEmptySearchFilter
 from ..libraries import Library
-from ..middleware import Request
+from ..middleware import Request, materialize_profile
 from ..models.best_fork import update_best_forks_for_scratch
+from ..models.compile_job import CompileJob
 from ..models.preset import Preset
-from ..models.scratch import Asm, Assembly, Scratch
+from ..models.scratch import Asm, Assembly, CompileSnapshot, Scratch
 from ..pagination import SafeCursorPagination
 from ..platforms import Platform
 from ..serializers import (
@@ -47,9 +61,12 @@ from ..serializers import (
     TerseScratchSerializer,
 )
 from ..wrapper_result import CompilationResult, DiffResult
+from .compile_job import compile_job_response, requested_wait
 
 logger = logging.getLogger(__name__)
 
+DIFF_ROWS_PAGE_SIZE = 500
+
 
 class ProjectNotMemberException(APIException):
     status_code = status.HTTP_403_FORBIDDEN
@@ -118,6 +135,7 @@ def compile_scratch(scratch: Scratch, context: str | None = None) -> Compilation
 def diff_compilation(
     scratch: Scratch,
     compilation: CompilationResult,
+    score_only: bool = False,
 ) -> DiffResult:
     try:
         return DiffWrapper.diff(
@@ -126,11 +144,26 @@ def diff_compilation(
             scratch.diff_label,
             bytes(compilation.elf_object),
             diff_flags=scratch.diff_flags,
+            score_only=score_only,
         )
     except DiffError as e:
         return DiffResult(None, str(e))
 
 
+def compilation_diff_id(scratch: Scratch, object_hash: str | None) -> str:
+    """
+    Identifies the diff of a compiled object against the scratch's target
+    """
+    key = [
+        scratch.target_assembly.hash,
+        scratch.platform,
+        scratch.diff_label,
+        scratch.diff_flags,
+        object_hash,
+    ]
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+
 def update_scratch_score(
     scratch: Scratch,
     diff: DiffResult,
@@ -150,21 +183,212 @@ def update_scratch_score(
         update_best_forks_for_scratch(scratch)
 
 
+def compilation_result(
+    scratch: Scratch,
+    compilation: CompilationResult,
+    diff: DiffResult,
+    store_objects: bool,
+) -> dict[str, Any]:
+    """
+    The outcome of a compilation, before its diff is formatted for the response
+    """
+    compiler_output = ""
+    if compilation.errors:
+        compiler_output += compilation.errors + "\n"
+    if diff.errors:
+        compiler_output += diff.errors + "\n"
+
+    objects = (bytes(scratch.target_assembly.elf_object), bytes(compilation.elf_object))
+    if store_objects:
+        # Fetched from /api/object/<hash> when needed
+        left, right = object_store.store(*objects)
+    else:
+        left, right = (object_store.object_hash(obj) for obj in objects)
+
+    return {
+        "diff_output": diff.result,
+        "compiler_output": compiler_output,
+        "success": compilation.elf_object is not None
+        and len(compilation.elf_object) > 0,
+        "left_object_hash": left,
+        "right_object_hash": right,
+    }
+
+
+def load_compile_snapshot(scratch: Scratch, key: str) -> dict[str, Any] | None:
+    """
+    The result of compiling the scratch as it is saved, from its snapshot if it
+    has one for the key
+    """
+    snapshot = CompileSnapshot.objects.filter(scratch=scratch, key=key).first()
+    if snapshot is None or snapshot.diff_output is None:
+        return None
+
+    # GETs have always updated the score, e.g. after it was reset
+    if snapshot.score is not None and snapshot.max_score is not None:
+        update_scratch_score(
+            scratch,
+            DiffResult(
+                {"current_score": snapshot.score, "max_score": snapshot.max_score}
+            ),
+        )
+
+    return {
+        "diff_output": snapshot.diff_output,
+        "compiler_output": snapshot.compiler_output,
+        "success": True,
+        "left_object_hash": snapshot.left_object_hash,
+        "right_object_hash": snapshot.right_object_hash,
+    }
+
+
+def compile_saved_scratch(scratch: Scratch, score_only: bool = False) -> dict[str, Any]:
+    """
+    Compile and diff the scratch as it is saved, updating its score and, if it
+    compiles, the snapshot that is served to viewers instead of compiling it
+    again. With `score_only`, exact matches skip the full diff, so their
+    snapshot is left to the next view to take.
+    """
+    key = scratch_compile_key(scratch)
+    compilation = compile_scratch(scratch)
+    diff = diff_compilation(scratch, compilation, score_only=score_only)
+    update_scratch_score(scratch, diff)
+
+    result = compilation_result(scratch, compilation, diff, store_objects=True)
+    # Failures can be transient, e.g. timeouts, so aren't kept
+    if result["success"] and diff.result is not None and "rows" in diff.result:
+        CompileSnapshot.objects.update_or_create(
+            scratch=scratch,
+            defaults={
+                "key": key,
+                "compiler_output": result["compiler_output"],
+                "diff_output": diff.result,
+                "score": diff.result.get("current_score"),
+                "max_score": diff.result.get("max_score"),
+                "left_object_hash": result["left_object_hash"],
+                "right_object_hash": result["right_object_hash"],
+            },
+        )
+    return result
+
+
 def compile_scratch_update_score(
     scratch: Scratch,
 ) -> None:
     """
-    Initialize the scratch's score and ignore errors should they occur
+    Initialize the scratch's score and compile snapshot and ignore errors should
+    they occur. With the compile queue, they're updated by a compile worker
+    afterwards.
     """
 
-    compilation = compile_scratch(scratch)
+    if compile_queue.is_enabled():
+        compile_queue.submit_job(scratch, CompileJob.Kind.SCORE)
+        return
+
     try:
-        diff = diff_compilation(scratch, compilation)
-        update_scratch_score(scratch, diff)
+        compile_saved_scratch(scratch, score_only=True)
     except Exception:
         pass
 
 
+def format_compilation(
+    scratch: Scratch,
+    result: dict[str, Any],
+    partial: dict[str, Any],
+) -> dict[str, Any]:
+    """
+    The compile response for the result of compilation_result, as requested
+    by the (validated) partial
+    """
+
+    diff_output = result["diff_output"]
+    if diff_output is not None and "row_limit" in partial:
+        with timings.stage("window"):
+            diff_output = diff_format.window(
+                diff_output,
+                scratch.slug,
+                compilation_diff_id(scratch, result["right_object_hash"]),
+                partial["row_limit"],
+            )
+    if diff_output is not None and partial.get("diff_format") == "compact":
+        with timings.stage("encode"):
+            diff_output = diff_format.encode(diff_output, partial.get("diff_since"))
+
+    response = {
+        "diff_output": diff_output,
+        "compiler_output": result["compiler_output"],
+        "success": result["success"],
+    }
+
+    if partial.get("include_objects"):
+        response["left_object_hash"] = result["left_object_hash"]
+        response["right_object_hash"] = result["right_object_hash"]
+
+    if partial.get("include_timings") and (current := timings.current()):
+        response["timings"] = current.as_dict()
+
+    return response
+
+
+def compile_scratch_with_partial(
+    scratch: Scratch,
+    partial: dict[str, Any],
+    update_score: bool = False,
+) -> dict[str, Any]:
+    """
+    Compile and diff the scratch with the (validated) partial applied on top of it,
+    without saving the partial. With `update_score`, the partial only selects
+    how the result is formatted and the scratch is compiled as it is saved.
+    """
+
+    if update_score:
+        return format_compilation(scratch, compile_saved_scratch(scratch), partial)
+
+    scratch_context = None
+    if "compiler" in partial:
+        scratch.compiler = partial["compiler"]
+    if "compiler_flags" in partial:
+        scratch.compiler_flags = partial["compiler_flags"]
+    if "diff_flags" in partial:
+        scratch.diff_flags = partial["diff_flags"]
+    if "diff_label" in partial:
+        scratch.diff_label = partial["diff_label"]
+    if "source_code" in partial:
+        scratch.source_code = partial["source_code"] or ""
+    if "context" in partial:
+        scratch_context = partial["context"]
+    if "libraries" in partial:
+        scratch.libraries = [Library(**lib) for lib in partial["libraries"]]
+
+    compilation = compile_scratch(scratch, context=scratch_context)
+    diff = diff_compilation(scratch, compilation)
+    result = compilation_result(
+        scratch, compilation, diff, store_objects=bool(partial.get("include_objects"))
+    )
+    return format_compilation(scratch, result, partial)
+
+
+def run_compile_job(job: CompileJob) -> dict[str, Any]:
+    """
+    Executes a queued compile job, see compile_queue
+    """
+
+    result: dict[str, Any]
+    with timings.collect() as job_timings:
+        if job.kind == CompileJob.Kind.SCORE:
+            compile_saved_scratch(job.scratch, score_only=True)
+            result = {"score": job.scratch.score, "max_score": job.scratch.max_score}
+        else:
+            result = compile_scratch_with_partial(
+                job.scratch, job.request, job.update_score
+            )
+
+    # Passed back to the web worker for its Server-Timing header,
+    # see compile_job_response
+    result["timings"] = job_timings.as_dict()
+    return result
+
+
 def scratch_last_modified(
     request: Request,
     pk: str | None = None,
@@ -180,6 +404,82 @@ def scratch_last_modified(
 scratch_condition = condition(last_modified_func=scratch_last_modified)
 
 
+R = TypeVar("R", bound=HttpResponseBase)
+
+
+def compiler_fingerprint(compiler_id: str) -> int | None:
+    """
+    Changes when a compiler is (re)installed
+    """
+    try:
+        return compilers.from_id(compiler_id).path.stat().st_mtime_ns
+    except (APIException, OSError):
+        return None
+
+
+# Bump when a change to the backend changes how scratches compile or diff, for
+# builds without a BUILD_ID
+COMPILE_RESULTS_VERSION = 1
+
+
+@functools.cache
+def _code_version() -> str:
+    try:
+        asm_differ = importlib.metadata.distribution("asm-differ")
+    except importlib.metadata.PackageNotFoundError:
+        asm_differ_version = ""
+    else:
+        direct_url = json.loads(asm_differ.read_text("direct_url.json") or "{}")
+        asm_differ_version = direct_url.get("vcs_info", {}).get(
+            "commit_id", asm_differ.version
+        )
+    return f"{COMPILE_RESULTS_VERSION}-{asm_differ_version}"
+
+
+def build_id() -> str:
+    """
+    settings.BUILD_ID, or otherwise the version of the code that compile
+    results depend on: COMPILE_RESULTS_VERSION and the asm-differ commit
+    """
+    return settings.BUILD_ID or _code_version()
+
+
+# Query parameters of compile that format its response for a particular client
+COMPILE_FORMAT_PARAMS = frozenset(["rows", "diff_format", "since", "timings"])
+
+
+def cacheable_compile_response(response: R, etag: str) -> R:
+    """
+    Let browsers and nginx keep compile results, revalidating them with the
+    ETag (see scratch_compile_key) rather than compiling again
+    """
+    response["ETag"] = etag
+    response["Cache-Control"] = "public, max-age=1"
+    response["X-Globally-Cacheable"] = True
+    return response
+
+
+def scratch_compile_key(scratch: Scratch) -> str:
+    """
+    Identifies the result of compiling a scratch as it is saved, so that
+    unchanged scratches aren't compiled again for each view
+    """
+    key = [
+        build_id(),
+        compiler_fingerprint(scratch.compiler),
+        scratch.platform,
+        scratch.compiler,
+        scratch.compiler_flags,
+        scratch.diff_flags,
+        scratch.diff_label,
+        scratch.source_code,
+        scratch.context_fk.text if scratch.context_fk else "",
+        [[lib.name, lib.version] for lib in scratch.libraries],
+        scratch.target_assembly.hash,
+    ]
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+
 def is_contentful_asm(asm: Asm | None) -> bool:
     if asm is None:
         return False
@@ -283,7 +583,7 @@ def create_scratch(
 
 
 def profile_can_own_scratch(request: Request) -> bool:
-    return request.profile.id is not None
+    return materialize_profile(request).id is not None
 
 
 class ScratchPagination(SafeCursorPagination):
@@ -293,6 +593,17 @@ class ScratchPagination(SafeCursorPagination):
     max_page_size = 100
 
 
+def scratch_cache_tags(request: HttpRequest, **kwargs: Any) -> list[str] | None:
+    url_name = request.resolver_match.url_name if request.resolver_match else None
+    if url_name == "scratch-list":
+        return ["scratches", "profiles"]
+    if url_name == "scratch-detail":
+        return [response_cache.scratch_tag(kwargs["pk"]), "profiles"]
+    # Compilations have their own caches, see scratch_compile_key()
+    return None
+
+
+@method_decorator(server_cacheable(timeout=5, tags=scratch_cache_tags), name="dispatch")
 @method_decorator(globally_cacheable(max_age=5, stale_while_revalidate=1), name="list")
 @method_decorator(globally_cacheable(max_age=1), name="retrieve")
 class ScratchViewSet(
@@ -386,12 +697,21 @@ class ScratchViewSet(
 
     # POST on compile takes a partial and does not update the scratch's compilation status
     @action(detail=True, methods=["GET", "POST"])
-    def compile(self, request: Request, pk: str) -> Response:
+    def compile(self, request: Request, pk: str) -> HttpResponseBase:
         scratch: Scratch = self.get_object()
 
-        # Apply partial
-        include_objects = False
-        scratch_context = None
+        key = etag = None
+        if request.method == "GET":
+            key = scratch_compile_key(scratch)
+            # Responses formatted for a client aren't the same for everyone,
+            # and windowed ones would outlive the rows they refer to
+            if not COMPILE_FORMAT_PARAMS.intersection(request.query_params):
+                etag = quote_etag(key)
+                not_modified = get_conditional_response(request, etag=etag)
+                if not_modified is not None:
+                    return cacheable_compile_response(not_modified, etag)
+
+        partial: dict[str, Any] = {"include_objects": True}
         if request.method == "POST":
             compile_ser = ScratchCompileSerializer(
                 data=request.data, context={"scratch": scratch}
@@ -399,50 +719,64 @@ class ScratchViewSet(
             compile_ser.is_valid(raise_exception=True)
             partial = compile_ser.validated_data
 
-            if "compiler" in partial:
-                scratch.compiler = partial["compiler"]
-            if "compiler_flags" in partial:
-                scratch.compiler_flags = partial["compiler_flags"]
-            if "diff_flags" in partial:
-                scratch.diff_flags = partial["diff_flags"]
-            if "diff_label" in partial:
-                scratch.diff_label = partial["diff_label"]
-            if "source_code" in partial:
-                scratch.source_code = partial["source_code"] or ""
-            if "context" in partial:
-                scratch_context = partial["context"]
-            if "libraries" in partial:
-                scratch.libraries = [Library(**lib) for lib in partial["libraries"]]
-            include_objects = partial["include_objects"]
-
-        compilation = compile_scratch(scratch, context=scratch_context)
-        diff = diff_compilation(scratch, compilation)
+        if request.query_params.get("timings"):
+            partial["include_timings"] = True
+        if "rows" in request.query_params:
+            partial["row_limit"] = serializers.IntegerField(min_value=0).run_validation(
+                request.query_params["rows"]
+            )
+        if request.query_params.get("diff_format") == "compact":
+            partial["diff_format"] = "compact"
+            partial["diff_since"] = request.query_params.get("since")
+
+        update_score = request.method == "GET"
+
+        snapshot = load_compile_snapshot(scratch, key) if key is not None else None
+        if snapshot is not None:
+            response = Response(format_compilation(scratch, snapshot, partial))
+        elif compile_queue.is_enabled():
+            job = compile_queue.submit_job(
+                scratch,
+                CompileJob.Kind.COMPILE,
+                request=partial,
+                update_score=update_score,
+            )
+            # Polled for with /api/compile-job/<id> unless the client waits
+            response = compile_job_response(job, requested_wait(request))
+        else:
+            response = Response(
+                compile_scratch_with_partial(scratch, partial, update_score)
+            )
 
-        if request.method == "GET":
-            update_scratch_score(scratch, diff)
-
-        compiler_output = ""
-        if compilation.errors:
-            compiler_output += compilation.errors + "\n"
-        if diff.errors:
-            compiler_output += diff.errors + "\n"
-
-        response = {
-            "diff_output": diff.result,
-            "compiler_output": compiler_output,
-            "success": compilation.elf_object is not None
-            and len(compilation.elf_object) > 0,
-        }
+        # Not while the compilation is still queued
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            return cacheable_compile_response(response, etag)
+        return response
 
-        if include_objects or request.method == "GET":
+    @action(detail=True)
+    def diff_rows(self, request: Request, pk: str) -> Response:
+        """
+        Rows of a diff returned by compile with ?rows=N
+        """
+        scratch: Scratch = self.get_object()
 
-            def to_base64(obj: bytes) -> str:
-                return base64.b64encode(obj).decode("utf-8")
+        diff_id = request.query_params.get("diff_id", "")
+        start = serializers.IntegerField(min_value=0).run_validation(
+            request.query_params.get("start", 0)
+        )
+        end = serializers.IntegerField(min_value=start).run_validation(
+            request.query_params.get("end", start + DIFF_ROWS_PAGE_SIZE)
+        )
 
-            response["left_object"] = to_base64(scratch.target_assembly.elf_object)
-            response["right_object"] = to_base64(compilation.elf_object)
+        found = diff_format.get_rows(scratch.slug, diff_id, start, end)
+        if found is None:
+            return Response(
+                {"detail": "Diff has expired, compile again"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
 
-        return Response(response)
+        rows, total_rows = found
+        return Response({"start": start, "total_rows": total_rows, "rows": rows})
 
     @action(detail=True, methods=["POST"])
     def decompile(self, request: Request, pk: str) -> Response:
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from django.utils.decorators import method_decorator
 from django.utils.http import http_date, parse_http_date_safe
 from django.utils.timezone import now
@@ -6,8 +8,10 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .. import scratch_counts
 from ..decorators.cache import globally_cacheable
 from ..models.scratch import Scratch
+from ..scratch_counts import Kind
 
 
 @method_decorator(
@@ -15,37 +19,57 @@ from ..models.scratch import Scratch
 )
 class ScratchCountView(APIView):
     def get(self, request: Request) -> Response:
-        qs = Scratch.objects.all()
-
         platform = request.query_params.get("platform")
         compiler = request.query_params.get("compiler")
         preset = request.query_params.get("preset")
 
-        if platform:
-            qs = qs.filter(platform=platform)
-        if compiler:
-            qs = qs.filter(compiler=compiler)
+        preset_id = None
         if preset:
             try:
                 preset_id = int(preset)
             except ValueError:
                 raise ValidationError({"preset": "Must be an integer."})
-            qs = qs.filter(preset_id=preset_id)
 
-        latest_created = (
-            qs.order_by("-creation_time")
-            .values_list("creation_time", flat=True)
-            .first()
-        )
-        if latest_created is None:
-            latest_created = now()
+        counted = [
+            (kind, key)
+            for kind, key in (
+                (Kind.PLATFORM, platform),
+                (Kind.COMPILER, compiler),
+                (Kind.PRESET, str(preset_id) if preset_id is not None else None),
+            )
+            if key
+        ]
+
+        last_changed: datetime | None
+        if len(counted) <= 1:
+            kind, key = counted[0] if counted else (Kind.ALL, "")
+            num_scratches, last_changed = scratch_counts.lookup(kind, key)
+        else:
+            # Only counts by a single field are maintained
+            qs = Scratch.objects.all()
+            if platform:
+                qs = qs.filter(platform=platform)
+            if compiler:
+                qs = qs.filter(compiler=compiler)
+            if preset_id is not None:
+                qs = qs.filter(preset_id=preset_id)
+
+            num_scratches = qs.count()
+            last_changed = (
+                qs.order_by("-creation_time")
+                .values_list("creation_time", flat=True)
+                .first()
+            )
+
+        if last_changed is None:
+            last_changed = now()
 
         if_modified_since = request.headers.get("If-Modified-Since")
         if if_modified_since:
             since_ts = parse_http_date_safe(if_modified_since)
-            if since_ts and latest_created.timestamp() <= since_ts:
+            if since_ts and last_changed.timestamp() <= since_ts:
                 return Response(status=304)
 
-        resp = Response({"num_scratches": qs.count()})
-        resp["Last-Modified"] = http_date(latest_created.timestamp())
+        resp = Response({"num_scratches": num_scratches})
+        resp["Last-Modified"] = http_date(last_changed.timestamp())
         return resp
@@ -1,14 +1,16 @@
-from django.db.models import Count
+from django.utils.decorators import method_decorator
 from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
 from rest_framework.views import APIView
 
-from ..decorators.cache import globally_cacheable
-from ..filters.search import validate_search_query
+from .. import scratch_counts
+from ..decorators.cache import globally_cacheable, server_cacheable
+from ..filters.search import ranked_search, validate_search_query
 from ..middleware import Request
 from ..models.preset import Preset
 from ..models.profile import Profile
 from ..models.scratch import Scratch
+from ..scratch_counts import Kind
 from ..serializers import PresetSerializer, TerseScratchSerializer, serialize_profile
 
 MAX_SEARCH_PAGE_SIZE = 50
@@ -26,19 +28,27 @@ def get_page_size(raw_page_size: str) -> int:
     return min(page_size, MAX_SEARCH_PAGE_SIZE)
 
 
+@method_decorator(
+    server_cacheable(
+        timeout=60, tags=["scratches", "presets", "profiles", "scratch-counts"]
+    ),
+    name="dispatch",
+)
 class SearchViewSet(APIView):
     @globally_cacheable(max_age=60, stale_while_revalidate=30)
     def get(self, request: Request) -> Response:
         query = validate_search_query(request.query_params.get("search", ""))
         page_size = get_page_size(request.query_params.get("page_size", "5"))
 
-        user_qs = Profile.objects.filter(user__username__icontains=query)[:page_size]
+        user_qs = ranked_search(Profile.objects.all(), "user__username", query)[
+            :page_size
+        ]
         preset_qs = (
-            Preset.objects.filter(name__icontains=query)
+            ranked_search(Preset.objects.all(), "name", query)
             .select_related("owner__user", "owner__user__github")
-            .annotate(num_scratches=Count("scratch"))[:page_size]
+            .annotate(num_scratches=scratch_counts.annotation(Kind.PRESET))[:page_size]
         )
-        scratch_qs = Scratch.objects.filter(name__icontains=query).select_related(
+        scratch_qs = ranked_search(Scratch.objects.all(), "name", query).select_related(
             "owner__user__github",
             "best_fork__fork__owner__user__github",
         )[:page_size]
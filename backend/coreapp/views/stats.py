@@ -3,9 +3,11 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .. import scratch_counts
 from ..decorators.cache import globally_cacheable
 from ..models.github import GitHubUser
-from ..models.scratch import Asm, Scratch
+from ..models.scratch import Asm
+from ..scratch_counts import Kind
 
 
 @method_decorator(
@@ -16,7 +18,7 @@ class StatsDetail(APIView):
         return Response(
             {
                 "asm_count": Asm.objects.count(),
-                "scratch_count": Scratch.objects.count(),
+                "scratch_count": scratch_counts.get(Kind.ALL),
                 "github_user_count": GitHubUser.objects.count(),
             }
         )
@@ -2,6 +2,7 @@ import django_filters
 from django.contrib.auth import logout
 from django.db.models import Count
 from django.db.models.query import QuerySet
+from django.http import HttpRequest
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from rest_framework import filters, generics
@@ -9,13 +10,15 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from ..decorators.cache import globally_cacheable
+from .. import response_cache, scratch_counts
+from ..decorators.cache import globally_cacheable, server_cacheable
 from ..filters.search import NonEmptySearchFilter
-from ..middleware import Request
+from ..middleware import Request, set_profile
 from ..models.github import GitHubUser
 from ..models.preset import Preset
 from ..models.profile import Profile
 from ..models.scratch import Scratch
+from ..scratch_counts import Kind
 from ..serializers import PresetSerializer, TerseScratchSerializer, serialize_profile
 from .preset import PresetPagination
 from .scratch import ScratchPagination, ScratchViewSet
@@ -42,10 +45,8 @@ class CurrentUser(APIView):
         else:
             logout(request)
 
-            profile = Profile()
-            profile.save()
-            request.profile = profile
-            request.session["profile_id"] = request.profile.id
+            # Saved when needed, see materialize_profile
+            set_profile(request, Profile(), is_placeholder=True)
 
             return self.get(request)
 
@@ -68,11 +69,38 @@ class CurrentUserScratchList(generics.ListAPIView):  # type: ignore
 
     def get_queryset(self) -> QuerySet[Scratch]:
         profile: Profile | None = self.request.profile  # type: ignore[attr-defined]
-        if profile is None:  # should be impossible due to middleware
+        if profile is None or profile.id is None:
             return Scratch.objects.none()
         return ScratchViewSet.queryset.filter(owner__id=profile.id)
 
 
+def user_cache_tags(
+    request: HttpRequest, username: str, **kwargs: object
+) -> list[str] | None:
+    profile_id = (
+        Profile.objects.filter(user__username=username)
+        .values_list("id", flat=True)
+        .first()
+    )
+    if profile_id is None:
+        return None
+    return [
+        response_cache.owner_tag(profile_id),
+        scratch_counts.response_tag(Kind.OWNER, str(profile_id)),
+    ]
+
+
+def user_scratches_cache_tags(
+    request: HttpRequest, username: str, **kwargs: object
+) -> list[str] | None:
+    tags = user_cache_tags(request, username)
+    # Best forks are shown with the profiles that made them
+    return None if tags is None else [*tags, "profiles"]
+
+
+@method_decorator(
+    server_cacheable(timeout=60, tags=user_scratches_cache_tags), name="dispatch"
+)
 @method_decorator(
     globally_cacheable(max_age=60, stale_while_revalidate=30), name="dispatch"
 )
@@ -97,6 +125,10 @@ class UserScratchList(generics.ListAPIView):  # type: ignore
         )
 
 
+@method_decorator(
+    server_cacheable(timeout=60, tags=["presets", "profiles", "scratch-counts"]),
+    name="dispatch",
+)
 @method_decorator(
     globally_cacheable(max_age=60, stale_while_revalidate=30), name="dispatch"
 )
@@ -119,10 +151,11 @@ class UserPresetList(generics.ListAPIView):  # type: ignore
         return (
             Preset.objects.filter(owner__user__username=self.kwargs["username"])
             .select_related("owner__user", "owner__user__github")
-            .annotate(num_scratches=Count("scratch"))
+            .annotate(num_scratches=scratch_counts.annotation(Kind.PRESET))
         )
 
 
+@server_cacheable(timeout=300, tags=user_cache_tags)
 @api_view(["GET"])  # type: ignore
 @globally_cacheable(max_age=300, stale_while_revalidate=30)
 def user(request: Request, username: str) -> Response:
@@ -137,6 +170,7 @@ def user(request: Request, username: str) -> Response:
     )
 
 
+@method_decorator(server_cacheable(timeout=60, tags=user_cache_tags), name="dispatch")
 @method_decorator(
     globally_cacheable(max_age=60, stale_while_revalidate=30), name="dispatch"
 )
@@ -35,12 +35,24 @@ env = environ.Env(
     GITHUB_CLIENT_SECRET=(str, ""),
     COMPILER_BASE_PATH=(str, BASE_DIR / "compilers"),
     LIBRARY_BASE_PATH=(str, BASE_DIR / "libraries"),
-    COMPILATION_CACHE_SIZE=(int, 100),
+    COMPILATION_CACHE_MEMORY_BYTES=(int, 64 * 1024 * 1024),  # per worker
+    COMPILATION_CACHE_DB_BYTES=(int, 1024 * 1024 * 1024),  # shared
+    COMPILATION_LOCK_PATH=(str, BASE_DIR / "locks"),
+    METRICS_DIR=(str, ""),
     OBJDUMP_CACHE_SIZE=(int, 100),
+    OBJDUMP_THREADS=(int, 4),
+    DIFF_POOL_PROCESSES=(int, 2),  # per worker, 0 to diff in-process
+    DIFF_POOL_MAX_TASKS=(int, 100),
+    DIFF_MAX_MEMORY_BYTES=(int, 1024 * 1024 * 1024),
+    DIFF_LEVENSHTEIN_MAX_CELLS=(int, 25_000_000),
     COMPILATION_TIMEOUT_SECONDS=(int, 10),
     ASSEMBLY_TIMEOUT_SECONDS=(int, 3),
     OBJDUMP_TIMEOUT_SECONDS=(int, 3),
+    DIFF_TIMEOUT_SECONDS=(int, 10),
+    DIFF_ALGORITHM_BUDGET_SECONDS=(int, 2),
     TIMEOUT_SCALE_FACTOR=(int, 1),
+    COMPILE_QUEUE_ENABLED=(bool, False),
+    COMPILE_QUEUE_WAIT_SECONDS=(int, 20),
     SENTRY_DSN=(str, ""),
     SENTRY_SAMPLE_RATE=(float, 0.0),
     SENTRY_TIMEOUT=(int, 3),
@@ -49,6 +61,8 @@ env = environ.Env(
     SESSION_TIMEOUT_REDIRECT=(str, "/"),
     CONN_MAX_AGE=(int, 0),  # default: a new connection for each request
     CONN_HEALTH_CHECKS=(bool, False),
+    CACHE_URL=(str, f"filecache://{BASE_DIR / 'cache'}?max_entries=10000"),
+    BUILD_ID=(str, ""),
 )
 
 for stem in [".env.local", ".env"]:
@@ -81,6 +95,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "coreapp.middleware.server_timing",
+    "coreapp.middleware.request_metrics",
     "coreapp.middleware.strip_session",
     "coreapp.middleware.strip_cookie_vary",
     "django.middleware.security.SecurityMiddleware",
@@ -129,6 +145,30 @@ DATABASES = {
     },
 }
 
+# Identifies the deployed backend, e.g. the git commit it was built from, which
+# the Dockerfile sets from GIT_HASH. Part of the ETag of compile results, as a
+# new build may compile or diff scratches differently (see build_id()).
+BUILD_ID = env("BUILD_ID", str)
+
+# Must be shared by all workers, as diff rows are read from it by whichever
+# worker serves the request: the default file-based cache is shared by the
+# workers of one host, and pymemcache:// or redis:// must be used instead when
+# backends on several hosts serve the same site (see response_cache)
+CACHES = {"default": env.cache_url()}
+
+# Sessions and responses are read from the cache instead of the database, so
+# unlike other cached values they can't be cached per worker: a worker could
+# use a session or response that another has since changed or invalidated.
+if CACHES["default"]["BACKEND"] == "django.core.cache.backends.locmem.LocMemCache":
+    CACHES["sessions"] = CACHES["responses"] = {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+    }
+else:
+    CACHES["sessions"] = CACHES["responses"] = CACHES["default"]
+
+SESSION_ENGINE = "coreapp.sessions"
+SESSION_CACHE_ALIAS = "sessions"
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -228,8 +268,22 @@ SANDBOX_DISABLE_PROC = env("SANDBOX_DISABLE_PROC")
 GITHUB_CLIENT_ID = env("GITHUB_CLIENT_ID", str)
 GITHUB_CLIENT_SECRET = env("GITHUB_CLIENT_SECRET", str)
 
-COMPILATION_CACHE_SIZE = env("COMPILATION_CACHE_SIZE", int)
+COMPILATION_CACHE_MEMORY_BYTES = env("COMPILATION_CACHE_MEMORY_BYTES", int)
+COMPILATION_CACHE_DB_BYTES = env("COMPILATION_CACHE_DB_BYTES", int)
+# Lock files used to coalesce identical compilations across worker processes
+COMPILATION_LOCK_PATH = Path(env("COMPILATION_LOCK_PATH"))
 OBJDUMP_CACHE_SIZE = env("OBJDUMP_CACHE_SIZE", int)
+OBJDUMP_THREADS = env("OBJDUMP_THREADS", int)
+# asm-differ runs in a pool of processes, each restarted after DIFF_POOL_MAX_TASKS
+# diffs and limited to DIFF_MAX_MEMORY_BYTES of address space
+DIFF_POOL_PROCESSES = env("DIFF_POOL_PROCESSES", int)
+DIFF_POOL_MAX_TASKS = env("DIFF_POOL_MAX_TASKS", int)
+DIFF_MAX_MEMORY_BYTES = env("DIFF_MAX_MEMORY_BYTES", int)
+# With the automatic diff algorithm, diffs that are estimated to be too
+# expensive for Levenshtein use difflib instead. Unless an algorithm is chosen
+# explicitly, diffs that are still running after DIFF_ALGORITHM_BUDGET_SECONDS
+# are also stopped and run again with difflib (0 to disable)
+DIFF_LEVENSHTEIN_MAX_CELLS = env("DIFF_LEVENSHTEIN_MAX_CELLS", int)
 
 TIMEOUT_SCALE_FACTOR = env("TIMEOUT_SCALE_FACTOR", int)
 COMPILATION_TIMEOUT_SECONDS = (
@@ -237,6 +291,22 @@ COMPILATION_TIMEOUT_SECONDS = (
 )
 ASSEMBLY_TIMEOUT_SECONDS = env("ASSEMBLY_TIMEOUT_SECONDS", int) * TIMEOUT_SCALE_FACTOR
 OBJDUMP_TIMEOUT_SECONDS = env("OBJDUMP_TIMEOUT_SECONDS", int) * TIMEOUT_SCALE_FACTOR
+DIFF_TIMEOUT_SECONDS = env("DIFF_TIMEOUT_SECONDS", int) * TIMEOUT_SCALE_FACTOR
+DIFF_ALGORITHM_BUDGET_SECONDS = (
+    env("DIFF_ALGORITHM_BUDGET_SECONDS", int) * TIMEOUT_SCALE_FACTOR
+)
+
+# Run compilations on separate compile_worker.py processes instead of web workers
+COMPILE_QUEUE_ENABLED = env("COMPILE_QUEUE_ENABLED", bool)
+# The longest a request may wait for its compilation with ?wait=<seconds>,
+# otherwise clients poll /api/compile-job/<id> for it
+COMPILE_QUEUE_WAIT_SECONDS = (
+    env("COMPILE_QUEUE_WAIT_SECONDS", int) * TIMEOUT_SCALE_FACTOR
+)
+
+# Where each process writes its metrics for /api/metrics to aggregate.
+# If unset, /api/metrics only reports the process that serves it.
+METRICS_DIR = env("METRICS_DIR", str)
 
 SENTRY_DSN = env("SENTRY_DSN", str)
 SENTRY_SAMPLE_RATE = env("SENTRY_SAMPLE_RATE", float)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+import argparse
+import contextlib
+import os
+import statistics
+import time
+
+import django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Decomp.me diff benchmark: times diffing the last compiled "
+        "objects of saved scratches (see CompileSnapshot) against their targets, "
+        "with each diff algorithm"
+    )
+    parser.add_argument(
+        "--scratches",
+        type=int,
+        default=20,
+        help="Number of scratches to diff, those with the largest targets first",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of times to run each diff",
+    )
+    parser.add_argument(
+        "--pool",
+        action="store_true",
+        help="Diff on the diff pool, with its timeouts and algorithm budget, "
+        "rather than in-process",
+    )
+    parser.add_argument(
+        "slugs",
+        nargs="*",
+        help="Scratches to diff instead",
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "decompme.settings")
+    django.setup()
+
+    from django.db.models.functions import Length
+    from django.test import override_settings
+
+    from coreapp import object_store, platforms
+    from coreapp.diff_wrapper import DIFF_ALGORITHM_FLAGS, DiffWrapper
+    from coreapp.error import DiffError
+    from coreapp.flags import ASMDIFF_FLAG_PREFIX
+    from coreapp.models.scratch import CompileSnapshot
+
+    snapshots = CompileSnapshot.objects.select_related(
+        "scratch__target_assembly"
+    ).filter(right_object_hash__isnull=False)
+    if args.slugs:
+        snapshots = snapshots.filter(scratch__slug__in=args.slugs)
+    else:
+        snapshots = snapshots.order_by(
+            Length("scratch__target_assembly__elf_object").desc()
+        )[: args.scratches]
+
+    in_process = override_settings(DIFF_POOL_PROCESSES=0)
+    with contextlib.nullcontext() if args.pool else in_process:
+        for snapshot in snapshots:
+            scratch = snapshot.scratch
+            elf_object = object_store.load(snapshot.right_object_hash or "")
+            if elf_object is None:
+                print(f"{scratch.slug}: compiled object no longer stored")
+                continue
+
+            # Also time the scratch's own flags, which may fall back to difflib
+            own_flags = list(scratch.diff_flags)
+            other_flags = [f for f in own_flags if f not in DIFF_ALGORITHM_FLAGS]
+            variants = {
+                "levenshtein": [*other_flags, ASMDIFF_FLAG_PREFIX + "levenshtein"],
+                "difflib": [*other_flags, ASMDIFF_FLAG_PREFIX + "difflib"],
+                "own flags": own_flags,
+            }
+
+            print(f"{scratch.slug} ({scratch.diff_label or 'no label'}):")
+            for name, diff_flags in variants.items():
+                durations = []
+                try:
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        diff = DiffWrapper.diff(
+                            scratch.target_assembly,
+                            platforms.from_id(scratch.platform),
+                            scratch.diff_label,
+                            elf_object,
+                            diff_flags,
+                        )
+                        durations.append(time.perf_counter() - start)
+                except DiffError as e:
+                    print(f"  {name}: {e}")
+                    continue
+
+                result = diff.result or {}
+                print(
+                    f"  {name}: median {statistics.median(durations) * 1000:.1f}ms, "
+                    f"max {max(durations) * 1000:.1f}ms, "
+                    f"{len(result.get('rows', []))} rows, "
+                    f"score {result.get('current_score')}/{result.get('max_score')}"
+                    + (f" ({diff.errors})" if diff.errors else "")
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,16 +8,33 @@ BE_PORT=${BACKEND_PORT:-8000}
 
 WORKERS=${BACKEND_WORKERS:-4}
 
+# Shared by gunicorn and compile workers so /api/metrics can aggregate them
+export METRICS_DIR=${METRICS_DIR:-/tmp/decompme-metrics}
+rm -rf "${METRICS_DIR}"
+mkdir -p "${METRICS_DIR}"
+
+# Shared by gunicorn workers, which read each other's diff rows, sessions and
+# cached responses from it, and by the blue and green backends through a
+# volume, so that they see each other's invalidations. Backends on other hosts
+# would need a shared CACHE_URL such as redis:// instead.
+export CACHE_URL=${CACHE_URL:-filecache:///backend/cache?max_entries=10000}
+
 until nc -z ${DB_HOST} ${DB_PORT} > /dev/null; do
   echo "Waiting for database to become available on ${DB_HOST}:${DB_PORT}..."
   sleep 1
 done
 
 if [ -z "$CI" ]; then
-  uv run manage.py clearsessions
   uv run /backend/housekeeping.py
+  # Repeated while the backend runs, e.g. to remove sessions as they expire
+  while sleep ${HOUSEKEEPING_INTERVAL_SECONDS:-86400}; do
+    uv run /backend/housekeeping.py
+  done &
 else
   echo "Skipping housekeeping: running in CI environment"
 fi
 
+# Exits straight away unless COMPILE_QUEUE_ENABLED is set
+uv run /backend/compile_worker.py --processes ${COMPILE_WORKERS:-4} &
+
 uv run gunicorn -w ${WORKERS} decompme.wsgi --bind ${BE_HOST}:${BE_PORT}
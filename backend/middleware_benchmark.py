@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+import argparse
+import os
+import statistics
+import time
+from collections.abc import Callable
+from typing import Any
+
+import django
+
+# The middleware as it was before public GETs skipped the session and profile
+# updates were buffered, to compare against with --old
+OLD_MIDDLEWARE = {
+    "coreapp.middleware.strip_session": "__main__.old_strip_session",
+    "coreapp.middleware.set_user_profile": "__main__.old_set_user_profile",
+}
+OLD_SESSION_ENGINE = "django.contrib.sessions.backends.db"
+
+
+def old_strip_session(get_response: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    from coreapp.middleware import is_public_get_request
+
+    def middleware(request: Any) -> Any:
+        response = get_response(request)
+        if is_public_get_request(request):
+            response.cookies.clear()
+        return response
+
+    return middleware
+
+
+def old_set_user_profile(get_response: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    from django.utils.timezone import now
+
+    from coreapp.middleware import is_public_get_request
+    from coreapp.models.profile import Profile
+
+    # Only the path of the benchmark's GETs by a logged-in browser
+    def middleware(request: Any) -> Any:
+        profile = None
+        if request.user.is_authenticated:
+            profile = getattr(request.user, "profile", None)
+        if not profile:
+            profile_id = request.session.get("profile_id")
+            if isinstance(profile_id, int):
+                profile = (
+                    Profile.objects.select_related("user").filter(id=profile_id).first()
+                )
+        if not profile and is_public_get_request(request):
+            request.profile = Profile()
+            return get_response(request)
+        if not profile:
+            profile = Profile()
+            profile.save()
+            request.session["profile_id"] = profile.id
+
+        last_request_date = profile.last_request_date
+        profile.last_request_date = now()
+        if (profile.last_request_date - last_request_date).total_seconds() > 60:
+            profile.save(update_fields=["last_request_date"])
+
+        request.profile = profile
+        return get_response(request)
+
+    return middleware
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Decomp.me middleware benchmark: times the middleware of "
+        "GET requests by a logged-in user around a view that does nothing. The "
+        "user and their session are rolled back afterwards"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1000,
+        help="Number of times to make each request",
+    )
+    parser.add_argument(
+        "--old",
+        action="store_true",
+        help="Use the middleware and database-backed sessions of before public "
+        "GETs skipped the session, for comparison",
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["/api/platform", "/api/scratch/abc123", "/api/search", "/api/user"],
+        help="Paths to request",
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "decompme.settings")
+    django.setup()
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.handlers.base import BaseHandler
+    from django.db import connection, reset_queries, transaction
+    from django.http import HttpRequest, HttpResponse, HttpResponseBase
+    from django.test import Client, RequestFactory
+    from django.test.utils import (
+        CaptureQueriesContext,
+        override_settings,
+        setup_test_environment,
+    )
+
+    from coreapp.models.profile import Profile
+
+    class NoViewHandler(BaseHandler):
+        def _get_response(self, request: HttpRequest) -> HttpResponse:
+            return HttpResponse()
+
+    # Allows requests to the test server
+    setup_test_environment()
+
+    if args.old:
+        override_settings(
+            MIDDLEWARE=[OLD_MIDDLEWARE.get(m, m) for m in settings.MIDDLEWARE],
+            SESSION_ENGINE=OLD_SESSION_ENGINE,
+        ).enable()
+
+    handler = NoViewHandler()
+    handler.load_middleware()
+    factory = RequestFactory()
+
+    with transaction.atomic():
+        user = User.objects.create(username="middleware-benchmark")
+        Profile.objects.create(user=user)
+        client = Client()
+        client.force_login(user)
+        session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        def make_request(path: str) -> HttpResponseBase:
+            request = factory.get(
+                path,
+                HTTP_COOKIE=f"{settings.SESSION_COOKIE_NAME}={session_key}",
+                HTTP_USER_AGENT="Mozilla/5.0",
+            )
+            return handler.get_response(request)
+
+        for path in args.paths:
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                make_request(path)
+
+            durations = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                make_request(path)
+                durations.append(time.perf_counter() - start)
+
+            print(
+                f"{path}: median {statistics.median(durations) * 1_000_000:.0f}us, "
+                f"{len(queries)} queries"
+            )
+
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+import django
+
+WORDS = [
+    "actor",
+    "anim",
+    "audio",
+    "camera",
+    "collision",
+    "draw",
+    "effect",
+    "init",
+    "item",
+    "load",
+    "matrix",
+    "player",
+    "render",
+    "save",
+    "scene",
+    "update",
+]
+
+
+def synthetic_name(rng: random.Random, i: int) -> str:
+    if rng.random() < 0.5:
+        return f"func_80{i:06X}"
+    words = rng.sample(WORDS, 2)
+    return f"{words[0].capitalize()}_{words[1]}_{i}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Decomp.me search benchmark: times searches over a synthetic "
+        "table of scratches, which is rolled back afterwards"
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=1_000_000,
+        help="Number of synthetic scratches to search",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of times to run each search",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Print the query plan of each search, with its timings on PostgreSQL",
+    )
+    parser.add_argument(
+        "queries",
+        nargs="*",
+        default=["fu", "func_80", "player_up", "CAMERA", "no such scratch"],
+        help="Searches to time",
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "decompme.settings")
+    django.setup()
+
+    from django.db import connection, transaction
+
+    from coreapp.filters.search import ranked_search
+    from coreapp.models.scratch import Assembly, Scratch
+
+    rows: int = args.rows
+    rng = random.Random(0)
+
+    with transaction.atomic():
+        start = time.perf_counter()
+        assembly = Assembly.objects.create(hash="search-benchmark", arch="mips")
+        batch_size = 10_000
+        for batch_start in range(0, rows, batch_size):
+            Scratch.objects.bulk_create(
+                Scratch(
+                    slug=f"bench{i}",
+                    name=synthetic_name(rng, i),
+                    compiler="dummy",
+                    platform="dummy",
+                    target_assembly=assembly,
+                )
+                for i in range(batch_start, min(batch_start + batch_size, rows))
+            )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE coreapp_scratch")
+        print(
+            f"Created {rows:,} scratches on {connection.vendor} "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+
+        for query in args.queries:
+            qs = ranked_search(Scratch.objects.all(), "name", query)[:5]
+            durations = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results = list(qs.values_list("name", flat=True))
+                durations.append(time.perf_counter() - start)
+            print(
+                f"{query!r}: median {statistics.median(durations) * 1000:.1f}ms, "
+                f"max {max(durations) * 1000:.1f}ms, top results {results}"
+            )
+            if args.explain:
+                print(qs.explain(analyze=connection.vendor == "postgresql"))
+
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
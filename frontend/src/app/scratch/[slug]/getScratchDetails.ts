@@ -1,3 +1,4 @@
+import { resolveCompilation } from "@/lib/api/compileJob";
 import { get, bubbleNotFound, ResponseError } from "@/lib/api/request";
 import type { Scratch, Compilation } from "@/lib/api/types";
 import { scratchParentUrl, scratchUrl } from "@/lib/api/urls";
@@ -9,7 +10,9 @@ export default async function getScratchDetails(slug: string) {
 
     let compilation: Compilation | null = null;
     try {
-        compilation = await get(`${scratchUrl(scratch)}/compile`);
+        compilation = await get(`${scratchUrl(scratch)}/compile`).then(
+            resolveCompilation,
+        );
     } catch (error) {
         if (error instanceof ResponseError && error.status !== 400) {
             compilation = null;
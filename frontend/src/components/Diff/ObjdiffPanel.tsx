@@ -1,4 +1,4 @@
-import type * as api from "@/lib/api";
+import * as api from "@/lib/api";
 import { getColors } from "@/lib/codemirror/color-scheme";
 import {
     useCodeColorScheme,
@@ -56,11 +56,13 @@ export default function ObjdiffPanel({
                     } as InboundMessage,
                     "*",
                 );
+                const compilation = latestCompilation.current;
                 postState(
                     iframeWindow,
-                    latestCompilation.current,
+                    compilation,
                     latestBuildRunning.current,
                     latestScratch.current,
+                    () => latestCompilation.current === compilation,
                 );
             }
         };
@@ -77,6 +79,7 @@ export default function ObjdiffPanel({
             compilation,
             latestBuildRunning.current,
             latestScratch.current,
+            () => latestCompilation.current === compilation,
         );
     }, [compilation]);
 
@@ -160,17 +163,24 @@ const postScratchInfo = (
     iframeWindow.postMessage(message, "*");
 };
 
-const postState = (
+const postState = async (
     iframeWindow: Window | null | undefined,
     compilation: api.Compilation | null,
     buildRunning: boolean,
     scratch: Readonly<api.Scratch>,
+    isLatest: () => boolean = () => true,
 ) => {
     if (!iframeWindow || !compilation) {
         return;
     }
-    const leftObject = base64ToBytes(compilation.left_object);
-    const rightObject = base64ToBytes(compilation.right_object);
+    const [leftObject, rightObject] = await Promise.all([
+        fetchObject(compilation.left_object_hash),
+        fetchObject(compilation.right_object_hash),
+    ]);
+    if (!isLatest()) {
+        // A newer compilation arrived while the objects were being fetched
+        return;
+    }
     const message: InboundMessage = {
         type: "state",
         buildRunning,
@@ -186,25 +196,27 @@ const postState = (
             stdout: compilation.compiler_output,
             stderr: null,
         },
-        leftObject: leftObject?.buffer,
-        rightObject: rightObject?.buffer,
+        leftObject,
+        rightObject,
         diffLabel: scratch.diff_label || null,
     };
     iframeWindow.postMessage(
         message,
         "*",
-        [leftObject?.buffer, rightObject?.buffer].filter(
-            (b) => b != null,
-        ) as ArrayBuffer[],
+        [leftObject, rightObject].filter((b) => b != null) as ArrayBuffer[],
     );
 };
 
-function base64ToBytes(base64: string) {
-    if (!base64) {
+async function fetchObject(hash: string | null): Promise<ArrayBuffer | null> {
+    if (!hash) {
+        return null;
+    }
+    try {
+        return await api.getObject(hash);
+    } catch (error) {
+        console.error(error);
         return null;
     }
-    const binString = atob(base64);
-    return Uint8Array.from(binString, (m) => m.codePointAt(0) as number);
 }
 
 type ConfigPropertyValue = boolean | string;
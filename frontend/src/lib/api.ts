@@ -6,6 +6,7 @@ import useSWR, { type Revalidator, type RevalidatorOptions, mutate } from "swr";
 import useSWRImmutable from "swr/immutable";
 import { useDebouncedCallback } from "use-debounce";
 
+import { resolveCompilation } from "./api/compileJob";
 import { ResponseError, get, getPublic, post, patch } from "./api/request";
 import type {
     AnonymousUser,
@@ -249,9 +250,7 @@ export function useCompilation(
                 `${scratchUrl(scratch)}/compile`,
                 buildScratchCompileRequest(savedScratch, scratch),
             )
-                .then((compilation: Compilation) => {
-                    return compilation;
-                })
+                .then(resolveCompilation)
                 .then((compilation: Compilation) => {
                     setCompilationState({
                         compilation,
@@ -280,8 +279,8 @@ export function useCompilation(
                                 compiler_output: compilerOutput,
                                 diff_output: null,
                                 success: false,
-                                left_object: null,
-                                right_object: null,
+                                left_object_hash: null,
+                                right_object_hash: null,
                             },
                             inputKey: requestInputKey,
                         });
@@ -0,0 +1,46 @@
+import { afterEach, beforeEach, describe, expect, it, vi } from "vitest";
+
+import { type QueuedCompileJob, resolveCompilation } from "./compileJob";
+import type { Compilation } from "./types";
+
+const compilation: Compilation = {
+    compiler_output: "",
+    diff_output: null,
+    left_object_hash: null,
+    right_object_hash: null,
+    success: true,
+};
+
+describe("resolveCompilation", () => {
+    beforeEach(() => {
+        vi.useFakeTimers();
+    });
+
+    afterEach(() => {
+        vi.useRealTimers();
+    });
+
+    it("returns finished compilations as they are", async () => {
+        const getJob = vi.fn();
+
+        await expect(resolveCompilation(compilation, getJob)).resolves.toBe(
+            compilation,
+        );
+        expect(getJob).not.toHaveBeenCalled();
+    });
+
+    it("polls for queued compilations until they finish", async () => {
+        const queued: QueuedCompileJob = { job: "abc", status: "queued" };
+        const getJob = vi
+            .fn()
+            .mockResolvedValueOnce({ ...queued, status: "running" })
+            .mockResolvedValueOnce(compilation);
+
+        const result = resolveCompilation(queued, getJob);
+        await vi.runAllTimersAsync();
+
+        await expect(result).resolves.toBe(compilation);
+        expect(getJob).toHaveBeenCalledTimes(2);
+        expect(getJob).toHaveBeenCalledWith("/compile-job/abc");
+    });
+});
@@ -0,0 +1,38 @@
+import { get } from "./request";
+import type { Compilation } from "./types";
+
+/** A compilation that the backend has queued, see /api/compile-job */
+export type QueuedCompileJob = {
+    job: string;
+    status: "queued" | "running";
+};
+
+// Polls for queued compilations start quickly, then back off
+const FIRST_POLL_DELAY_MS = 100;
+const MAX_POLL_DELAY_MS = 1000;
+
+export function isQueuedCompileJob(json: unknown): json is QueuedCompileJob {
+    return (
+        typeof json === "object" &&
+        json !== null &&
+        "job" in json &&
+        "status" in json
+    );
+}
+
+/**
+ * The compilation of a compile response, polling for it until it's finished
+ * if the backend queued it. Rejects with a ResponseError if the job fails.
+ */
+export async function resolveCompilation(
+    response: Compilation | QueuedCompileJob,
+    getJob: (url: string) => Promise<Compilation | QueuedCompileJob> = get,
+): Promise<Compilation> {
+    let delay = FIRST_POLL_DELAY_MS;
+    while (isQueuedCompileJob(response)) {
+        await new Promise((resolve) => setTimeout(resolve, delay));
+        delay = Math.min(delay * 2, MAX_POLL_DELAY_MS);
+        response = await getJob(`/compile-job/${response.job}`);
+    }
+    return response;
+}
@@ -112,6 +112,32 @@ export async function getPublic(url: string) {
     });
 }
 
+/** Fetch an object file returned by compile, by its hash */
+export async function getObject(hash: string): Promise<ArrayBuffer> {
+    const url = normalizeUrl(`/object/${hash}`);
+    let response: Response;
+
+    try {
+        // Objects never change, so the browser can cache them indefinitely
+        response = await fetch(url, { credentials: "omit", cache: "default" });
+    } catch (error) {
+        if (error instanceof TypeError) {
+            throw new RequestFailedError(error.message, url);
+        }
+
+        throw error;
+    }
+
+    if (!response.ok) {
+        throw new RequestFailedError(
+            `Server responded with HTTP status code ${response.status}`,
+            url,
+        );
+    }
+
+    return await response.arrayBuffer();
+}
+
 export async function post(
     url: string,
     data: Json | FormData,
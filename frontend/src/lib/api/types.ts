@@ -74,8 +74,8 @@ export interface ClaimableScratch extends Scratch {
 export type Compilation = {
     compiler_output: string;
     diff_output: DiffOutput | null;
-    left_object: string | null; // base64 encoded
-    right_object: string | null; // base64 encoded
+    left_object_hash: string | null; // see getObject
+    right_object_hash: string | null;
     success: boolean;
 };
 